@@ -1,9 +1,18 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_login import LoginManager
 from models import db, AdminUser
 from routes import register_blueprints
+from services.schema_setup import prepare_database
+from services.case_list_cache import configure_case_list_cache
+from services.case_audit import configure_case_audit
+from services.write_behind import configure_write_behind
+from services.live_events import configure_live_events
+from services.case_analytics import configure_case_analytics
+from services.index_sync import sync_indexes, diff_indexes
+from services.stats_snapshot import get_stats_snapshot
 import os
+import tempfile
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
@@ -81,6 +90,55 @@ app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'storage/uploads')
 # เพิ่มการจำกัดขนาดไฟล์
 app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 50 * 1024 * 1024))  # 50MB
 app.config['MAX_FILE_SIZE'] = int(os.getenv('MAX_FILE_SIZE', 25 * 1024 * 1024))  # 25MB per file
+# ระยะเวลา cache ของข้อมูลสถิติ (วินาที) - ล้างอัตโนมัติเมื่อมีการแก้ไขข้อมูล
+app.config['STATS_CACHE_TTL'] = int(os.getenv('STATS_CACHE_TTL', 300))
+# snapshot สถิติแบบไฟล์ JSON (ดู scripts/generate_stats_snapshot.py) - เปิดใช้โดยอัตโนมัติใน serverless
+app.config['STATS_SNAPSHOT_ENABLED'] = os.getenv(
+    'STATS_SNAPSHOT_ENABLED', 'true' if IS_SERVERLESS else 'false'
+).lower() == 'true'
+app.config['STATS_SNAPSHOT_DIR'] = os.getenv(
+    'STATS_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'snapshots')
+)
+app.config['STATS_SNAPSHOT_MAX_AGE'] = int(os.getenv('STATS_SNAPSHOT_MAX_AGE', 900))
+# โฟลเดอร์ที่เขียนได้สำหรับสร้าง snapshot ใหม่เมื่อรุ่นเดิมเก่ากว่า STATS_SNAPSHOT_MAX_AGE
+# (ค่าเริ่มต้น /tmp ใน serverless - ที่อื่นใช้ scripts/generate_stats_snapshot.py --interval แทน)
+app.config['STATS_SNAPSHOT_REFRESH_DIR'] = os.getenv(
+    'STATS_SNAPSHOT_REFRESH_DIR', os.path.join(tempfile.gettempdir(), 'stats-snapshots') if IS_SERVERLESS else ''
+)
+# ใช้ snapshot ที่เก่ากว่า STATS_SNAPSHOT_MAX_AGE ต่อ (พร้อมอายุ) แทนการ query ฐานข้อมูล
+app.config['STATS_SNAPSHOT_SERVE_STALE'] = os.getenv('STATS_SNAPSHOT_SERVE_STALE', 'false').lower() == 'true'
+# นับตัวเลขรวมแบบประมาณจากสถิติของ planner (exact / approximate) เมื่อมากกว่า threshold
+app.config['STATS_COUNT_MODE'] = os.getenv('STATS_COUNT_MODE', 'exact').lower()
+app.config['APPROXIMATE_COUNT_THRESHOLD'] = int(os.getenv('APPROXIMATE_COUNT_THRESHOLD', 100000))
+# cache จำนวนรวมของรายการแบบแบ่งหน้าใน admin API (วินาที) - ล้างอัตโนมัติเมื่อมีการแก้ไขตาราง
+app.config['PAGINATION_COUNT_TTL'] = int(os.getenv('PAGINATION_COUNT_TTL', 300))
+# อายุสูงสุดของจำนวนรวมเดิมที่ใช้แทนการนับบนตารางใหญ่ (วินาที) - เกินแล้วนับจริงใหม่
+app.config['PAGINATION_COUNT_STALE_MAX_AGE'] = int(os.getenv('PAGINATION_COUNT_STALE_MAX_AGE', 3600))
+# result cache ของรายการ cases (/api/admin/cases) - ขนาดสูงสุด (byte) และอายุ (วินาที)
+app.config['CASE_LIST_CACHE_BYTES'] = int(os.getenv('CASE_LIST_CACHE_BYTES', 8 * 1024 * 1024))
+app.config['CASE_LIST_CACHE_TTL'] = int(os.getenv('CASE_LIST_CACHE_TTL', 60))
+# audit log ของ cases: async (buffer + background writer), transaction (เขียนพร้อมการแก้ไข - serverless) หรือ off
+app.config['CASE_AUDIT_MODE'] = os.getenv('CASE_AUDIT_MODE', 'transaction' if IS_SERVERLESS else 'async').lower()
+app.config['CASE_AUDIT_QUEUE_SIZE'] = int(os.getenv('CASE_AUDIT_QUEUE_SIZE', 10000))
+app.config['CASE_AUDIT_BATCH_SIZE'] = int(os.getenv('CASE_AUDIT_BATCH_SIZE', 500))
+# เตรียมตารางและตารางคำนวณตอนเริ่ม app (ปิดได้ถ้าขั้นตอน deploy เตรียมฐานข้อมูลแยกเอง)
+app.config['PREPARE_DATABASE_ON_STARTUP'] = os.getenv('PREPARE_DATABASE_ON_STARTUP', 'true').lower() == 'true'
+# รอบการเขียนคอลัมน์แบบ touch เช่น last_login (วินาที, 0 = เขียนทันที - serverless)
+app.config['WRITE_BEHIND_INTERVAL'] = float(os.getenv('WRITE_BEHIND_INTERVAL', 0 if IS_SERVERLESS else 30))
+# อายุของ analytics cube (/api/analytics, วินาที) - cube อยู่ในแต่ละ worker
+# การเขียนจาก worker อื่นจะเห็นหลังโหลดใหม่เมื่อครบอายุนี้
+app.config['ANALYTICS_MAX_AGE'] = int(os.getenv('ANALYTICS_MAX_AGE', 300))
+# live events (/api/events/stream) - ปิดใน serverless (function ไม่สามารถเปิดการเชื่อมต่อค้างไว้ได้)
+app.config['LIVE_EVENTS_ENABLED'] = os.getenv(
+    'LIVE_EVENTS_ENABLED', 'false' if IS_SERVERLESS else 'true'
+).lower() == 'true'
+# ส่ง event ข้ามหลาย worker: postgres (LISTEN/NOTIFY) หรือ local (ภายใน process - ต้องรัน 1 worker)
+app.config['LIVE_EVENTS_BACKEND'] = os.getenv(
+    'LIVE_EVENTS_BACKEND',
+    'postgres' if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres') else 'local'
+).lower()
+# จำนวน stream ที่เปิดพร้อมกันสูงสุดต่อ worker (แต่ละ stream ใช้ 1 thread - ต้องน้อยกว่า --threads มาก)
+app.config['SSE_MAX_CONNECTIONS'] = int(os.getenv('SSE_MAX_CONNECTIONS', 16))
 
 # สร้างโฟลเดอร์ storage ถ้ายังไม่มี (เฉพาะ local)
 # ใน serverless ใช้ external storage (Supabase Storage)
@@ -107,6 +165,11 @@ def load_user(user_id):
 
 # Register all blueprints
 register_blueprints(app)
+configure_case_list_cache(app)
+configure_case_audit(app)
+configure_write_behind(app)
+configure_live_events(app)
+configure_case_analytics(app)
 
 # Global error handler for better error reporting
 @app.errorhandler(500)
@@ -178,15 +241,52 @@ def init_backup_system():
         print(f"เกิดข้อผิดพลาดในการเริ่มระบบสำรองข้อมูล: {e}")
         return None
 
+def prepare_database_schema():
+    """เตรียมตารางและตารางคำนวณ (ดู services/schema_setup.py) - ต้องเรียกภายใน app context"""
+    report = prepare_database()
+    if report['added_columns']:
+        print(f"เพิ่มคอลัมน์ที่ขาด: {', '.join(report['added_columns'])}")
+    if report['created_indexes']:
+        print(f"สร้าง index ที่ขาด: {', '.join(report['created_indexes'])}")
+    if report['case_rollup']:
+        print("สร้างตารางสรุปสถิติผู้ป่วยเรียบร้อยแล้ว")
+    if report['case_name_index']:
+        print("สร้าง index สำหรับค้นหาชื่อผู้ป่วยเรียบร้อยแล้ว")
+
 def init_db():
     """เริ่มต้นฐานข้อมูล"""
     with app.app_context():
         try:
-            db.create_all()
+            prepare_database_schema()
             print("เริ่มต้นฐานข้อมูลเรียบร้อยแล้ว")
+            # สร้าง index ตาม registry (models/indexes.py) ที่ยังขาดในฐานข้อมูลเดิม
+            created_indexes = sync_indexes()
+            if created_indexes:
+                print(f"สร้าง index ที่ขาด {len(created_indexes)} รายการ: {', '.join(created_indexes)}")
         except Exception as e:
             print(f"เกิดข้อผิดพลาดในการเริ่มต้นฐานข้อมูล: {e}")
 
+if not IS_SERVERLESS and app.config['PREPARE_DATABASE_ON_STARTUP']:
+    # เตรียมฐานข้อมูลตอน import app (gunicorn app:app ไม่ได้เรียก init_db)
+    # ถ้ายังเชื่อมต่อฐานข้อมูลไม่ได้ จะลองใหม่ใน request ถัดไป - ระหว่างนั้นสถิตินับจาก patient_case
+    _schema_prepared = False
+
+    def prepare_database_on_startup():
+        global _schema_prepared
+        try:
+            with app.app_context():
+                prepare_database_schema()
+            _schema_prepared = True
+        except Exception as e:
+            print(f"Warning: Could not prepare database: {e}")
+
+    prepare_database_on_startup()
+
+    @app.before_request
+    def ensure_database_prepared():
+        if not _schema_prepared:
+            prepare_database_on_startup()
+
 if IS_SERVERLESS:
     # ปรับ settings สำหรับ serverless
     app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB (serverless limit)
@@ -197,9 +297,14 @@ if IS_SERVERLESS:
     _db_initialized = False
     _db_init_error = None
     
+    # endpoints ที่ตอบจาก snapshot ได้โดยไม่ต้องเชื่อมต่อฐานข้อมูล
+    SNAPSHOT_ENDPOINTS = ('public.stats', 'api.get_public_stats', 'api.get_recent_patients_public')
+    
     @app.before_request
     def ensure_db_initialized():
         global _db_initialized, _db_init_error
+        if request.endpoint in SNAPSHOT_ENDPOINTS and get_stats_snapshot() is not None:
+            return
         if not _db_initialized and _db_init_error is None:
             try:
                 with app.app_context():
@@ -208,8 +313,21 @@ if IS_SERVERLESS:
                     db.session.commit()
                     # Create tables if they don't exist (safe - won't recreate existing tables)
                     try:
-                        db.create_all()
+                        report = prepare_database()
                         print("✅ Database tables initialized successfully")
+                        if report['added_columns']:
+                            print(f"✅ Added missing columns: {', '.join(report['added_columns'])}")
+                        if report['created_indexes']:
+                            print(f"✅ Created required indexes: {', '.join(report['created_indexes'])}")
+                        if report['case_rollup']:
+                            print("✅ Case statistics rollup rebuilt")
+                        if report['case_name_index']:
+                            print("✅ Case name search index rebuilt")
+                        # ไม่สร้าง index ระหว่าง cold start (อาจนานเกิน timeout) - แจ้งให้รัน scripts/sync_indexes.py
+                        missing_indexes = diff_indexes()
+                        if missing_indexes:
+                            print(f"⚠️ Missing indexes (run scripts/sync_indexes.py): "
+                                  f"{', '.join(index.name for index in missing_indexes)}")
                     except Exception as create_error:
                         # Tables might already exist, that's okay
                         print(f"⚠️ Note: {create_error}")
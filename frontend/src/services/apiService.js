@@ -186,8 +186,93 @@ class ApiService {
   }
 
   // Case methods
-  async getCases() {
-    return this.request('/admin/cases')
+  // Cursor pagination: ส่ง cursor จาก pagination.next_cursor ของหน้าก่อนเพื่อดึงหน้าถัดไป
+  async getCases(params = {}) {
+    const queryString = new URLSearchParams(params).toString()
+    const endpoint = queryString ? `/admin/cases?${queryString}` : '/admin/cases'
+    return this.request(endpoint)
+  }
+
+  // ดึง cases ทั้งช่วงวันที่แบบ NDJSON (หนึ่งบรรทัดต่อหนึ่ง case) - เรียก onCase ทีละรายการ
+  async streamCases(params = {}, onCase) {
+    const queryString = new URLSearchParams(params).toString()
+    const endpoint = queryString ? `/admin/cases/stream?${queryString}` : '/admin/cases/stream'
+    const token = this.getToken()
+    const response = await fetch(`${this.baseURL}${endpoint}`, {
+      headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+      credentials: 'include'
+    })
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let count = 0
+    for (;;) {
+      const { done, value } = await reader.read()
+      buffer += decoder.decode(value || new Uint8Array(), { stream: !done })
+      const lines = buffer.split('\n')
+      buffer = done ? '' : lines.pop()
+      for (const line of lines) {
+        if (!line) continue
+        const item = JSON.parse(line)
+        if (item.error) throw new Error(item.error)
+        onCase(item)
+        count++
+      }
+      if (done) return count
+    }
+  }
+
+  // Import cases จากไฟล์ CSV (options: { dry_run, allow_duplicates })
+  async importCases(file, options = {}) {
+    const formData = new FormData()
+    formData.append('file', file)
+    Object.entries(options).forEach(([key, value]) => formData.append(key, String(value)))
+    const token = this.getToken()
+    const response = await fetch(`${this.baseURL}/admin/cases/import`, {
+      method: 'POST',
+      headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+      credentials: 'include',
+      body: formData
+    })
+    const data = await response.json()
+    if (!response.ok) {
+      throw new Error(data.message || `HTTP error! status: ${response.status}`)
+    }
+    return data
+  }
+
+  // ดึงหลาย cases ในครั้งเดียว: lookupCases({ ids: [...] }) หรือ lookupCases({ hns: [...] })
+  async lookupCases(criteria) {
+    return this.request('/admin/cases/lookup', {
+      method: 'POST',
+      body: JSON.stringify(criteria)
+    })
+  }
+
+  // Bulk update: selection = { ids: [...] } และ/หรือ { filter: { department_id, start_date, end_date } }
+  async bulkDeleteCases(selection) {
+    return this.request('/admin/cases/bulk/delete', {
+      method: 'POST',
+      body: JSON.stringify(selection)
+    })
+  }
+
+  async bulkRestoreCases(selection) {
+    return this.request('/admin/cases/bulk/restore', {
+      method: 'POST',
+      body: JSON.stringify(selection)
+    })
+  }
+
+  async bulkReassignCases(selection, departmentId) {
+    return this.request('/admin/cases/bulk/reassign', {
+      method: 'POST',
+      body: JSON.stringify({ ...selection, department_id: departmentId })
+    })
   }
 
   async createCase(caseData) {
@@ -238,6 +323,21 @@ class ApiService {
     return this.request('/public/stats')
   }
 
+  async getStatsTrend(params = {}) {
+    const queryString = new URLSearchParams(params).toString()
+    const endpoint = queryString ? `/public/stats/trend?${queryString}` : '/public/stats/trend'
+    return this.request(endpoint)
+  }
+
+  // Live events (Server-Sent Events): snapshot, stats, case_created, case_updated, case_deleted, case_restored
+  subscribeEvents(handlers = {}) {
+    const source = new EventSource(`${this.baseURL}/events/stream`, { withCredentials: true })
+    Object.entries(handlers).forEach(([eventName, handler]) => {
+      source.addEventListener(eventName, (event) => handler(JSON.parse(event.data)))
+    })
+    return source
+  }
+
   async getRecentPatients() {
     return this.request('/notifications/recent-patients')
   }
@@ -12,8 +12,9 @@ db = SQLAlchemy()
 # Import all models
 from .base import Department
 from .content import Guideline, Knowledge, Activity, Contact
-from .patient import PatientCase, CaseAudit
+from .patient import PatientCase, CaseAudit, CaseDailyCount, CaseNameIndex
 from .user import AdminUser
+from .indexes import INDEX_REGISTRY
 
 __all__ = [
     'db',
@@ -24,5 +25,8 @@ __all__ = [
     'Contact',
     'PatientCase',
     'CaseAudit',
-    'AdminUser'
+    'CaseDailyCount',
+    'CaseNameIndex',
+    'AdminUser',
+    'INDEX_REGISTRY'
 ]
\ No newline at end of file
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Index registry: index ทั้งหมดของตารางที่ใช้บ่อย ประกาศไว้ที่เดียว
+db.create_all() จะสร้าง index เหล่านี้พร้อมตารางใหม่ ส่วนฐานข้อมูลเดิม
+ใช้ services/index_sync.py (หรือ scripts/sync_indexes.py) เพื่อสร้าง index ที่ยังขาด
+
+ชื่อ idx_* ตรงกับที่ scripts/optimize_db.py เคยสร้างไว้ จึงไม่สร้างซ้ำ
+"""
+
+from . import db
+from .content import Guideline, Knowledge, Activity, Contact
+from .patient import PatientCase, CaseAudit
+
+INDEX_REGISTRY = (
+    # patient_case: keyset pagination ของรายการ cases (ORDER BY created_at DESC, id DESC)
+    db.Index('ix_patient_case_created_at_id', PatientCase.created_at, PatientCase.id),
+    # patient_case: ค้นหา HN แบบตรงตัวและขึ้นต้นด้วย (text_pattern_ops ให้ LIKE 'xxx%' ใช้ index ได้ใน PostgreSQL)
+    db.Index('ix_patient_case_hn', PatientCase.hn, postgresql_ops={'hn': 'text_pattern_ops'}),
+    # patient_case: รายการ/นับ cases ที่ยังไม่ถูกลบตามช่วงเวลา และผู้ป่วยใหม่ล่าสุด
+    db.Index('ix_patient_case_deleted_created', PatientCase.is_deleted, PatientCase.created_at),
+    # patient_case: รายการ cases ของหน่วยงาน
+    db.Index(
+        'ix_patient_case_dept_deleted_created',
+        PatientCase.department_id, PatientCase.is_deleted, PatientCase.created_at
+    ),
+    # patient_case (partial): keyset pagination ของหน่วยงานเฉพาะ cases ที่ยังไม่ถูกลบ
+    db.Index(
+        'ix_patient_case_active_dept_created_id',
+        PatientCase.department_id, PatientCase.created_at, PatientCase.id,
+        postgresql_where=PatientCase.is_deleted == False,
+        sqlite_where=PatientCase.is_deleted == False
+    ),
+    # patient_case (partial): ตรวจ case ซ้ำ (hn, department_id, case_date) ก่อนเพิ่ม (ดู services/case_duplicates.py)
+    db.Index(
+        'ix_patient_case_duplicate_key',
+        PatientCase.hn, PatientCase.department_id, PatientCase.case_date,
+        postgresql_where=PatientCase.is_deleted == False,
+        sqlite_where=PatientCase.is_deleted == False
+    ),
+    # patient_case (unique, partial): key ของ upsert จาก HIS (ดู services/case_upsert.py)
+    db.Index(
+        'ux_patient_case_external_ref',
+        PatientCase.external_ref,
+        unique=True,
+        postgresql_where=PatientCase.external_ref.isnot(None),
+        sqlite_where=PatientCase.external_ref.isnot(None)
+    ),
+    # patient_case: สร้าง rollup ใหม่ (GROUP BY department_id, case_date)
+    db.Index('ix_patient_case_dept_case_date', PatientCase.department_id, PatientCase.case_date),
+
+    # case_audit: ประวัติของแต่ละ case และของผู้ใช้
+    db.Index('ix_case_audit_case_created', CaseAudit.case_id, CaseAudit.created_at),
+    db.Index('ix_case_audit_user_created', CaseAudit.user_id, CaseAudit.created_at),
+
+    # foreign key ของตารางเนื้อหา
+    db.Index('idx_guideline_dept', Guideline.department_id),
+    db.Index('idx_knowledge_dept', Knowledge.department_id),
+    db.Index('idx_activity_dept', Activity.department_id),
+    db.Index('idx_activity_created', Activity.created_at),
+    db.Index('idx_contact_dept', Contact.department_id),
+)
@@ -23,6 +23,9 @@ class PatientCase(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('admin_user.id'))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     is_deleted = db.Column(db.Boolean, default=False)
+    # key ของ case ที่ส่งมาจากระบบภายนอก (HIS) สำหรับ upsert: "hn:department_id:case_date"
+    # (ฐานข้อมูลเดิมได้คอลัมน์นี้ตอนเริ่ม app - ดู services/index_sync.ADDED_COLUMNS)
+    external_ref = db.Column(db.String(64))
     
     department = db.relationship('Department', backref=db.backref('cases', lazy=True))
     created_by_user = db.relationship('AdminUser', backref=db.backref('created_cases', lazy=True))
@@ -36,4 +39,22 @@ class CaseAudit(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     
     case = db.relationship('PatientCase', backref=db.backref('audit_logs', lazy=True))
-    user = db.relationship('AdminUser', backref=db.backref('case_audits', lazy=True))
\ No newline at end of file
+    user = db.relationship('AdminUser', backref=db.backref('case_audits', lazy=True))
+
+class CaseDailyCount(db.Model):
+    """ตารางสรุปจำนวน cases ต่อหน่วยงานต่อวัน (อัปเดตใน transaction เดียวกับการเขียน PatientCase)"""
+    __tablename__ = 'case_daily_count'
+    
+    department_id = db.Column(db.Integer, db.ForeignKey('department.id'), primary_key=True)
+    case_date = db.Column(db.Date, primary_key=True)
+    case_count = db.Column(db.Integer, nullable=False, default=0)  # cases ที่ยังไม่ถูกลบ
+    deleted_count = db.Column(db.Integer, nullable=False, default=0)  # cases ที่ถูกลบ (soft delete)
+    file_count = db.Column(db.Integer, nullable=False, default=0)  # cases ที่ยังไม่ถูกลบและมีไฟล์แนบ
+    link_count = db.Column(db.Integer, nullable=False, default=0)  # cases ที่ยังไม่ถูกลบและมีลิงก์ภายนอก
+
+class CaseNameIndex(db.Model):
+    """ชื่อผู้ป่วยที่ normalize แล้วสำหรับค้นหา (ดู services/case_name_index.py)"""
+    __tablename__ = 'case_name_index'
+    
+    case_id = db.Column(db.Integer, db.ForeignKey('patient_case.id', ondelete='CASCADE'), primary_key=True)
+    name_key = db.Column(db.Text, nullable=False)  # normalize_thai_name(first_name + ' ' + last_name)
@@ -6,6 +6,9 @@ from datetime import datetime, timezone, timedelta
 import os
 import json
 from models import db, Department, Guideline, Knowledge, Activity, Contact, PatientCase, CaseAudit, AdminUser
+from services.case_stats import get_dashboard_summary
+from services.write_behind import touch
+from utils.stats_cache import stats_cache, get_stats_cache_ttl
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -19,8 +22,7 @@ def admin_login():
         
         if user and check_password_hash(user.password_hash, password):
             login_user(user)
-            user.last_login = datetime.now(timezone.utc)
-            db.session.commit()
+            touch(user, 'last_login', datetime.now(timezone.utc))
             return redirect(url_for('admin.admin_dashboard'))
         else:
             flash('ชื่อผู้ใช้หรือรหัสผ่านไม่ถูกต้อง', 'error')
@@ -37,8 +39,7 @@ def admin_cases_login():
         
         if user and check_password_hash(user.password_hash, password):
             login_user(user)
-            user.last_login = datetime.now(timezone.utc)
-            db.session.commit()
+            touch(user, 'last_login', datetime.now(timezone.utc))
             return redirect(url_for('admin.admin_cases'))
         else:
             flash('ชื่อผู้ใช้หรือรหัสผ่านไม่ถูกต้อง', 'error')
@@ -54,13 +55,7 @@ def admin_logout():
 @admin_bp.route('/dashboard')
 @login_required
 def admin_dashboard():
-    stats = {
-        'departments': db.session.query(Department).count(),
-        'guidelines': db.session.query(Guideline).count(),
-        'knowledge': db.session.query(Knowledge).count(),
-        'activities': db.session.query(Activity).count(),
-        'total_cases': db.session.query(PatientCase).filter_by(is_deleted=False).count()
-    }
+    stats = stats_cache.get_or_set('dashboard_summary', get_dashboard_summary, get_stats_cache_ttl())
     return render_template('admin/dashboard.html', stats=stats)
 
 # Department management
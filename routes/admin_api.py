@@ -1,15 +1,40 @@
-from flask import Blueprint, jsonify, request, g
+from flask import Blueprint, jsonify, request, g, current_app, Response, stream_with_context
 from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 from datetime import datetime, timezone, timedelta
 import os
+import csv
 import json
 from models import db, Department, Guideline, Knowledge, Activity, Contact, PatientCase, CaseAudit, AdminUser
 # from services.backup_system import BackupSystem  # Moved to inside functions
 from utils.jwt_utils import JWTManager, jwt_required, admin_required, get_current_user
+from utils.pagination import keyset_paginate, MAX_PAGE_SIZE
+from services.case_stats import get_dashboard_summary
+from services.case_search import apply_case_search
+from services.case_list_cache import (
+    case_list_cache, case_list_cache_key, get_case_list_cache_ttl, ALL_DEPARTMENTS
+)
+from services.case_lookup import (
+    fetch_cases_by_ids, fetch_cases_by_hns, normalize_lookup_ids, normalize_lookup_hns, MAX_LOOKUP_ITEMS
+)
+from services.case_import import read_case_csv, import_cases
+from services.case_upsert import upsert_cases, MAX_UPSERT_ITEMS
+from services.case_bulk import (
+    case_selection, bulk_soft_delete_cases, bulk_restore_cases, bulk_reassign_cases, MAX_BULK_IDS
+)
+from services.listing_counts import get_listing_total, page_count
+from services.case_serializers import (
+    project_cases, serialize_case, serialize_case_rows, stream_case_rows, CASE_LIST_FIELDS
+)
+from services.case_duplicates import find_duplicate_case
+from services.write_behind import touch, touched_value
+from utils.stats_cache import cached_stats, stats_cache, get_stats_cache_ttl
 
 admin_api_bp = Blueprint('admin_api', __name__, url_prefix='/api/admin')
 
+# จำนวนแถวที่ไม่ผ่านสูงสุดที่ส่งกลับใน response ของการ import (rejected_count คือจำนวนทั้งหมด)
+MAX_REPORTED_REJECTS = 1000
+
 # Authentication API endpoints
 @admin_api_bp.route('/auth/login', methods=['POST'])
 def api_admin_login():
@@ -28,8 +53,8 @@ def api_admin_login():
         user = db.session.query(AdminUser).filter_by(username=username).first()
         
         if user and check_password_hash(user.password_hash, password):
-            user.last_login = datetime.now(timezone.utc)
-            db.session.commit()
+            # last_login เขียนแบบ write-behind (ไม่ commit ใน request)
+            touch(user, 'last_login', datetime.now(timezone.utc))
             
             # Generate JWT token
             token = JWTManager.generate_token(
@@ -66,38 +91,42 @@ def api_get_contacts():
         department_id = request.args.get('department_id', type=int)
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        exact_total = request.args.get('exact_total', 'false').lower() == 'true'
         
-        query = db.session.query(Contact).filter_by(is_deleted=False)
+        query = db.session.query(Contact)
         
         if search:
             query = query.filter(
                 db.or_(
-                    Contact.first_name.contains(search),
-                    Contact.last_name.contains(search),
+                    Contact.line_id.contains(search),
                     Contact.email.contains(search),
-                    Contact.phone.contains(search)
+                    Contact.phone.contains(search),
+                    Contact.other_contact.contains(search)
                 )
             )
         
         if department_id:
             query = query.filter_by(department_id=department_id)
         
-        contacts = query.order_by(Contact.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        # จำนวนรวมจาก cache หรือค่าประมาณ แทน COUNT ทุกครั้งที่เปลี่ยนหน้า (ดู services/listing_counts.py)
+        total, total_estimated = get_listing_total(
+            query, Contact.__tablename__,
+            {'search': search, 'department_id': department_id}, exact=exact_total
+        )
+        contacts = query.order_by(Contact.id).paginate(
+            page=page, per_page=per_page, error_out=False, count=False
         )
         
         contacts_data = []
         for contact in contacts.items:
             contacts_data.append({
                 'id': contact.id,
-                'first_name': contact.first_name,
-                'last_name': contact.last_name,
-                'email': contact.email,
-                'phone': contact.phone,
-                'position': contact.position,
                 'department_id': contact.department_id,
                 'department_name': contact.department.name if contact.department else None,
-                'created_at': contact.created_at.isoformat() if contact.created_at else None
+                'line_id': contact.line_id,
+                'email': contact.email,
+                'phone': contact.phone,
+                'other_contact': contact.other_contact
             })
         
         return jsonify({
@@ -105,9 +134,10 @@ def api_get_contacts():
             'contacts': contacts_data,
             'pagination': {
                 'page': contacts.page,
-                'pages': contacts.pages,
+                'pages': page_count(total, contacts.per_page),
                 'per_page': contacts.per_page,
-                'total': contacts.total
+                'total': total,
+                'total_estimated': total_estimated
             }
         })
     except Exception as e:
@@ -263,19 +293,26 @@ def api_get_cases():
         search = request.args.get('search', '')
         department_id = request.args.get('department_id', type=int)
         status = request.args.get('status')
-        page = request.args.get('page', 1, type=int)
+        page = request.args.get('page', type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        exact_total = request.args.get('exact_total', 'false').lower() == 'true'
+        
+        # ผลลัพธ์ของ filter ชุดเดียวกันจาก cache (ล้างเมื่อ cases ของหน่วยงานนั้นเปลี่ยน)
+        cache_key = case_list_cache_key(
+            search, department_id, status, cursor, per_page,
+            page=page, include_total=include_total, exact_total=exact_total
+        )
+        cached_body = case_list_cache.get(cache_key)
+        if cached_body is not None:
+            return current_app.response_class(cached_body, mimetype='application/json')
+        cache_generation = case_list_cache.generation
         
         query = db.session.query(PatientCase).filter_by(is_deleted=False)
         
-        if search:
-            query = query.filter(
-                db.or_(
-                    PatientCase.hn.contains(search),
-                    PatientCase.first_name.contains(search),
-                    PatientCase.last_name.contains(search)
-                )
-            )
+        # HN ไปใช้ index ของ hn, ชื่อไปค้นหาใน first_name/last_name (ดู services/case_search.py)
+        query, search_plan = apply_case_search(query, search)
         
         if department_id:
             query = query.filter_by(department_id=department_id)
@@ -283,37 +320,147 @@ def api_get_cases():
         if status:
             query = query.filter_by(status=status)
         
-        cases = query.order_by(PatientCase.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # จำนวนรวมจาก cache หรือค่าประมาณ (ดู services/listing_counts.py)
+        count_query = query
+        count_filters = {'search': search, 'department_id': department_id, 'status': status}
         
-        cases_data = []
-        for case in cases.items:
-            cases_data.append({
-                'id': case.id,
-                'hn': case.hn,
-                'first_name': case.first_name,
-                'last_name': case.last_name,
-                'age': case.age,
-                'gender': case.gender,
-                'diagnosis': case.diagnosis,
-                'treatment': case.treatment,
-                'status': case.status,
-                'case_date': case.case_date.isoformat() if case.case_date else None,
-                'department_id': case.department_id,
-                'department_name': case.department.name if case.department else None,
-                'created_at': case.created_at.isoformat() if case.created_at else None
-            })
+        # เลือกเฉพาะคอลัมน์ที่ส่งกลับ และ join ชื่อหน่วยงานใน query เดียวกัน
+        query = project_cases(query, CASE_LIST_FIELDS)
         
-        return jsonify({
-            'success': True,
-            'cases': cases_data,
-            'pagination': {
+        total_estimated = False
+        if page:
+            # แบบเดิม (OFFSET) สำหรับ client ที่ยังส่ง page มา
+            total, total_estimated = get_listing_total(
+                count_query, PatientCase.__tablename__, count_filters, exact=exact_total
+            )
+            cases = query.order_by(PatientCase.created_at.desc()).paginate(
+                page=page, per_page=per_page, error_out=False, count=False
+            )
+            items = cases.items
+            pagination = {
                 'page': cases.page,
-                'pages': cases.pages,
+                'pages': page_count(total, cases.per_page),
                 'per_page': cases.per_page,
-                'total': cases.total
+                'total': total,
+                'total_estimated': total_estimated
+            }
+        else:
+            # keyset pagination: ทุกหน้าใช้เวลาเท่ากัน ไม่ต้อง COUNT ทุกครั้ง
+            total = None
+            if include_total and not cursor:
+                total, total_estimated = get_listing_total(
+                    count_query, PatientCase.__tablename__, count_filters, exact=exact_total
+                )
+            try:
+                items, next_cursor = keyset_paginate(
+                    query, PatientCase.created_at, PatientCase.id, cursor, per_page
+                )
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            pagination = {
+                'per_page': min(per_page, MAX_PAGE_SIZE),
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None,
+                'total': total,
+                'total_estimated': total_estimated
             }
+        
+        cases_data = serialize_case_rows(items, CASE_LIST_FIELDS)
+        
+        response = jsonify({
+            'success': True,
+            'cases': cases_data,
+            'pagination': pagination,
+            'search_mode': search_plan.mode if search_plan else None
+        })
+        case_list_cache.set(
+            cache_key, response.get_data(), department_id or ALL_DEPARTMENTS,
+            get_case_list_cache_ttl(), cache_generation
+        )
+        return response
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'เกิดข้อผิดพลาด: {str(e)}'}), 500
+
+@admin_api_bp.route('/cases/stream', methods=['GET'])
+@jwt_required
+def api_stream_cases():
+    """
+    API endpoint to stream cases as newline-delimited JSON (one case per line)
+    สำหรับงานรายงานที่ดึงข้อมูลช่วงยาว ๆ: กรองด้วย department_id, start_date, end_date (case_date)
+    เรียงตาม case_date และ id
+    """
+    try:
+        department_ids = []
+        for value in request.args.getlist('department_id'):
+            department_ids.extend(int(item) for item in value.split(',') if item.strip())
+    except ValueError:
+        return jsonify({'success': False, 'message': 'department_id ต้องเป็นตัวเลข'}), 400
+    
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'รูปแบบวันที่ไม่ถูกต้อง (YYYY-MM-DD)'}), 400
+    
+    query = db.session.query(PatientCase).filter(PatientCase.is_deleted == False)
+    if department_ids:
+        query = query.filter(PatientCase.department_id.in_(department_ids))
+    if start_date:
+        query = query.filter(PatientCase.case_date >= start_date)
+    if end_date:
+        query = query.filter(PatientCase.case_date <= end_date)
+    query = query.order_by(PatientCase.case_date, PatientCase.id)
+    
+    def generate():
+        try:
+            for batch in stream_case_rows(query, CASE_LIST_FIELDS):
+                yield ''.join(json.dumps(case, ensure_ascii=False) + '\n' for case in batch)
+        except Exception as e:
+            # เริ่มส่ง response ไปแล้ว เปลี่ยน status ไม่ได้ - แจ้งข้อผิดพลาดเป็นบรรทัดสุดท้าย
+            yield json.dumps({'error': f'เกิดข้อผิดพลาด: {str(e)}'}, ensure_ascii=False) + '\n'
+        finally:
+            db.session.remove()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
+
+@admin_api_bp.route('/cases/lookup', methods=['POST'])
+@jwt_required
+def api_lookup_cases():
+    """API endpoint to fetch many cases by ids or HNs in one request"""
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'success': False, 'message': 'ไม่พบข้อมูลที่ต้องการค้นหา'}), 400
+        
+        ids = data.get('ids')
+        hns = data.get('hns')
+        if (ids is None) == (hns is None):
+            return jsonify({'success': False, 'message': 'กรุณาระบุ ids หรือ hns อย่างใดอย่างหนึ่ง'}), 400
+        
+        values = ids if ids is not None else hns
+        if not isinstance(values, list) or not values:
+            return jsonify({'success': False, 'message': 'ids หรือ hns ต้องเป็นรายการที่ไม่ว่าง'}), 400
+        if len(values) > MAX_LOOKUP_ITEMS:
+            return jsonify({'success': False, 'message': f'ค้นหาได้ไม่เกิน {MAX_LOOKUP_ITEMS} รายการต่อครั้ง'}), 400
+        
+        try:
+            if ids is not None:
+                cases, missing = fetch_cases_by_ids(normalize_lookup_ids(ids))
+            else:
+                cases, missing = fetch_cases_by_hns(normalize_lookup_hns(hns))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'cases': cases,
+            'missing': missing,
+            'count': len(cases)
         })
     except Exception as e:
         return jsonify({'success': False, 'message': f'เกิดข้อผิดพลาด: {str(e)}'}), 500
@@ -327,15 +474,16 @@ def api_create_case():
         if not data:
             return jsonify({'success': False, 'message': 'ไม่พบข้อมูลเคส'}), 400
         
-        hn = data.get('hn')
+        hn = (data.get('hn') or '').strip()
         first_name = data.get('first_name')
         last_name = data.get('last_name')
-        age = data.get('age')
-        gender = data.get('gender')
-        diagnosis = data.get('diagnosis')
-        treatment = data.get('treatment')
         department_id = data.get('department_id')
         case_date = data.get('case_date')
+        # ยืนยันเพิ่ม case ซ้ำเฉพาะ true (JSON boolean หรือข้อความ 'true' แบบเดียวกับ allow_duplicates ของ import)
+        allow_duplicate = data.get('allow_duplicate', False)
+        allow_duplicate = allow_duplicate is True or (
+            isinstance(allow_duplicate, str) and allow_duplicate.lower() == 'true'
+        )
         
         if not hn or not first_name or not last_name:
             return jsonify({'success': False, 'message': 'กรุณากรอกข้อมูลที่จำเป็น'}), 400
@@ -344,29 +492,39 @@ def api_create_case():
             return jsonify({'success': False, 'message': 'กรุณาเลือกแผนก'}), 400
         
         # Check if department exists
-        dept = db.session.query(Department).get(department_id)
+        dept = db.session.get(Department, department_id)
         if not dept:
             return jsonify({'success': False, 'message': 'ไม่พบแผนกที่เลือก'}), 400
         
-        # Parse case_date if provided
-        parsed_case_date = None
+        # Parse case_date if provided (ค่าเริ่มต้น: วันนี้)
+        parsed_case_date = datetime.now().date()
         if case_date:
             try:
-                parsed_case_date = datetime.fromisoformat(case_date.replace('Z', '+00:00'))
+                parsed_case_date = datetime.fromisoformat(case_date.replace('Z', '+00:00')).date()
             except ValueError:
                 return jsonify({'success': False, 'message': 'รูปแบบวันที่ไม่ถูกต้อง'}), 400
         
+        # HN เดียวกัน หน่วยงานเดียวกัน วันเดียวกัน: ตอบ 409 พร้อม case เดิม (ส่ง allow_duplicate เพื่อยืนยันเพิ่ม)
+        if not allow_duplicate:
+            existing = find_duplicate_case(hn, dept.id, parsed_case_date)
+            if existing:
+                return jsonify({
+                    'success': False,
+                    'message': 'มีเคสของ HN นี้ในหน่วยงานและวันที่เดียวกันอยู่แล้ว',
+                    'duplicate': True,
+                    'case': existing
+                }), 409
+        
         new_case = PatientCase(
             hn=hn,
             first_name=first_name,
             last_name=last_name,
-            age=age,
-            gender=gender,
-            diagnosis=diagnosis,
-            treatment=treatment,
-            department_id=department_id,
+            department_id=dept.id,
             case_date=parsed_case_date,
-            status='active',
+            notes=data.get('notes'),
+            external_link=data.get('external_link'),
+            link_type=data.get('link_type'),
+            created_by=g.current_user['user_id'],
             created_at=datetime.now(timezone.utc),
             is_deleted=False
         )
@@ -377,26 +535,76 @@ def api_create_case():
         return jsonify({
             'success': True,
             'message': 'เพิ่มเคสสำเร็จ',
-            'case': {
-                'id': new_case.id,
-                'hn': new_case.hn,
-                'first_name': new_case.first_name,
-                'last_name': new_case.last_name,
-                'age': new_case.age,
-                'gender': new_case.gender,
-                'diagnosis': new_case.diagnosis,
-                'treatment': new_case.treatment,
-                'status': new_case.status,
-                'case_date': new_case.case_date.isoformat() if new_case.case_date else None,
-                'department_id': new_case.department_id,
-                'department_name': dept.name,
-                'created_at': new_case.created_at.isoformat()
-            }
+            'case': serialize_case(new_case)
         })
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': f'เกิดข้อผิดพลาด: {str(e)}'}), 500
 
+@admin_api_bp.route('/cases/import', methods=['POST'])
+@jwt_required
+def api_import_cases():
+    """
+    API endpoint to import cases from CSV (multipart field 'file' หรือ body แบบ text/csv)
+    ตัวเลือก: dry_run=true (ตรวจสอบอย่างเดียว), allow_duplicates=true
+    """
+    try:
+        upload = request.files.get('file')
+        data = upload.read() if upload else request.get_data()
+        if not data:
+            return jsonify({'success': False, 'message': 'ไม่พบไฟล์ CSV'}), 400
+        
+        options = request.form if upload else request.args
+        dry_run = options.get('dry_run', 'false').lower() == 'true'
+        allow_duplicates = options.get('allow_duplicates', 'false').lower() == 'true'
+        
+        try:
+            records = read_case_csv(data)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return jsonify({'success': False, 'message': f'อ่านไฟล์ CSV ไม่ได้: {str(e)}'}), 400
+        
+        result = import_cases(
+            records,
+            created_by=g.current_user['user_id'],
+            allow_duplicates=allow_duplicates,
+            dry_run=dry_run
+        )
+        
+        return jsonify({
+            'success': True,
+            'dry_run': dry_run,
+            'total': result['total'],
+            'valid': result['valid'],
+            'imported': result['imported'],
+            'rejected_count': len(result['rejected']),
+            'rejected': result['rejected'][:MAX_REPORTED_REJECTS]
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'เกิดข้อผิดพลาด: {str(e)}'}), 500
+
+@admin_api_bp.route('/cases/upsert', methods=['POST'])
+@jwt_required
+def api_upsert_cases():
+    """
+    API endpoint to insert or update cases by (hn, department_code, case_date) for machine integrations
+    body: {"cases": [...]} หรือ array ของ records - ส่งซ้ำได้โดยไม่เกิด case ซ้ำ
+    """
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('cases') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'message': 'กรุณาส่งรายการ cases'}), 400
+        if len(items) > MAX_UPSERT_ITEMS:
+            return jsonify({'success': False, 'message': f'ส่งได้ไม่เกิน {MAX_UPSERT_ITEMS} รายการต่อครั้ง'}), 400
+        
+        result = upsert_cases(items, created_by=g.current_user['user_id'])
+        
+        return jsonify(dict(result, success=True))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'เกิดข้อผิดพลาด: {str(e)}'}), 500
+
 @admin_api_bp.route('/cases/<int:case_id>', methods=['PUT'])
 @jwt_required
 def api_update_case(case_id):
@@ -499,6 +707,107 @@ def api_delete_case(case_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': f'เกิดข้อผิดพลาด: {str(e)}'}), 500
 
+def _bulk_case_conditions(data):
+    """
+    เงื่อนไขเลือก cases จาก body ของ bulk endpoints:
+    {"ids": [...]} และ/หรือ {"filter": {"department_id": ..., "start_date": ..., "end_date": ...}}
+
+    Raises:
+        ValueError: ถ้าข้อมูลไม่ถูกต้องหรือไม่มีเงื่อนไข
+    """
+    if not isinstance(data, dict):
+        raise ValueError('ข้อมูลต้องเป็น JSON object')
+    ids = data.get('ids') or []
+    if not isinstance(ids, list):
+        raise ValueError('ids ต้องเป็นรายการ (array)')
+    ids = normalize_lookup_ids(ids)
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f'ระบุ id ได้ไม่เกิน {MAX_BULK_IDS} รายการต่อครั้ง')
+    
+    filters = data.get('filter') or {}
+    if not isinstance(filters, dict):
+        raise ValueError('filter ต้องเป็น object')
+    department_ids = filters.get('department_id')
+    if department_ids is not None and not isinstance(department_ids, list):
+        department_ids = [department_ids]
+    try:
+        department_ids = [int(value) for value in department_ids or []]
+    except (TypeError, ValueError):
+        raise ValueError('department_id ต้องเป็นตัวเลข')
+    try:
+        start_date = filters.get('start_date')
+        end_date = filters.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except (TypeError, ValueError):
+        raise ValueError('รูปแบบวันที่ไม่ถูกต้อง (YYYY-MM-DD)')
+    
+    return case_selection(ids, department_ids, start_date, end_date)
+
+@admin_api_bp.route('/cases/bulk/delete', methods=['POST'])
+@jwt_required
+@admin_required
+def api_bulk_delete_cases():
+    """API endpoint to soft-delete many cases (by ids or filter) with one UPDATE"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            conditions = _bulk_case_conditions(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        count = bulk_soft_delete_cases(conditions)
+        return jsonify({'success': True, 'message': f'ลบเคสสำเร็จ {count} รายการ', 'count': count})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'เกิดข้อผิดพลาด: {str(e)}'}), 500
+
+@admin_api_bp.route('/cases/bulk/restore', methods=['POST'])
+@jwt_required
+@admin_required
+def api_bulk_restore_cases():
+    """API endpoint to restore many soft-deleted cases (by ids or filter) with one UPDATE"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            conditions = _bulk_case_conditions(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        count = bulk_restore_cases(conditions)
+        return jsonify({'success': True, 'message': f'นำเคสกลับมาสำเร็จ {count} รายการ', 'count': count})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'เกิดข้อผิดพลาด: {str(e)}'}), 500
+
+@admin_api_bp.route('/cases/bulk/reassign', methods=['POST'])
+@jwt_required
+@admin_required
+def api_bulk_reassign_cases():
+    """
+    API endpoint to move many cases (by ids or filter) to another department with one UPDATE
+    body: {"department_id": หน่วยงานปลายทาง, "ids": [...] หรือ "filter": {...}}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            conditions = _bulk_case_conditions(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        try:
+            department_id = int(data.get('department_id'))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'กรุณาเลือกหน่วยงานปลายทาง'}), 400
+        if not db.session.get(Department, department_id):
+            return jsonify({'success': False, 'message': 'ไม่พบหน่วยงานปลายทาง'}), 404
+        
+        count = bulk_reassign_cases(conditions, department_id)
+        return jsonify({'success': True, 'message': f'ย้ายเคสสำเร็จ {count} รายการ', 'count': count})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'เกิดข้อผิดพลาด: {str(e)}'}), 500
+
 # Backups API endpoints
 @admin_api_bp.route('/backups', methods=['GET'])
 @jwt_required
@@ -632,6 +941,7 @@ def api_get_current_user():
     """API endpoint to get current user info"""
     try:
         current_user = get_current_user()
+        last_login = touched_value(current_user, 'last_login')
         return jsonify({
             'success': True,
             'user': {
@@ -639,7 +949,7 @@ def api_get_current_user():
                 'username': current_user.username,
                 'email': current_user.email,
                 'role': current_user.role,
-                'last_login': current_user.last_login.isoformat() if current_user.last_login else None
+                'last_login': last_login.isoformat() if last_login else None
             }
         })
     except Exception as e:
@@ -648,25 +958,23 @@ def api_get_current_user():
 # Dashboard API endpoints
 @admin_api_bp.route('/dashboard/stats', methods=['GET'])
 @jwt_required
+@cached_stats
 def api_dashboard_stats():
     """API endpoint for dashboard statistics"""
     try:
-        # Get statistics
-        total_patients = db.session.query(PatientCase).filter_by(is_deleted=False).count()
-        total_doctors = db.session.query(Contact).filter_by(is_deleted=False).count()
-        total_cases = db.session.query(PatientCase).filter_by(is_deleted=False).count()
-        pending_cases = db.session.query(PatientCase).filter(
-            PatientCase.is_deleted == False,
-            PatientCase.status == 'pending'
-        ).count()
+        # ตัวนับทั้งหมดมาจาก statement เดียว (ใช้ cache ร่วมกับหน้า dashboard HTML)
+        summary = stats_cache.get_or_set('dashboard_summary', get_dashboard_summary, get_stats_cache_ttl())
         
         return jsonify({
             'success': True,
             'stats': {
-                'total_patients': total_patients,
-                'total_doctors': total_doctors,
-                'total_cases': total_cases,
-                'pending_cases': pending_cases
+                'departments': summary['departments'],
+                'contacts': summary['contacts'],
+                'cases': summary['total_cases'],
+                'today_cases': summary['today_cases'],
+                'total_patients': summary['total_cases'],
+                'total_doctors': summary['contacts'],
+                'total_cases': summary['total_cases']
             }
         })
     except Exception as e:
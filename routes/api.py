@@ -1,10 +1,24 @@
-from flask import Blueprint, jsonify, request
-from flask_login import login_required
+from flask import Blueprint, jsonify, request, Response, current_app
+from flask_login import login_required, current_user
 from datetime import datetime, timezone, timedelta
+import queue
 from models import db, Department, PatientCase
+from services.case_stats import get_case_stats
+from services.case_trends import get_case_trend
+from services.case_analytics import get_case_analytics
+from services.stats_snapshot import get_stats_snapshot, snapshot_info
+from services.case_serializers import (
+    project_cases, serialize_case_rows, RECENT_PATIENT_FIELDS, PUBLIC_RECENT_PATIENT_FIELDS
+)
+from services.live_events import case_event_bus, format_sse, open_event_subscription
+from utils.stats_cache import cached_stats, stats_cache, get_stats_cache_ttl
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Server-Sent Events: ส่ง heartbeat ทุกกี่วินาที และให้ client reconnect หลังกี่ ms
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 5000
+
 @api_bp.route('/notifications/recent-patients')
 @login_required
 def get_recent_patients():
@@ -13,25 +27,15 @@ def get_recent_patients():
         # คำนวณวันที่ 3 วันก่อน
         three_days_ago = datetime.now(timezone.utc) - timedelta(days=3)
         
-        # ดึงข้อมูลผู้ป่วยที่สร้างในช่วง 3 วันก่อน
-        recent_patients = db.session.query(PatientCase).join(Department).filter(
+        # ดึงข้อมูลผู้ป่วยที่สร้างในช่วง 3 วันก่อน (เฉพาะคอลัมน์ที่ส่งกลับ พร้อมชื่อหน่วยงานใน query เดียว)
+        query = db.session.query(PatientCase).join(Department).filter(
             PatientCase.created_at >= three_days_ago,
             PatientCase.is_deleted == False
-        ).order_by(PatientCase.created_at.desc()).all()
+        ).order_by(PatientCase.created_at.desc())
+        rows = project_cases(query, RECENT_PATIENT_FIELDS, join_department=False).all()
         
         # แปลงข้อมูลเป็น JSON
-        patients_data = []
-        for patient in recent_patients:
-            patients_data.append({
-                'id': patient.id,
-                'hn': patient.hn,
-                'first_name': patient.first_name,
-                'last_name': patient.last_name,
-                'department_name': patient.department.name,
-                'department_code': patient.department.code,
-                'created_at': patient.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'case_date': patient.case_date.strftime('%Y-%m-%d') if patient.case_date else None
-            })
+        patients_data = serialize_case_rows(rows, RECENT_PATIENT_FIELDS)
         
         return jsonify({
             'success': True,
@@ -49,24 +53,32 @@ def get_recent_patients():
 def get_recent_patients_public():
     """API สาธารณะสำหรับดึงข้อมูลผู้ป่วยใหม่ (ไม่แสดงข้อมูลส่วนตัว)"""
     try:
+        # ใช้สรุปจาก snapshot ถ้ามี (ไม่ต้องเชื่อมต่อฐานข้อมูล)
+        snapshot = get_stats_snapshot()
+        if snapshot is not None:
+            patients_data = []
+            for row in snapshot['recent_cases']:
+                item = {key: value for key, value in row.items() if key != 'count'}
+                patients_data.extend(dict(item) for _ in range(row['count']))
+            return jsonify({
+                'success': True,
+                'data': patients_data,
+                'count': len(patients_data),
+                'snapshot': snapshot_info(snapshot)
+            })
+        
         # คำนวณวันที่ 7 วันก่อน
         seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
         
         # ดึงข้อมูลผู้ป่วยที่สร้างในช่วง 7 วันก่อน (เฉพาะข้อมูลที่ไม่ระบุตัวตน)
-        recent_patients = db.session.query(PatientCase).join(Department).filter(
+        query = db.session.query(PatientCase).join(Department).filter(
             PatientCase.created_at >= seven_days_ago,
             PatientCase.is_deleted == False
-        ).order_by(PatientCase.created_at.desc()).all()
+        ).order_by(PatientCase.created_at.desc())
+        rows = project_cases(query, PUBLIC_RECENT_PATIENT_FIELDS, join_department=False).all()
         
         # แปลงข้อมูลเป็น JSON (ไม่แสดงข้อมูลส่วนตัว)
-        patients_data = []
-        for patient in recent_patients:
-            patients_data.append({
-                'department_name': patient.department.name,
-                'department_code': patient.department.code,
-                'created_date': patient.created_at.strftime('%Y-%m-%d'),
-                'case_date': patient.case_date.strftime('%Y-%m-%d') if patient.case_date else None
-            })
+        patients_data = serialize_case_rows(rows, PUBLIC_RECENT_PATIENT_FIELDS)
         
         return jsonify({
             'success': True,
@@ -81,42 +93,245 @@ def get_recent_patients_public():
         }), 500
 
 @api_bp.route('/public/stats')
+@cached_stats
 def get_public_stats():
     """API สำหรับดึงสถิติสาธารณะ"""
     try:
-        # จำนวน cases ทั้งหมด
-        total_cases = db.session.query(PatientCase).filter_by(is_deleted=False).count()
-        
-        # จำนวน cases ตามหน่วยงาน
-        dept_stats = []
-        departments = db.session.query(Department).all()
-        
-        for dept in departments:
-            case_count = db.session.query(PatientCase).filter_by(
-                department_id=dept.id, 
-                is_deleted=False
-            ).count()
-            
-            if case_count > 0:
-                dept_stats.append({
-                    'department_name': dept.name,
-                    'department_code': dept.code,
-                    'case_count': case_count
-                })
-        
-        # เรียงตามจำนวน case จากมากไปน้อย
-        dept_stats.sort(key=lambda x: x['case_count'], reverse=True)
+        # จำนวน cases ทั้งหมดและตามหน่วยงาน (จาก snapshot หรือ GROUP BY query เดียว)
+        snapshot = get_stats_snapshot()
+        case_stats = snapshot['case_stats'] if snapshot is not None else get_case_stats()
+        dept_stats = [
+            {
+                'department_name': dept['name'],
+                'department_code': dept['code'],
+                'case_count': dept['count']
+            }
+            for dept in case_stats['departments']
+        ]
         
         return jsonify({
             'success': True,
             'data': {
-                'total_cases': total_cases,
+                'total_cases': case_stats['total_cases'],
+                'approximate': [],
+                'cases_with_files': case_stats['cases_with_files'],
+                'cases_with_links': case_stats['cases_with_links'],
                 'department_stats': dept_stats
+            },
+            'snapshot': snapshot_info(snapshot) if snapshot is not None else None
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'เกิดข้อผิดพลาดในการดึงข้อมูลสถิติ'
+        }), 500
+
+@api_bp.route('/public/stats/trend')
+@cached_stats
+def get_public_stats_trend():
+    """API สำหรับดึงแนวโน้มจำนวนผู้ป่วยตามช่วงเวลา (รายวัน/รายสัปดาห์/รายเดือน)"""
+    try:
+        period = request.args.get('period', 'month')
+        department_id = request.args.get('department_id', type=int)
+        department_code = request.args.get('department', '')
+        
+        try:
+            start = request.args.get('start')
+            end = request.args.get('end')
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'รูปแบบวันที่ไม่ถูกต้อง (YYYY-MM-DD)'
+            }), 400
+        
+        department_ids = None
+        if department_id:
+            department_ids = [department_id]
+        elif department_code and department_code.lower() != 'all':
+            dept = db.session.query(Department).filter(
+                db.func.lower(Department.code) == department_code.lower()
+            ).first()
+            department_ids = [dept.id] if dept else [-1]
+        
+        try:
+            trend = get_case_trend(period, start, end, department_ids)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': trend
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'เกิดข้อผิดพลาดในการดึงข้อมูลแนวโน้ม'
+        }), 500
+
+def _parse_bool_arg(name):
+    """อ่าน query parameter แบบ true/false (None ถ้าไม่ได้ส่งมา)"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'{name} ต้องเป็น true หรือ false')
+
+def _parse_list_arg(name):
+    """อ่าน query parameter แบบหลายค่า (?x=a&x=b หรือ ?x=a,b)"""
+    values = []
+    for value in request.args.getlist(name):
+        values.extend(item.strip() for item in value.split(',') if item.strip())
+    return values
+
+@api_bp.route('/analytics')
+@login_required
+def get_analytics():
+    """
+    API สำหรับวิเคราะห์จำนวนผู้ป่วยแบบ ad hoc จาก analytics cube ในหน่วยความจำ
+    
+    Query parameters:
+        group_by: มิติคั่นด้วย comma (department, year, month, week, day, has_file, has_link, link_type)
+        department_id / department: กรองหน่วยงาน (id หรือรหัส)
+        start, end: ช่วง case_date (YYYY-MM-DD)
+        has_file, has_link: true/false
+        link_type: ประเภทลิงก์ (หลายค่าได้)
+    """
+    try:
+        try:
+            group_by = _parse_list_arg('group_by')
+            start = request.args.get('start')
+            end = request.args.get('end')
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+            has_file = _parse_bool_arg('has_file')
+            has_link = _parse_bool_arg('has_link')
+            department_ids = [int(value) for value in _parse_list_arg('department_id')]
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'พารามิเตอร์ไม่ถูกต้อง: {str(e)}'
+            }), 400
+        
+        department_codes = [code.lower() for code in _parse_list_arg('department')]
+        if department_codes:
+            department_ids += [
+                dept_id for (dept_id,) in db.session.query(Department.id).filter(
+                    db.func.lower(Department.code).in_(department_codes)
+                )
+            ] or [-1]
+        
+        try:
+            result = get_case_analytics(
+                group_by,
+                department_ids=department_ids or None,
+                start=start,
+                end=end,
+                has_file=has_file,
+                has_link=has_link,
+                link_types=_parse_list_arg('link_type') or None
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        # เติมชื่อหน่วยงาน (ตาราง department มีขนาดเล็ก)
+        if 'department' in group_by and result['rows']:
+            departments = {
+                dept.id: dept for dept in db.session.query(Department).filter(
+                    Department.id.in_({row['department'] for row in result['rows']})
+                )
             }
+            for row in result['rows']:
+                dept = departments.get(row['department'])
+                row['department_name'] = dept.name if dept else None
+                row['department_code'] = dept.code if dept else None
+        
+        return jsonify({
+            'success': True,
+            'data': result
         })
     
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'เกิดข้อผิดพลาดในการวิเคราะห์ข้อมูล'
+        }), 500
+
+@api_bp.route('/events/stream')
+def event_stream():
+    """
+    Server-Sent Events: สถิติแบบ real-time และการแจ้งเตือนผู้ป่วยใหม่
+    
+    Events:
+        snapshot: สถิติปัจจุบัน (ส่งครั้งแรกเมื่อเชื่อมต่อ)
+        stats: การเปลี่ยนแปลงจำนวนผู้ป่วยตามหน่วยงาน (delta)
+        case_created / case_updated / case_deleted / case_restored: ข้อมูล case
+            (hn และชื่อผู้ป่วยส่งเฉพาะผู้ใช้ที่เข้าสู่ระบบ)
+    
+    ปิดใน serverless (404) และตอบ 503 เมื่อจำนวน stream ครบ SSE_MAX_CONNECTIONS
+    (client ใช้การ poll แทน)
+    """
+    if not current_app.config.get('LIVE_EVENTS_ENABLED'):
+        return jsonify({
+            'success': False,
+            'error': 'ไม่ได้เปิดใช้งาน live events'
+        }), 404
+    
+    include_private = current_user.is_authenticated
+    last_event_id = request.headers.get('Last-Event-ID')
+    
+    try:
+        case_stats = stats_cache.get_or_set('case_stats', get_case_stats, get_stats_cache_ttl())
+        snapshot = {
+            'total_cases': case_stats['total_cases'],
+            'dept_stats': [
+                {'name': dept['name'], 'code': dept['code'], 'count': dept['count']}
+                for dept in case_stats['departments']
+            ]
+        }
     except Exception as e:
         return jsonify({
             'success': False,
             'error': 'เกิดข้อผิดพลาดในการดึงข้อมูลสถิติ'
-        }), 500
\ No newline at end of file
+        }), 500
+    
+    subscriber = open_event_subscription(
+        db.engine, last_event_id, current_app.config['SSE_MAX_CONNECTIONS']
+    )
+    if subscriber is None:
+        return jsonify({
+            'success': False,
+            'error': 'จำนวนการเชื่อมต่อ live events เต็มแล้ว'
+        }), 503, {'Retry-After': str(SSE_RETRY_MS // 1000)}
+    
+    def generate():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            yield format_sse({'id': 0, 'event': 'snapshot', 'data': snapshot})
+            while True:
+                try:
+                    message = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # heartbeat เพื่อไม่ให้ proxy ตัดการเชื่อมต่อ
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(message, include_private)
+        finally:
+            case_event_bus.unsubscribe(subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
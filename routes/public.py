@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, abort, redirect, url_for, send_file, flash, jsonify
+from flask import Blueprint, render_template, abort, redirect, url_for, send_file, flash, jsonify, make_response
 import os
-from models import db, Department, Guideline, PatientCase
+from models import db, Department, Guideline
+from services.case_stats import get_public_stats
+from services.stats_snapshot import get_stats_snapshot, snapshot_info
+from utils.stats_cache import cached_stats
 
 public_bp = Blueprint('public', __name__)
 
@@ -79,46 +82,16 @@ def download_guideline(guideline_id):
     return redirect(url_for('public.department', dept_id=guideline.department_id))
 
 @public_bp.route('/stats')
+@cached_stats
 def stats():
     """หน้าแสดงสถิติสาธารณะ"""
-    # ดึงข้อมูลสถิติจากฐานข้อมูล
+    # ดึงข้อมูลสถิติจาก snapshot หรือจากฐานข้อมูล (GROUP BY query เดียว)
     try:
-        # จำนวน cases ทั้งหมด
-        total_cases = db.session.query(PatientCase).filter_by(is_deleted=False).count()
+        snapshot = get_stats_snapshot()
+        if snapshot is not None:
+            return render_template('stats.html', stats=snapshot['public_stats'], snapshot=snapshot_info(snapshot))
         
-        # จำนวน cases ตามหน่วยงาน - ใช้วิธีง่ายกว่า
-        dept_stats = []
-        departments = db.session.query(Department).all()
-        
-        for dept in departments:
-            case_count = db.session.query(PatientCase).filter_by(
-                department_id=dept.id, 
-                is_deleted=False
-            ).count()
-            
-            if case_count > 0:  # แสดงเฉพาะหน่วยงานที่มี case
-                dept_stats.append({
-                    'name': dept.name,
-                    'count': case_count
-                })
-        
-        # เรียงตามจำนวน case จากมากไปน้อย
-        dept_stats.sort(key=lambda x: x['count'], reverse=True)
-        
-        # จำนวน guidelines ทั้งหมด
-        total_guidelines = db.session.query(Guideline).count()
-        
-        # สร้าง stats object สำหรับ template
-        stats = {
-            'total_cases': total_cases,
-            'dept_stats': dept_stats,
-            'total_guidelines': total_guidelines,
-            'cases_with_files': 0,  # placeholder
-            'cases_with_links': 0,  # placeholder
-            'monthly_stats': []     # placeholder
-        }
-        
-        return render_template('stats.html', stats=stats)
+        return render_template('stats.html', stats=get_public_stats())
     
     except Exception as e:
         print(f"Error in stats route: {e}")
@@ -132,7 +105,10 @@ def stats():
             'monthly_stats': []
         }
         
-        return render_template('stats.html', stats=stats)
+        # ไม่ cache หน้าที่เกิดข้อผิดพลาด
+        response = make_response(render_template('stats.html', stats=stats))
+        response.cache_control.no_store = True
+        return response
 
 @public_bp.route('/storage/<path:filename>')
 def storage(filename):
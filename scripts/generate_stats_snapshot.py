@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script สำหรับสร้าง snapshot สถิติสาธารณะเป็นไฟล์ JSON (ดู services/stats_snapshot.py)
+ใช้กับ deployment แบบ serverless: รันก่อน deploy หรือรันเป็นระยะ (cron / --interval)
+แล้วให้ /stats และ /api/public/stats อ่านจากไฟล์แทนการเชื่อมต่อฐานข้อมูล
+
+ตัวอย่าง:
+    python scripts/generate_stats_snapshot.py
+    python scripts/generate_stats_snapshot.py --output /tmp/snapshots --interval 600
+    python scripts/generate_stats_snapshot.py --optional   # ขั้นตอน build (ไม่ล้มเหลวถ้าไม่มีฐานข้อมูล)
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# เพิ่ม path ของโปรเจค
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from services.stats_snapshot import write_stats_snapshot, KEEP_SNAPSHOTS
+
+def generate(output, keep):
+    """สร้าง snapshot หนึ่งครั้ง"""
+    with app.app_context():
+        try:
+            path = write_stats_snapshot(output, keep)
+            print(f"✅ สร้าง snapshot เรียบร้อย: {path}")
+            return True
+        except Exception as e:
+            print(f"❌ เกิดข้อผิดพลาดในการสร้าง snapshot: {e}")
+            return False
+        finally:
+            db.session.remove()
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description='สร้าง snapshot สถิติสาธารณะเป็นไฟล์ JSON')
+    parser.add_argument('--output', default=app.config['STATS_SNAPSHOT_DIR'], help='โฟลเดอร์ปลายทาง')
+    parser.add_argument('--interval', type=int, default=0, help='สร้างซ้ำทุกกี่วินาที (0 = ครั้งเดียว)')
+    parser.add_argument('--keep', type=int, default=KEEP_SNAPSHOTS, help='จำนวนไฟล์รุ่นเก่าที่เก็บไว้')
+    parser.add_argument('--optional', action='store_true',
+                        help='ไม่ถือว่าล้มเหลวถ้าสร้างไม่ได้ (เช่น build ที่ยังเชื่อมต่อฐานข้อมูลไม่ได้)')
+    args = parser.parse_args()
+
+    print("📊 สร้าง snapshot สถิติสาธารณะ")
+    print("=" * 50)
+
+    if args.interval <= 0:
+        sys.exit(0 if generate(args.output, args.keep) or args.optional else 1)
+
+    print(f"🔄 สร้างซ้ำทุก {args.interval} วินาที (กด Ctrl+C เพื่อหยุด)")
+    try:
+        while True:
+            generate(args.output, args.keep)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n👋 หยุดการสร้าง snapshot")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script สำหรับ import cases จากไฟล์ CSV (เช่น ไฟล์ export รายคืนจาก HIS)
+ตรวจสอบทุกแถวก่อน แล้วเพิ่มแบบ batch (ดู services/case_import.py)
+
+ตัวอย่าง:
+    python scripts/import_cases.py his_export.csv --dry-run
+    python scripts/import_cases.py his_export.csv --user admin --rejects rejected.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+# เพิ่ม path ของโปรเจค
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import AdminUser
+from services.case_bulk import BULK_BATCH_SIZE
+from services.case_import import read_case_csv, import_cases
+
+def write_rejects(path, rejected):
+    """บันทึกแถวที่ไม่ผ่านเป็นไฟล์ CSV"""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['line', 'hn', 'errors'])
+        for item in rejected:
+            writer.writerow([item['line'], item['hn'], '; '.join(item['errors'])])
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description='Import cases จากไฟล์ CSV')
+    parser.add_argument('csv_file', help='ไฟล์ CSV (hn, first_name, last_name, department_code, case_date, ...)')
+    parser.add_argument('--dry-run', action='store_true', help='ตรวจสอบอย่างเดียว ไม่บันทึก')
+    parser.add_argument('--allow-duplicates', action='store_true', help='ไม่ตรวจ case ซ้ำ')
+    parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE, help='จำนวนแถวต่อ transaction')
+    parser.add_argument('--user', help='username ของผู้ import (บันทึกเป็น created_by)')
+    parser.add_argument('--rejects', help='บันทึกแถวที่ไม่ผ่านเป็นไฟล์ CSV')
+    args = parser.parse_args()
+
+    print("📥 Import cases จาก CSV")
+    print("=" * 50)
+
+    with app.app_context():
+        try:
+            created_by = None
+            if args.user:
+                user = db.session.query(AdminUser).filter_by(username=args.user).first()
+                if not user:
+                    print(f"❌ ไม่พบผู้ใช้: {args.user}")
+                    sys.exit(1)
+                created_by = user.id
+
+            with open(args.csv_file, 'rb') as f:
+                records = read_case_csv(f)
+            print(f"📄 อ่านข้อมูล {len(records)} แถว")
+
+            result = import_cases(
+                records,
+                created_by=created_by,
+                allow_duplicates=args.allow_duplicates,
+                dry_run=args.dry_run,
+                batch_size=args.batch_size
+            )
+        except (OSError, ValueError) as e:
+            print(f"❌ อ่านไฟล์ไม่ได้: {e}")
+            sys.exit(1)
+        finally:
+            db.session.remove()
+
+    print(f"✅ ผ่านการตรวจสอบ {result['valid']} แถว")
+    if args.dry_run:
+        print("ℹ️ dry run - ไม่ได้บันทึกข้อมูล")
+    else:
+        print(f"✅ เพิ่มสำเร็จ {result['imported']} แถว")
+
+    rejected = result['rejected']
+    if rejected:
+        print(f"⚠️ ไม่ผ่าน {len(rejected)} แถว")
+        for item in rejected[:20]:
+            print(f"   - บรรทัด {item['line']} (HN {item['hn']}): {', '.join(item['errors'])}")
+        if len(rejected) > 20:
+            print(f"   ... และอีก {len(rejected) - 20} แถว")
+        if args.rejects:
+            write_rejects(args.rejects, rejected)
+            print(f"📝 บันทึกแถวที่ไม่ผ่านที่ {args.rejects}")
+
+if __name__ == "__main__":
+    main()
@@ -26,7 +26,7 @@ def connect_db():
         return None
 
 def create_indexes(conn):
-    """สร้างดัชนีเพื่อเพิ่มประสิทธิภาพ"""
+    """สร้างดัชนีเพื่อเพิ่มประสิทธิภาพ (index ของ patient_case / case_audit ดู models/indexes.py และ scripts/sync_indexes.py)"""
     try:
         cursor = conn.cursor()
         
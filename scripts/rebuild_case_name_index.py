@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script สำหรับสร้าง index ค้นหาชื่อผู้ป่วย (case_name_index) ใหม่จาก patient_case
+ใช้หลังแก้ไขชื่อผู้ป่วยผ่าน SQL โดยตรง กู้คืนข้อมูลสำรอง หรือเปลี่ยนกฎการ normalize ชื่อ
+"""
+
+import os
+import sys
+
+# เพิ่ม path ของโปรเจค
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from services.case_name_index import rebuild_case_name_index, setup_name_search
+
+def main():
+    """ฟังก์ชันหลัก"""
+    print("🔎 สร้าง index ค้นหาชื่อผู้ป่วยใหม่")
+    print("=" * 50)
+    
+    with app.app_context():
+        try:
+            db.create_all()
+            if setup_name_search():
+                print("✅ ใช้ตัวเร่งการค้นหา (FTS5 / pg_trgm)")
+            else:
+                print("⚠️ ฐานข้อมูลไม่รองรับตัวเร่งการค้นหา จะค้นหาด้วย LIKE")
+            rows = rebuild_case_name_index()
+            print(f"✅ สร้าง index เสร็จสิ้น: {rows:,} รายชื่อ")
+        except Exception as e:
+            print(f"❌ เกิดข้อผิดพลาดในการสร้าง index: {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
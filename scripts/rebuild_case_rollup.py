@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script สำหรับสร้างตารางสรุปสถิติผู้ป่วย (case_daily_count) ใหม่จาก patient_case
+ใช้เมื่อตัวเลขสถิติไม่ตรงกับข้อมูลจริง เช่น หลังแก้ไขข้อมูลผ่าน SQL โดยตรงหรือกู้คืนข้อมูลสำรอง
+
+ควรรันในช่วงปิดปรับปรุงระบบเท่านั้น: ระหว่างสร้างใหม่ การเพิ่ม/แก้ไข cases จะรอจนเสร็จ
+และ script ถือ schema_lock() ไว้ จึงไม่ทำงานซ้อนกับ worker ที่กำลังเตรียมฐานข้อมูลตอนเริ่มระบบ
+"""
+
+import os
+import sys
+
+# เพิ่ม path ของโปรเจค
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from services.case_rollup import rebuild_case_rollup
+from services.case_stats import get_total_case_count
+from services.schema_setup import schema_lock
+
+def main():
+    """ฟังก์ชันหลัก"""
+    print("📊 สร้างตารางสรุปสถิติผู้ป่วยใหม่")
+    print("=" * 50)
+    
+    with app.app_context():
+        try:
+            with schema_lock():
+                db.create_all()
+                rows = rebuild_case_rollup()
+            print(f"✅ สร้างตารางสรุปเสร็จสิ้น: {rows:,} แถว (หน่วยงาน × วัน)")
+            print(f"📋 จำนวน cases ที่ยังไม่ถูกลบ: {get_total_case_count():,} ราย")
+        except Exception as e:
+            print(f"❌ เกิดข้อผิดพลาดในการสร้างตารางสรุป: {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
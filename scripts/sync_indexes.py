@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script สำหรับสร้าง index ตาม registry (models/indexes.py) ที่ยังไม่มีในฐานข้อมูล
+(เพิ่มคอลัมน์ที่ขาดตาม services/index_sync.ADDED_COLUMNS ก่อน)
+PostgreSQL สร้างแบบ CONCURRENTLY จึงรันได้ขณะระบบใช้งานอยู่
+
+ตัวอย่าง:
+    python scripts/sync_indexes.py --dry-run
+    python scripts/sync_indexes.py
+"""
+
+import argparse
+import os
+import sys
+
+# เพิ่ม path ของโปรเจค
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from services.index_sync import sync_indexes, sync_columns
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description='สร้าง index ตาม registry ที่ยังขาดในฐานข้อมูล')
+    parser.add_argument('--dry-run', action='store_true', help='แสดงรายการ index ที่ขาดโดยไม่สร้าง')
+    args = parser.parse_args()
+
+    print("🗂️ ตรวจสอบ index ตาม registry")
+    print("=" * 50)
+
+    with app.app_context():
+        try:
+            columns = sync_columns(dry_run=args.dry_run)
+            names = sync_indexes(dry_run=args.dry_run)
+        except Exception as e:
+            print(f"❌ เกิดข้อผิดพลาดในการตรวจสอบ index: {e}")
+            sys.exit(1)
+        finally:
+            db.session.remove()
+
+    label = "ยังขาด" if args.dry_run else "สร้างแล้ว"
+    if columns:
+        for name in columns:
+            print(f"   - คอลัมน์ {name}")
+        print(f"✅ คอลัมน์{label} {len(columns)} รายการ")
+
+    if not names:
+        print("✅ มี index ครบตาม registry แล้ว")
+        return
+
+    for name in names:
+        print(f"   - {name}")
+    print(f"✅ {label} {len(names)} รายการ")
+
+if __name__ == "__main__":
+    main()
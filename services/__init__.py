@@ -1,5 +1,86 @@
-"""Services package for Hospital Management System"""
+"""
+Services package for Hospital Management System
+
+session event ของ db.session (rollup, audit, caches, name index, live events และ utils.stats_cache) ลงทะเบียนตอน import
+แต่ละ module ด้วย @event.listens_for และ package นี้ import ทุก module ไว้
+ดังนั้น import services (หรือ module ใดในนี้) ครั้งเดียวก็ลงทะเบียนครบทั้งหมด
+"""
 
 from .backup_system import BackupSystem, run_backup_now, start_scheduled_backup
+from .case_stats import (
+    get_case_stats, get_department_case_counts, get_public_stats, get_total_case_count, get_dashboard_summary
+)
+from .case_rollup import rebuild_case_rollup, ensure_case_rollup
+from .case_name_index import rebuild_case_name_index, ensure_case_name_index
+from .case_serializers import project_cases, serialize_case_rows
+from .case_list_cache import case_list_cache, invalidate_case_list_cache
+from .case_lookup import fetch_cases_by_ids, fetch_cases_by_hns
+from .case_duplicates import find_duplicate_case, find_duplicate_cases
+from .case_audit import case_audit_writer, queue_case_audits
+from .write_behind import write_behind, touch
+from .case_bulk import (
+    bulk_insert_cases, record_case_changes, bulk_soft_delete_cases, bulk_restore_cases, bulk_reassign_cases
+)
+from .case_import import read_case_csv, validate_case_rows, import_cases
+from .case_upsert import upsert_cases
+from .listing_counts import get_listing_total, invalidate_listing_counts
+from .index_sync import diff_indexes, sync_indexes, sync_columns
+from .case_trends import get_case_trend, get_monthly_stats
+from .live_events import case_event_bus, configure_live_events
+from .case_analytics import case_cube, get_case_analytics, configure_case_analytics
+from .stats_snapshot import (
+    write_stats_snapshot, load_stats_snapshot, refresh_stats_snapshot, get_stats_snapshot, snapshot_info
+)
 
-__all__ = ['BackupSystem', 'run_backup_now', 'start_scheduled_backup']
\ No newline at end of file
+__all__ = [
+    'BackupSystem',
+    'run_backup_now',
+    'start_scheduled_backup',
+    'get_case_stats',
+    'get_department_case_counts',
+    'get_public_stats',
+    'get_total_case_count',
+    'get_dashboard_summary',
+    'rebuild_case_rollup',
+    'ensure_case_rollup',
+    'rebuild_case_name_index',
+    'ensure_case_name_index',
+    'project_cases',
+    'serialize_case_rows',
+    'case_list_cache',
+    'invalidate_case_list_cache',
+    'fetch_cases_by_ids',
+    'fetch_cases_by_hns',
+    'find_duplicate_case',
+    'find_duplicate_cases',
+    'case_audit_writer',
+    'queue_case_audits',
+    'write_behind',
+    'touch',
+    'bulk_insert_cases',
+    'record_case_changes',
+    'bulk_soft_delete_cases',
+    'bulk_restore_cases',
+    'bulk_reassign_cases',
+    'read_case_csv',
+    'validate_case_rows',
+    'import_cases',
+    'upsert_cases',
+    'configure_live_events',
+    'get_listing_total',
+    'invalidate_listing_counts',
+    'diff_indexes',
+    'sync_indexes',
+    'sync_columns',
+    'get_case_trend',
+    'get_monthly_stats',
+    'case_event_bus',
+    'case_cube',
+    'get_case_analytics',
+    'configure_case_analytics',
+    'write_stats_snapshot',
+    'load_stats_snapshot',
+    'refresh_stats_snapshot',
+    'get_stats_snapshot',
+    'snapshot_info'
+]
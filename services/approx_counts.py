@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Approximate counts สำหรับตัวเลขรวมบนหน้า /stats และ dashboard
+อ่านจำนวนแถวโดยประมาณจากสถิติของ query planner แทน COUNT(*) เมื่อเปิด STATS_COUNT_MODE=approximate
+- PostgreSQL: pg_class.reltuples
+- SQLite: sqlite_stat1 (ต้องรัน ANALYZE ก่อน เช่น scripts/optimize_db.py)
+
+ใช้เฉพาะตัวนับที่ต้อง scan ทั้งตาราง - จำนวน cases อ่านจาก rollup (SUM ของ case_daily_count) อยู่แล้ว
+ค่าจาก catalog เก็บไว้ ESTIMATE_CACHE_SECONDS วินาที (เปลี่ยนเฉพาะหลัง ANALYZE/autovacuum)
+ตัวเลขที่ประมาณได้น้อยกว่า APPROXIMATE_COUNT_THRESHOLD จะนับแบบ exact เสมอ
+(estimate_query_rows ใช้ประมาณจำนวนผลลัพธ์ของรายการแบบแบ่งหน้า ดู services/listing_counts.py)
+"""
+
+import threading
+import time
+from flask import current_app
+from sqlalchemy import text, bindparam
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from models import db, Department, Guideline, Knowledge, Activity, Contact
+
+COUNT_MODES = ('exact', 'approximate')
+
+# ค่าเริ่มต้นของ threshold ถ้าไม่ได้กำหนด APPROXIMATE_COUNT_THRESHOLD
+DEFAULT_APPROXIMATE_THRESHOLD = 100000
+
+# ตัวนับที่ประมาณได้ (นับด้วย COUNT ทั้งตาราง) -> ตาราง
+COUNTER_TABLES = {
+    'departments': Department.__tablename__,
+    'guidelines': Guideline.__tablename__,
+    'knowledge': Knowledge.__tablename__,
+    'activities': Activity.__tablename__,
+    'contacts': Contact.__tablename__
+}
+
+# อายุของค่าประมาณที่อ่านจาก catalog (วินาที)
+ESTIMATE_CACHE_SECONDS = 60
+
+_estimate_lock = threading.Lock()
+# {table_name: (จำนวนแถวหรือ None, เวลาที่อ่าน)}
+_estimate_cache = {}
+
+
+def approximate_counts_enabled():
+    """เปิดใช้ approximate counts หรือไม่ (config STATS_COUNT_MODE)"""
+    return current_app.config.get('STATS_COUNT_MODE', 'exact') == 'approximate'
+
+
+def get_table_estimates(connection, table_names):
+    """
+    จำนวนแถวโดยประมาณของแต่ละตารางจากสถิติของ planner (query เดียว)
+
+    Returns:
+        dict: {table_name: จำนวนแถว} เฉพาะตารางที่มีสถิติ
+    """
+    table_names = list(table_names)
+    dialect = connection.dialect.name
+
+    if dialect == 'postgresql':
+        rows = connection.execute(text(
+            "SELECT relname, reltuples FROM pg_class "
+            "WHERE relname IN :names AND relkind IN ('r', 'p') AND pg_table_is_visible(oid)"
+        ).bindparams(bindparam('names', expanding=True)), {'names': table_names}).all()
+        # reltuples = -1 หมายถึงตารางยังไม่เคยถูก ANALYZE
+        return {name: int(estimate) for name, estimate in rows if estimate is not None and estimate >= 0}
+
+    if dialect == 'sqlite':
+        has_stats = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        )).first()
+        if not has_stats:
+            return {}
+        rows = connection.execute(text(
+            "SELECT tbl, stat FROM sqlite_stat1 WHERE tbl IN :names"
+        ).bindparams(bindparam('names', expanding=True)), {'names': table_names}).all()
+        estimates = {}
+        for name, stat in rows:
+            # ค่าแรกของ stat คือจำนวนแถวของตาราง (หรือ index)
+            try:
+                estimate = int(str(stat).split()[0])
+            except (ValueError, IndexError):
+                continue
+            estimates[name] = max(estimates.get(name, 0), estimate)
+        return estimates
+
+    return {}
+
+
+def get_count_estimates(counters=None):
+    """
+    ตัวนับที่ใช้ค่าประมาณแทน COUNT ได้ (เฉพาะเมื่อเปิด approximate mode
+    และค่าประมาณไม่น้อยกว่า APPROXIMATE_COUNT_THRESHOLD)
+
+    Args:
+        counters (list): ชื่อตัวนับจาก COUNTER_TABLES (ค่าเริ่มต้น: ทั้งหมด)
+
+    Returns:
+        dict: {counter: ค่าประมาณ} ตัวนับที่ไม่อยู่ใน dict ต้องนับแบบ exact
+    """
+    if not approximate_counts_enabled():
+        return {}
+
+    threshold = int(current_app.config.get('APPROXIMATE_COUNT_THRESHOLD', DEFAULT_APPROXIMATE_THRESHOLD))
+    counters = [name for name in (counters or COUNTER_TABLES) if name in COUNTER_TABLES]
+    table_estimates = _cached_table_estimates({COUNTER_TABLES[name] for name in counters})
+    estimates = {}
+    for name in counters:
+        estimate = table_estimates.get(COUNTER_TABLES[name])
+        if estimate is not None and estimate >= threshold:
+            estimates[name] = estimate
+    return estimates
+
+
+def _cached_table_estimates(table_names):
+    """get_table_estimates ที่เก็บผลไว้ ESTIMATE_CACHE_SECONDS วินาที (เปิด connection เฉพาะเมื่อหมดอายุ)"""
+    now = time.monotonic()
+    with _estimate_lock:
+        cached = {name: _estimate_cache.get(name) for name in table_names}
+    missing = [name for name, entry in cached.items() if entry is None or now - entry[1] > ESTIMATE_CACHE_SECONDS]
+    if missing:
+        try:
+            # ใช้ connection แยกเพื่อไม่ให้ข้อผิดพลาด (เช่น ไม่มีสิทธิ์อ่าน catalog) กระทบ transaction หลัก
+            with db.engine.connect() as connection:
+                fresh = get_table_estimates(connection, missing)
+        except Exception as e:
+            print(f"Warning: Could not read planner statistics: {e}")
+            fresh = {}
+        with _estimate_lock:
+            for name in missing:
+                cached[name] = _estimate_cache[name] = (fresh.get(name), now)
+    return {name: entry[0] for name, entry in cached.items() if entry[0] is not None}
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) ของ select statement (ส่งค่าเป็น bound parameter ตามปกติ)"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, 'postgresql')
+def _compile_explain(element, compiler, **kw):
+    return f'EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}'
+
+
+def estimate_query_rows(connection, statement):
+    """
+    จำนวนแถวโดยประมาณของ select statement จาก EXPLAIN ของ PostgreSQL
+
+    Returns:
+        int: จำนวนแถวโดยประมาณ หรือ None ถ้าประมาณไม่ได้ (เช่น SQLite)
+    """
+    if connection.dialect.name != 'postgresql':
+        return None
+    plan = connection.execute(_Explain(statement)).scalar()
+    return int(plan[0]['Plan']['Plan Rows'])
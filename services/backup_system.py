@@ -12,7 +12,8 @@ from dotenv import load_dotenv
 # ตรวจสอบว่า run บน serverless platform หรือไม่
 IS_VERCEL = os.getenv('VERCEL') == '1'
 IS_NETLIFY = os.getenv('NETLIFY') == 'true'
-IS_SERVERLESS = IS_VERCEL or IS_NETLIFY
+IS_LAMBDA = os.getenv('AWS_LAMBDA_FUNCTION_NAME') is not None
+IS_SERVERLESS = IS_VERCEL or IS_NETLIFY or IS_LAMBDA
 
 # ใน serverless environment ไม่สามารถเขียนไฟล์ได้ ใช้ StreamHandler เท่านั้น
 if IS_SERVERLESS:
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Analytics cube สำหรับการแบ่งกลุ่มข้อมูล cases แบบ ad hoc (/api/analytics)
+เก็บข้อเท็จจริงที่ไม่ระบุตัวตนของ cases ที่ยังไม่ถูกลบไว้ในหน่วยความจำแบบคอลัมน์
+(department_id, case_date, has_file, has_link, link_type) โหลดด้วย query เดียว
+แล้วอัปเดตทีละ case ผ่าน session event หลัง commit จึงไม่ต้อง GROUP BY บนฐานข้อมูลหลัก
+
+การโหลดอ่านข้อมูลลง cube ชุดใหม่นอก lock แล้วสลับเข้ามาทีเดียว การอัปเดตที่เกิดระหว่างโหลด
+จะถูกเก็บไว้แล้วนำมาใช้ซ้ำหลังสลับ (ระหว่างโหลดใหม่ query ยังได้ข้อมูลชุดเดิม)
+
+query คัดลอกคอลัมน์ที่ใช้ภายใต้ lock (memcpy) แล้วคำนวณนอก lock จึงไม่บล็อกการอัปเดตหลัง commit
+(การคำนวณ mask/group by ยังเป็น loop ของ Python ต่อแถว - ไม่ใช้ numpy)
+
+หมายเหตุ: cube อยู่ในแต่ละ process (gunicorn หลาย worker = หลาย cube) การเขียนจาก worker อื่น
+หรือ bulk UPDATE จะเห็นหลังโหลดใหม่ (ทุก ANALYTICS_MAX_AGE วินาที หรือเรียก case_cube.invalidate())
+"""
+
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import date, timedelta
+from itertools import compress
+from sqlalchemy import event, inspect, select, case, and_
+from models import db, PatientCase
+
+# มิติที่ใช้ group by ได้
+DIMENSIONS = ('department', 'year', 'month', 'week', 'day', 'has_file', 'has_link', 'link_type')
+
+# ค่าเริ่มต้นของอายุ cube (วินาที) ถ้าไม่ได้กำหนด ANALYTICS_MAX_AGE - โหลดใหม่ทั้งหมดเมื่อเกิน
+# (กันข้อมูลคลาดจาก worker อื่น)
+DEFAULT_MAX_AGE = 300
+
+# จำนวนแถวที่อ่านต่อรอบตอนโหลด
+LOAD_BATCH_SIZE = 5000
+
+# attribute ของ PatientCase ที่มีผลต่อ cube
+TRACKED_ATTRIBUTES = ('department_id', 'case_date', 'is_deleted', 'file_path', 'external_link', 'link_type')
+
+
+def _date_key(ordinal, dimension):
+    """แปลง date ordinal เป็นค่าของมิติเวลา"""
+    value = date.fromordinal(ordinal)
+    if dimension == 'year':
+        return value.year
+    if dimension == 'month':
+        return f'{value.year:04d}-{value.month:02d}'
+    if dimension == 'week':
+        return (value - timedelta(days=value.weekday())).isoformat()
+    return value.isoformat()
+
+
+class CaseCube:
+    """
+    ตารางข้อเท็จจริงของ cases แบบคอลัมน์ (array) พร้อม index case_id -> แถว
+
+    แถวที่ถูกลบจะถูกทำเครื่องหมายใน alive แล้วบีบอัดเมื่อมีแถวว่างมากเกินไป
+    """
+
+    # attribute ที่เก็บข้อมูลของ cube (สลับจาก cube ที่โหลดใหม่ทั้งชุด)
+    _STATE = ('department', 'day', 'has_file', 'has_link', 'link_type', 'alive',
+              '_rows', '_link_types', '_link_type_codes')
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        # ให้โหลดทีละครั้ง (ไม่ถือ _lock ระหว่างอ่านฐานข้อมูล)
+        self._load_lock = threading.RLock()
+        # การเปลี่ยนแปลงที่เกิดระหว่างโหลด {case_id: facts หรือ None} (None = ไม่ได้โหลดอยู่)
+        self._replay = None
+        self._reset()
+
+    def _reset(self):
+        self.department = array('l')
+        self.day = array('l')
+        self.has_file = array('b')
+        self.has_link = array('b')
+        self.link_type = array('h')
+        self.alive = bytearray()
+        self._rows = {}
+        self._link_types = [None]
+        self._link_type_codes = {None: 0}
+        self.loaded_at = None
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    @property
+    def size(self):
+        return len(self._rows)
+
+    @property
+    def tracking(self):
+        """ต้องเก็บการเปลี่ยนแปลงของ cases หรือไม่ (โหลดแล้วหรือกำลังโหลด)"""
+        return self.loaded or self._replay is not None
+
+    def _is_fresh(self):
+        loaded_at = self.loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self.max_age
+
+    def invalidate(self):
+        """ทิ้ง cube (จะโหลดใหม่เมื่อมีการ query ครั้งถัดไป)"""
+        with self._lock:
+            self._reset()
+
+    def _link_type_code(self, link_type):
+        code = self._link_type_codes.get(link_type)
+        if code is None:
+            code = len(self._link_types)
+            self._link_types.append(link_type)
+            self._link_type_codes[link_type] = code
+        return code
+
+    def _append(self, case_id, department_id, case_date, has_file, has_link, link_type):
+        self._rows[case_id] = len(self.alive)
+        self.department.append(department_id)
+        self.day.append(case_date.toordinal())
+        self.has_file.append(1 if has_file else 0)
+        self.has_link.append(1 if has_link else 0)
+        self.link_type.append(self._link_type_code(link_type))
+        self.alive.append(1)
+
+    def load(self, session):
+        """
+        โหลดข้อเท็จจริงของ cases ที่ยังไม่ถูกลบทั้งหมดด้วย query เดียว
+
+        Args:
+            session: SQLAlchemy session
+
+        Returns:
+            int: จำนวน cases ใน cube
+        """
+        stmt = select(
+            PatientCase.id,
+            PatientCase.department_id,
+            PatientCase.case_date,
+            case((and_(PatientCase.file_path.isnot(None), PatientCase.file_path != ''), 1), else_=0),
+            case((and_(PatientCase.external_link.isnot(None), PatientCase.external_link != ''), 1), else_=0),
+            PatientCase.link_type
+        ).where(
+            PatientCase.is_deleted == False,
+            PatientCase.department_id.isnot(None),
+            PatientCase.case_date.isnot(None)
+        ).execution_options(yield_per=LOAD_BATCH_SIZE)
+
+        with self._load_lock:
+            with self._lock:
+                # เริ่มเก็บการเปลี่ยนแปลงก่อนอ่าน จึงไม่พลาดการ commit ระหว่างโหลด
+                self._replay = {}
+            try:
+                staging = CaseCube(self.max_age)
+                for row in session.execute(stmt):
+                    staging._append(*row)
+            except Exception:
+                with self._lock:
+                    self._replay = None
+                raise
+
+            with self._lock:
+                replay, self._replay = self._replay, None
+                for name in self._STATE:
+                    setattr(self, name, getattr(staging, name))
+                # ใช้การเปลี่ยนแปลงซ้ำ (ที่อยู่ในข้อมูลที่อ่านแล้วจะได้ค่าเดิม)
+                for case_id, facts in replay.items():
+                    if facts is None:
+                        self._remove(case_id)
+                    else:
+                        self._upsert(case_id, *facts)
+                self.loaded_at = time.monotonic()
+                return self.size
+
+    def ensure_loaded(self, session):
+        """
+        โหลด cube ถ้ายังไม่ได้โหลดหรืออายุเกิน max_age
+        ถ้า thread อื่นกำลังโหลดใหม่อยู่และมีข้อมูลชุดเดิมแล้ว จะใช้ชุดเดิมโดยไม่รอ
+        """
+        if self._is_fresh():
+            return
+        if self.loaded and self._replay is not None:
+            return
+        with self._load_lock:
+            if self._is_fresh():
+                return
+            self.load(session)
+
+    def upsert(self, case_id, department_id, case_date, has_file, has_link, link_type):
+        """เพิ่มหรือแก้ไขข้อเท็จจริงของ case หนึ่งรายการ"""
+        with self._lock:
+            if self._replay is not None:
+                self._replay[case_id] = (department_id, case_date, has_file, has_link, link_type)
+            if self.loaded:
+                self._upsert(case_id, department_id, case_date, has_file, has_link, link_type)
+
+    def _upsert(self, case_id, department_id, case_date, has_file, has_link, link_type):
+        row = self._rows.get(case_id)
+        if row is None:
+            self._append(case_id, department_id, case_date, has_file, has_link, link_type)
+            return
+        self.department[row] = department_id
+        self.day[row] = case_date.toordinal()
+        self.has_file[row] = 1 if has_file else 0
+        self.has_link[row] = 1 if has_link else 0
+        self.link_type[row] = self._link_type_code(link_type)
+
+    def remove(self, case_id):
+        """นำ case ออกจาก cube (เช่น ถูกลบ)"""
+        with self._lock:
+            if self._replay is not None:
+                self._replay[case_id] = None
+            if self.loaded:
+                self._remove(case_id)
+
+    def _remove(self, case_id):
+        row = self._rows.pop(case_id, None)
+        if row is None:
+            return
+        self.alive[row] = 0
+        if len(self.alive) > 1024 and len(self._rows) * 2 < len(self.alive):
+            self._compact()
+
+    def _compact(self):
+        keep = self.alive
+        rows = sorted(self._rows.items(), key=lambda item: item[1])
+        self.department = array('l', compress(self.department, keep))
+        self.day = array('l', compress(self.day, keep))
+        self.has_file = array('b', compress(self.has_file, keep))
+        self.has_link = array('b', compress(self.has_link, keep))
+        self.link_type = array('h', compress(self.link_type, keep))
+        self.alive = bytearray([1]) * len(rows)
+        self._rows = {case_id: position for position, (case_id, _) in enumerate(rows)}
+
+    def _snapshot(self, names):
+        """
+        สำเนาของคอลัมน์ที่ query ใช้ (ต้องถือ _lock) - คำนวณต่อได้นอก lock
+        คอลัมน์ถูกแก้ไขแบบ in-place จึงต้องคัดลอก (slice ของ array/bytearray เป็น memcpy)
+        """
+        columns = {name: getattr(self, name)[:] for name in names}
+        columns['alive'] = self.alive[:]
+        columns['link_types'] = list(self._link_types)
+        columns['link_type_codes'] = dict(self._link_type_codes)
+        return columns
+
+    @staticmethod
+    def _mask(columns, department_ids=None, start=None, end=None, has_file=None, has_link=None, link_types=None):
+        """สร้าง mask ของแถวที่ตรงเงื่อนไข (คำนวณทีละคอลัมน์)"""
+        mask = columns['alive']
+        if department_ids:
+            wanted = set(department_ids)
+            mask = bytearray(m and d in wanted for m, d in zip(mask, columns['department']))
+        if start is not None or end is not None:
+            low = start.toordinal() if start else -1
+            high = end.toordinal() if end else float('inf')
+            mask = bytearray(m and low <= d <= high for m, d in zip(mask, columns['day']))
+        if has_file is not None:
+            mask = bytearray(m and f == has_file for m, f in zip(mask, columns['has_file']))
+        if has_link is not None:
+            mask = bytearray(m and l == has_link for m, l in zip(mask, columns['has_link']))
+        if link_types:
+            codes = {columns['link_type_codes'][t] for t in link_types if t in columns['link_type_codes']}
+            mask = bytearray(m and t in codes for m, t in zip(mask, columns['link_type']))
+        return mask
+
+    @staticmethod
+    def _key_column(columns, dimension, mask):
+        """ค่าของมิติสำหรับแถวที่อยู่ใน mask"""
+        if dimension == 'department':
+            return compress(columns['department'], mask)
+        if dimension == 'has_file':
+            return (bool(v) for v in compress(columns['has_file'], mask))
+        if dimension == 'has_link':
+            return (bool(v) for v in compress(columns['has_link'], mask))
+        if dimension == 'link_type':
+            link_types = columns['link_types']
+            return (link_types[v] for v in compress(columns['link_type'], mask))
+        # มิติเวลา: แปลงเฉพาะค่า ordinal ที่ไม่ซ้ำกัน
+        cache = {}
+        def convert(ordinal):
+            value = cache.get(ordinal)
+            if value is None:
+                value = cache[ordinal] = _date_key(ordinal, dimension)
+            return value
+        return (convert(v) for v in compress(columns['day'], mask))
+
+    def query(self, group_by=(), **filters):
+        """
+        นับจำนวน cases ตามมิติที่เลือก
+
+        Args:
+            group_by (list): มิติจาก DIMENSIONS (ว่าง = นับรวม)
+            **filters: department_ids, start, end, has_file, has_link, link_types
+
+        Returns:
+            tuple: (Counter {tuple ค่ามิติ: จำนวน}, จำนวนรวม, จำนวน cases ใน cube, อายุของ cube (วินาที))
+        """
+        names = {_FILTER_COLUMNS[name] for name, value in filters.items() if value is not None}
+        names.update(_DIMENSION_COLUMNS[dimension] for dimension in group_by)
+        with self._lock:
+            columns = self._snapshot(names)
+            size = self.size
+            age = time.monotonic() - self.loaded_at if self.loaded_at is not None else 0
+
+        mask = self._mask(columns, **filters)
+        total = sum(mask)
+        if not group_by:
+            counts = Counter({(): total} if total else {})
+        else:
+            counts = Counter(zip(*[self._key_column(columns, dimension, mask) for dimension in group_by]))
+        return counts, total, size, age
+
+
+# คอลัมน์ที่ filter และมิติแต่ละตัวใช้
+_FILTER_COLUMNS = {
+    'department_ids': 'department', 'start': 'day', 'end': 'day',
+    'has_file': 'has_file', 'has_link': 'has_link', 'link_types': 'link_type'
+}
+_DIMENSION_COLUMNS = {
+    'department': 'department', 'year': 'day', 'month': 'day', 'week': 'day', 'day': 'day',
+    'has_file': 'has_file', 'has_link': 'has_link', 'link_type': 'link_type'
+}
+
+case_cube = CaseCube()
+
+
+def configure_case_analytics(app):
+    """ตั้งค่าอายุของ cube จาก config ANALYTICS_MAX_AGE"""
+    case_cube.max_age = int(app.config.get('ANALYTICS_MAX_AGE', DEFAULT_MAX_AGE))
+
+
+def get_case_analytics(group_by=(), department_ids=None, start=None, end=None,
+                       has_file=None, has_link=None, link_types=None):
+    """
+    Slice/dice จำนวน cases ที่ยังไม่ถูกลบจาก cube ในหน่วยความจำ
+
+    Args:
+        group_by (list): มิติจาก DIMENSIONS
+        department_ids (list): กรองเฉพาะหน่วยงาน
+        start, end (date): ช่วง case_date
+        has_file, has_link (bool): กรองตามไฟล์แนบ/ลิงก์
+        link_types (list): กรองตามประเภทลิงก์
+
+    Returns:
+        dict: group_by, total, rows (ค่ามิติ + count เรียงจากมากไปน้อย) และ snapshot
+
+    Raises:
+        ValueError: ถ้ามีมิติที่ไม่รองรับหรือซ้ำกัน
+    """
+    group_by = list(group_by)
+    unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f'มิติไม่ถูกต้อง: {", ".join(unknown)} (รองรับ {", ".join(DIMENSIONS)})')
+    if len(set(group_by)) != len(group_by):
+        raise ValueError('มิติซ้ำกัน')
+
+    case_cube.ensure_loaded(db.session)
+    counts, total, size, age = case_cube.query(
+        group_by,
+        department_ids=department_ids,
+        start=start,
+        end=end,
+        has_file=has_file,
+        has_link=has_link,
+        link_types=link_types
+    )
+
+    rows = [
+        dict(zip(group_by, key), count=count)
+        for key, count in sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+    ]
+    return {
+        'group_by': group_by,
+        'total': total,
+        'rows': rows,
+        'snapshot': {
+            'cases': size,
+            'age_seconds': int(age)
+        }
+    }
+
+
+def _case_facts(case_obj):
+    """ข้อเท็จจริงของ case สำหรับ cube หรือ None ถ้าไม่ต้องอยู่ใน cube"""
+    if case_obj.is_deleted or case_obj.department_id is None or case_obj.case_date is None:
+        return None
+    case_date = case_obj.case_date
+    if hasattr(case_date, 'date'):
+        case_date = case_date.date()
+    return (
+        case_obj.department_id,
+        case_date,
+        bool(case_obj.file_path),
+        bool(case_obj.external_link),
+        case_obj.link_type
+    )
+
+
+def queue_cube_changes(session, changes):
+    """
+    เก็บการเปลี่ยนแปลงที่ไม่ผ่าน flush ของ ORM (เช่น bulk INSERT/UPDATE) ไว้ปรับ cube หลัง commit
+
+    Args:
+        changes (dict): {case_id: (department_id, case_date, has_file, has_link, link_type) หรือ None = ลบออก}
+    """
+    if not case_cube.tracking or not changes:
+        return
+    session.info.setdefault('analytics_changes', {}).update(changes)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_cube_changes(session, flush_context):
+    """เก็บการเปลี่ยนแปลงของ cases ไว้ปรับ cube หลัง commit"""
+    if not case_cube.tracking:
+        return
+    changes = session.info.setdefault('analytics_changes', {})
+    for obj in session.new:
+        if isinstance(obj, PatientCase):
+            changes[obj.id] = _case_facts(obj)
+    for obj in session.dirty:
+        if isinstance(obj, PatientCase):
+            state = inspect(obj)
+            if any(state.attrs[attr].history.has_changes() for attr in TRACKED_ATTRIBUTES):
+                changes[obj.id] = _case_facts(obj)
+    for obj in session.deleted:
+        if isinstance(obj, PatientCase):
+            changes[obj.id] = None
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_cube_changes(session):
+    changes = session.info.pop('analytics_changes', None)
+    if not changes:
+        return
+    for case_id, facts in changes.items():
+        if facts is None:
+            case_cube.remove(case_id)
+        else:
+            case_cube.upsert(case_id, *facts)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_cube_changes(session):
+    session.info.pop('analytics_changes', None)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Audit log ของ cases (ตาราง case_audit): CREATE / UPDATE / DELETE พร้อมผู้ใช้และ IP
+เก็บรายการระหว่าง flush แล้วส่งต่อหลัง commit ตาม CASE_AUDIT_MODE
+- async: ใส่ buffer ใน process แล้ว background thread เขียนเป็นชุด (ไม่เพิ่ม commit ใน request)
+         queue เต็มจะเขียนแบบ synchronous แทน และเขียนรายการที่เหลือทั้งหมดตอนปิดโปรแกรม
+- transaction: เขียนใน transaction เดียวกับการแก้ไข case (ใช้บน serverless ที่ไม่มี background thread)
+- off: ไม่บันทึก
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app, has_request_context, request, g
+from flask_login import current_user
+from sqlalchemy import event, inspect, insert
+from models import db, PatientCase, CaseAudit
+
+AUDIT_MODES = ('async', 'transaction', 'off')
+
+# ค่าเริ่มต้นถ้าไม่ได้กำหนด CASE_AUDIT_QUEUE_SIZE / CASE_AUDIT_BATCH_SIZE
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+
+# background writer รอรายการเพิ่มนานสุดกี่วินาทีก่อนเขียนชุดที่มีอยู่
+FLUSH_INTERVAL = 1.0
+
+# จำนวนครั้งที่ลองเขียนชุดเดิมใหม่เมื่อฐานข้อมูลผิดพลาด
+WRITE_RETRIES = 3
+
+# ฟิลด์ที่ไม่ถือเป็นการแก้ไขข้อมูลของ case
+IGNORED_ATTRIBUTES = ('updated_at',)
+
+_STOP = object()
+
+
+class CaseAuditWriter:
+    """Background writer ของ case_audit แบบ batch พร้อม queue ที่จำกัดขนาด (thread-safe)"""
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = None
+        self._thread = None
+        self._engine = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def _ensure_started(self, engine):
+        """เริ่ม thread ครั้งแรกที่มีรายการ (และใหม่หลัง fork ของ gunicorn)"""
+        if self.running:
+            return
+        with self._lock:
+            if self.running:
+                return
+            self._engine = engine
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='case-audit-writer', daemon=True)
+            self._thread.start()
+
+    def record(self, entries, engine):
+        """
+        ส่งรายการ audit เข้า buffer (queue เต็ม: เขียนทันทีแบบ synchronous)
+
+        Args:
+            entries (list): dict ตามคอลัมน์ของ case_audit
+            engine: SQLAlchemy engine
+        """
+        if not entries:
+            return
+        self._ensure_started(engine)
+        overflow = []
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                overflow.append(entry)
+        if overflow:
+            self._write(overflow, engine)
+
+    def _write(self, entries, engine=None):
+        engine = engine or self._engine
+        for start in range(0, len(entries), self.batch_size):
+            with engine.begin() as connection:
+                connection.execute(insert(CaseAudit.__table__), entries[start:start + self.batch_size])
+
+    def _write_with_retry(self, entries):
+        for attempt in range(WRITE_RETRIES):
+            try:
+                self._write(entries)
+                return
+            except Exception as e:
+                if attempt == WRITE_RETRIES - 1:
+                    print(f"Error: Could not write {len(entries)} case audit entries: {e}")
+                    return
+                time.sleep(2 ** attempt)
+
+    def _run(self):
+        buffer_queue = self._queue
+        stopping = False
+        while not (stopping and buffer_queue.empty()):
+            try:
+                entry = buffer_queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if entry is _STOP:
+                    stopping = True
+                else:
+                    batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    entry = buffer_queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_with_retry(batch)
+
+    def drain(self):
+        """เขียนรายการที่ค้างอยู่ใน buffer ทั้งหมดแบบ synchronous"""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        entries = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                entries.append(entry)
+        if entries:
+            self._write_with_retry(entries)
+
+    def stop(self, timeout=10):
+        """หยุด background writer และเขียนรายการที่เหลือ (เรียกอัตโนมัติตอนปิดโปรแกรม)"""
+        if not self.running:
+            self.drain()
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self.drain()
+
+
+case_audit_writer = CaseAuditWriter()
+atexit.register(case_audit_writer.stop)
+
+
+def configure_case_audit(app):
+    """ตั้งค่าขนาด queue และ batch จาก config CASE_AUDIT_QUEUE_SIZE / CASE_AUDIT_BATCH_SIZE"""
+    case_audit_writer.queue_size = int(app.config.get('CASE_AUDIT_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+    case_audit_writer.batch_size = int(app.config.get('CASE_AUDIT_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+
+
+def _audit_mode():
+    return current_app.config.get('CASE_AUDIT_MODE', 'async')
+
+
+def _request_actor():
+    """(user_id, ip_address) ของ request ปัจจุบัน (JWT หรือ session login)"""
+    if not has_request_context():
+        return None, None
+    user_id = None
+    if hasattr(g, 'current_user'):
+        user_id = g.current_user.get('user_id')
+    elif current_user and current_user.is_authenticated:
+        user_id = current_user.id
+    # หลัง proxy ของ Vercel/Netlify: IP ของผู้ใช้คือค่าแรกของ X-Forwarded-For
+    forwarded = request.headers.get('X-Forwarded-For', '')
+    ip_address = forwarded.split(',')[0].strip() if forwarded else request.remote_addr
+    return user_id, ip_address[:45] if ip_address else None
+
+
+def queue_case_audits(session, actions):
+    """
+    เพิ่มรายการ audit ของ transaction ปัจจุบัน (บันทึกตาม CASE_AUDIT_MODE หลัง commit)
+
+    Args:
+        session: db.session
+        actions: iterable ของ (case_id, action)
+    """
+    mode = _audit_mode()
+    if mode == 'off':
+        return
+    user_id, ip_address = _request_actor()
+    now = datetime.now(timezone.utc)
+    entries = [
+        {'case_id': case_id, 'action': action, 'user_id': user_id, 'ip_address': ip_address, 'created_at': now}
+        for case_id, action in actions
+    ]
+    if not entries:
+        return
+    if mode == 'transaction':
+        session.connection().execute(insert(CaseAudit.__table__), entries)
+    else:
+        session.info.setdefault('case_audit', []).extend(entries)
+
+
+def _case_action(obj):
+    """action ของ PatientCase ที่ถูกแก้ไข หรือ None ถ้าไม่มีการเปลี่ยนแปลงข้อมูล"""
+    state = inspect(obj)
+    deleted_history = state.attrs.is_deleted.history
+    if deleted_history.added and deleted_history.added[0] and not any(deleted_history.deleted):
+        return 'DELETE'
+    for attr in state.mapper.column_attrs:
+        if attr.key not in IGNORED_ATTRIBUTES and state.attrs[attr.key].history.has_changes():
+            return 'UPDATE'
+    return None
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_case_audits(session, flush_context):
+    """เก็บ CREATE / UPDATE / DELETE ของ PatientCase (หลัง INSERT จึงมี id แล้ว)"""
+    actions = []
+    for obj in session.new:
+        if isinstance(obj, PatientCase):
+            actions.append((obj.id, 'CREATE'))
+    for obj in session.dirty:
+        if isinstance(obj, PatientCase):
+            action = _case_action(obj)
+            if action:
+                actions.append((obj.id, action))
+    # การลบแถวจริง (session.delete) ไม่มีใน workflow - case_audit.case_id อ้างอิง case ที่ต้องยังอยู่
+    if actions:
+        queue_case_audits(session, actions)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _write_after_commit(session):
+    entries = session.info.pop('case_audit', None)
+    if not entries:
+        return
+    try:
+        case_audit_writer.record(entries, db.engine)
+    except Exception as e:
+        print(f"Warning: Could not record case audit entries: {e}")
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('case_audit', None)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+การเขียน cases แบบ set-based (bulk INSERT / UPDATE) ที่ไม่ผ่าน flush ของ ORM
+session event ของ rollup, name index, analytics cube, live events และ cache ต่าง ๆ
+จะไม่ทำงานกับคำสั่งเหล่านี้ ฟังก์ชันในไฟล์นี้จึงปรับข้อมูลสรุปเองใน transaction เดียวกัน
+และตั้งค่าใน session.info ให้ listener เดิมล้าง cache / publish event หลัง commit
+
+bulk soft delete / restore / ย้ายหน่วยงาน ใช้ UPDATE คำสั่งเดียวต่อการทำงาน
+(เลือก cases ด้วยรายการ id หรือ filter) แทนการโหลดและแก้ไขทีละ case
+"""
+
+from collections import namedtuple, defaultdict
+from datetime import datetime, timezone
+from sqlalchemy import insert, select, update
+from models import db, PatientCase
+from .case_rollup import collect_state_deltas, apply_case_deltas
+from .case_name_index import write_case_name_keys, case_name_key
+from .case_analytics import queue_cube_changes
+from .live_events import queue_stats_deltas
+from .case_audit import queue_case_audits
+
+# จำนวนแถวต่อ INSERT และต่อ transaction
+BULK_BATCH_SIZE = 1000
+
+# สถานะของ case ที่มีผลต่อข้อมูลสรุป (ลำดับ 5 ค่าแรกตรงกับ case_rollup.TRACKED_ATTRIBUTES)
+CaseState = namedtuple(
+    'CaseState', ['department_id', 'case_date', 'is_deleted', 'file_path', 'external_link', 'link_type']
+)
+
+# จำนวน id สูงสุดต่อ bulk update (เลือกด้วย filter ได้ไม่จำกัด)
+MAX_BULK_IDS = 10000
+
+# คอลัมน์ที่รับจากข้อมูล import
+INSERT_COLUMNS = (
+    'hn', 'first_name', 'last_name', 'department_id', 'case_date', 'notes', 'external_link', 'link_type'
+)
+
+
+def case_state(values):
+    """CaseState จาก dict หรือ row ที่มีคอลัมน์ตาม CaseState"""
+    if isinstance(values, dict):
+        return CaseState(*(values.get(field) for field in CaseState._fields))
+    return CaseState(*(getattr(values, field) for field in CaseState._fields))
+
+
+def _cube_facts(state):
+    if state is None or state.is_deleted:
+        return None
+    return (state.department_id, state.case_date, bool(state.file_path), bool(state.external_link), state.link_type)
+
+
+def _audit_action(old, new):
+    if old is None:
+        return 'CREATE'
+    if new.is_deleted and not old.is_deleted:
+        return 'DELETE'
+    return 'UPDATE'
+
+
+def record_case_changes(session, changes):
+    """
+    ปรับข้อมูลสรุปตามการเปลี่ยนแปลงของ cases ที่เขียนแบบ set-based (เรียกก่อน commit)
+
+    Args:
+        session: db.session ที่ทำการเขียน
+        changes (dict): {case_id: (CaseState เดิม หรือ None, CaseState ใหม่ หรือ None)}
+    """
+    if not changes:
+        return
+
+    # case_daily_count ใน transaction เดียวกัน
+    apply_case_deltas(session.connection(), collect_state_deltas(
+        (old[:5] if old else None, new[:5] if new else None) for old, new in changes.values()
+    ))
+
+    # analytics cube และ live stats: ปรับหลัง commit
+    queue_cube_changes(session, {case_id: _cube_facts(new) for case_id, (old, new) in changes.items()})
+    department_deltas = defaultdict(int)
+    department_ids = set()
+    for old, new in changes.values():
+        if old is not None:
+            department_ids.add(old.department_id)
+            if not old.is_deleted:
+                department_deltas[old.department_id] -= 1
+        if new is not None:
+            department_ids.add(new.department_id)
+            if not new.is_deleted:
+                department_deltas[new.department_id] += 1
+    queue_stats_deltas(session, department_deltas)
+
+    # audit log (CREATE / UPDATE / DELETE)
+    queue_case_audits(session, [
+        (case_id, _audit_action(old, new)) for case_id, (old, new) in changes.items() if new is not None
+    ])
+
+    # ให้ listener หลัง commit ล้าง cache เหมือนการเขียนผ่าน ORM
+    # (utils/stats_cache.py, services/listing_counts.py, services/case_list_cache.py)
+    session.info['stats_changed'] = True
+    session.info.setdefault('count_tables', set()).add(PatientCase.__tablename__)
+    session.info.setdefault('case_list_departments', set()).update(department_ids)
+
+
+def _insert_batch(session, rows):
+    """INSERT หนึ่งชุด (executemany แบบหลายแถวต่อคำสั่ง) และคืน id ตามลำดับของ rows"""
+    table = PatientCase.__table__
+    result = session.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        rows
+    )
+    return result.scalars().all()
+
+
+def bulk_insert_cases(rows, created_by=None, batch_size=BULK_BATCH_SIZE):
+    """
+    เพิ่ม cases จำนวนมาก: INSERT ชุดละ batch_size แถว และ commit ทีละชุด
+    ชุดที่ผิดพลาดจะถูก rollback เฉพาะชุดนั้น
+
+    Args:
+        rows (list): dict ที่มีคอลัมน์ตาม INSERT_COLUMNS (ตรวจสอบแล้ว)
+        created_by (int): id ของผู้ใช้ที่ import
+        batch_size (int): จำนวนแถวต่อชุด
+
+    Returns:
+        tuple: (จำนวนที่เพิ่มสำเร็จ, รายการ (แถวในชุดที่ผิดพลาด, ข้อความผิดพลาด))
+    """
+    inserted = 0
+    failures = []
+    batch_size = max(1, batch_size)
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        now = datetime.now(timezone.utc)
+        values = [
+            dict({column: row.get(column) for column in INSERT_COLUMNS},
+                 created_by=created_by, created_at=now, updated_at=now, is_deleted=False)
+            for row in batch
+        ]
+        try:
+            ids = _insert_batch(db.session, values)
+            write_case_name_keys(db.session.connection(), {
+                case_id: case_name_key(row['first_name'], row['last_name'])
+                for case_id, row in zip(ids, values)
+            })
+            record_case_changes(db.session, {
+                case_id: (None, case_state(row)) for case_id, row in zip(ids, values)
+            })
+            db.session.commit()
+            inserted += len(ids)
+        except Exception as e:
+            db.session.rollback()
+            failures.append((batch, str(e)))
+
+    return inserted, failures
+
+
+def case_selection(ids=None, department_ids=None, start_date=None, end_date=None):
+    """
+    เงื่อนไขเลือก cases สำหรับ bulk update (รายการ id และ/หรือ filter)
+
+    Args:
+        ids (list): id ของ cases
+        department_ids (list): หน่วยงาน
+        start_date, end_date (date): ช่วงวันที่ของ case (case_date)
+
+    Returns:
+        list: เงื่อนไข WHERE
+
+    Raises:
+        ValueError: ถ้าไม่มีเงื่อนไขเลย (ป้องกันการแก้ไขทุก case โดยไม่ตั้งใจ)
+    """
+    table = PatientCase.__table__
+    conditions = []
+    if ids:
+        conditions.append(table.c.id.in_(ids))
+    if department_ids:
+        conditions.append(table.c.department_id.in_(department_ids))
+    if start_date:
+        conditions.append(table.c.case_date >= start_date)
+    if end_date:
+        conditions.append(table.c.case_date <= end_date)
+    if not conditions:
+        raise ValueError('กรุณาระบุ id หรือเงื่อนไขของ cases')
+    return conditions
+
+
+def _bulk_update(conditions, values):
+    """
+    UPDATE patient_case คำสั่งเดียว และปรับข้อมูลสรุปจากสถานะก่อน/หลังของแถวที่ถูกแก้ไข
+
+    Returns:
+        int: จำนวน cases ที่ถูกแก้ไข
+    """
+    table = PatientCase.__table__
+    session = db.session
+    state_columns = [table.c[field] for field in CaseState._fields]
+    values = dict(values, updated_at=datetime.now(timezone.utc))
+
+    if session.get_bind().dialect.name == 'postgresql':
+        # สถานะเดิมจาก self-join ใน statement เดียวกัน (UPDATE ... FROM patient_case AS old)
+        # แถวที่ถูกแก้พร้อมกันโดย transaction อื่นจะไม่ผ่านเงื่อนไขเทียบสถานะและถูกข้ามไป
+        old = table.alias('old')
+        rows = session.execute(
+            update(table)
+            .where(table.c.id == old.c.id, *conditions)
+            .where(*(column.is_not_distinct_from(old.c[column.name]) for column in state_columns))
+            .values(values)
+            .returning(
+                table.c.id, *state_columns,
+                *(old.c[column.name].label(f'old_{column.name}') for column in state_columns)
+            )
+        ).all()
+        changes = {
+            row.id: (
+                CaseState(*(getattr(row, f'old_{field}') for field in CaseState._fields)),
+                case_state(row)
+            )
+            for row in rows
+        }
+    else:
+        # SQLite: RETURNING อ้างถึงตารางใน FROM ไม่ได้ จึงอ่านสถานะเดิมก่อนใน transaction เดียวกัน
+        old_states = {
+            row.id: case_state(row)
+            for row in session.execute(select(table.c.id, *state_columns).where(*conditions))
+        }
+        rows = session.execute(
+            update(table).where(*conditions).values(values).returning(table.c.id, *state_columns)
+        ).all()
+        changes = {row.id: (old_states.get(row.id, case_state(row)), case_state(row)) for row in rows}
+
+    try:
+        record_case_changes(session, changes)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return len(changes)
+
+
+def bulk_soft_delete_cases(conditions):
+    """ลบ cases ที่ตรงเงื่อนไข (soft delete) ด้วย UPDATE คำสั่งเดียว - คืนจำนวนที่ลบ"""
+    table = PatientCase.__table__
+    return _bulk_update(conditions + [table.c.is_deleted == False], {'is_deleted': True})
+
+
+def bulk_restore_cases(conditions):
+    """นำ cases ที่ถูกลบและตรงเงื่อนไขกลับมา ด้วย UPDATE คำสั่งเดียว - คืนจำนวนที่นำกลับมา"""
+    table = PatientCase.__table__
+    return _bulk_update(conditions + [table.c.is_deleted == True], {'is_deleted': False})
+
+
+def bulk_reassign_cases(conditions, department_id):
+    """ย้าย cases ที่ตรงเงื่อนไขไปหน่วยงาน department_id ด้วย UPDATE คำสั่งเดียว - คืนจำนวนที่ย้าย"""
+    table = PatientCase.__table__
+    # external_ref มีหน่วยงานเดิมอยู่ในค่า: ล้างออก แล้ว upsert ครั้งถัดไปจะผูก key ใหม่ให้เอง
+    # (services/case_upsert.py) โดยไม่ชนกับ case ที่มีอยู่แล้วในหน่วยงานปลายทาง
+    return _bulk_update(
+        conditions + [table.c.department_id != department_id],
+        {'department_id': department_id, 'external_ref': None}
+    )
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+ตรวจ case ซ้ำก่อนเพิ่มข้อมูล: HN เดียวกัน หน่วยงานเดียวกัน และวันที่ของ case เดียวกัน
+ใช้ partial index ix_patient_case_duplicate_key (เฉพาะ cases ที่ยังไม่ถูกลบ, ดู models/indexes.py)
+มีทั้งแบบรายการเดียว (api_create_case) และแบบหลายรายการใน query เดียว (สำหรับ import)
+
+หมายเหตุ: เป็นการตรวจก่อน insert ไม่ใช่ unique constraint (ข้อมูลเดิมยังมี cases ซ้ำอยู่)
+"""
+
+from sqlalchemy import tuple_
+from models import db, PatientCase
+from .case_serializers import project_cases, serialize_case_rows, CASE_LIST_FIELDS
+
+# จำนวน key ต่อ query (3 พารามิเตอร์ต่อ key)
+DUPLICATE_CHECK_BATCH_SIZE = 300
+
+
+def duplicate_key(hn, department_id, case_date):
+    """key สำหรับเทียบ case ซ้ำ (hn ตัดช่องว่างหัวท้าย)"""
+    return ((hn or '').strip(), int(department_id), case_date)
+
+
+def find_duplicate_case(hn, department_id, case_date):
+    """
+    case ที่ยังไม่ถูกลบซึ่งมี (hn, department_id, case_date) ตรงกัน (query เดียว)
+
+    Returns:
+        dict: case ที่มีอยู่แล้ว (รูปแบบเดียวกับรายการ cases) หรือ None
+    """
+    hn, department_id, case_date = duplicate_key(hn, department_id, case_date)
+    query = db.session.query(PatientCase).filter(
+        PatientCase.hn == hn,
+        PatientCase.department_id == department_id,
+        PatientCase.case_date == case_date,
+        PatientCase.is_deleted == False
+    ).order_by(PatientCase.id)
+    row = project_cases(query, CASE_LIST_FIELDS).first()
+    return serialize_case_rows([row], CASE_LIST_FIELDS)[0] if row else None
+
+
+def find_duplicate_cases(keys):
+    """
+    ตรวจ case ซ้ำหลายรายการ (query ละไม่เกิน DUPLICATE_CHECK_BATCH_SIZE key)
+
+    Args:
+        keys: รายการ (hn, department_id, case_date)
+
+    Returns:
+        dict: {duplicate_key: case ที่มีอยู่แล้ว (รายการแรกตาม id)} เฉพาะ key ที่ซ้ำ
+    """
+    keys = list(dict.fromkeys(duplicate_key(*key) for key in keys))
+    duplicates = {}
+    for start in range(0, len(keys), DUPLICATE_CHECK_BATCH_SIZE):
+        batch = keys[start:start + DUPLICATE_CHECK_BATCH_SIZE]
+        query = db.session.query(PatientCase).filter(
+            tuple_(PatientCase.hn, PatientCase.department_id, PatientCase.case_date).in_(batch),
+            PatientCase.is_deleted == False
+        ).order_by(PatientCase.id)
+        rows = project_cases(query, CASE_LIST_FIELDS).all()
+        for row, case in zip(rows, serialize_case_rows(rows, CASE_LIST_FIELDS)):
+            duplicates.setdefault((row.hn, row.department_id, row.case_date), case)
+    return duplicates
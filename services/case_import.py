@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Import cases จากไฟล์ CSV (เช่น ไฟล์ export รายคืนจาก HIS)
+1. อ่านทั้งไฟล์และตรวจสอบทุกแถวในรอบเดียว: HN, รหัสหน่วยงาน, วันที่ และ case ซ้ำ
+   (โหลดหน่วยงานทั้งหมดครั้งเดียว และตรวจ case ซ้ำกับฐานข้อมูลแบบหลายแถวต่อ query)
+2. เพิ่มแถวที่ผ่านด้วย services/case_bulk.py (INSERT ชุดละหลายแถว, commit ทีละชุด)
+3. รายงานแถวที่ไม่ผ่านพร้อมเหตุผล
+
+คอลัมน์: hn, first_name, last_name, department_code, case_date
+        (ไม่บังคับ: notes, external_link, link_type)
+"""
+
+import csv
+import io
+from datetime import datetime
+from models import db, Department
+from utils.helpers import validate_hn
+from .case_search import normalize_hn_input
+from .case_duplicates import duplicate_key, find_duplicate_cases
+from .case_bulk import bulk_insert_cases, BULK_BATCH_SIZE
+
+REQUIRED_COLUMNS = ('hn', 'first_name', 'last_name', 'department_code', 'case_date')
+OPTIONAL_COLUMNS = ('notes', 'external_link', 'link_type')
+
+# รูปแบบวันที่ที่รองรับ (ปี พ.ศ. จะถูกแปลงเป็น ค.ศ.)
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+# ปีที่มากกว่านี้ถือเป็นปี พ.ศ.
+BUDDHIST_YEAR_THRESHOLD = 2400
+
+
+def read_case_csv(stream):
+    """
+    อ่านไฟล์ CSV เป็นรายการ dict (รองรับ UTF-8 ที่มี BOM จาก Excel)
+
+    Args:
+        stream: ไฟล์แบบ binary หรือ text
+
+    Returns:
+        list: dict ของแต่ละแถว พร้อม 'line' (เลขบรรทัดในไฟล์)
+
+    Raises:
+        ValueError: ถ้าไม่มีคอลัมน์ที่จำเป็น
+    """
+    if isinstance(stream, (bytes, bytearray)):
+        stream = io.BytesIO(stream)
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    reader = csv.DictReader(stream)
+    columns = {(name or '').strip().lower() for name in reader.fieldnames or ()}
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f'ไม่พบคอลัมน์ที่จำเป็น: {", ".join(missing)}')
+
+    records = []
+    for record in reader:
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in record.items() if key}
+        row['line'] = reader.line_num
+        records.append(row)
+    return records
+
+
+def parse_case_date(value):
+    """
+    แปลงวันที่จาก CSV (YYYY-MM-DD, DD/MM/YYYY, DD-MM-YYYY และปี พ.ศ.)
+
+    Returns:
+        date หรือ None ถ้ารูปแบบไม่ถูกต้อง
+    """
+    for date_format in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+        if parsed.year > BUDDHIST_YEAR_THRESHOLD:
+            parsed = parsed.replace(year=parsed.year - 543)
+        return parsed
+    return None
+
+
+def validate_case_rows(records, allow_duplicates=False):
+    """
+    ตรวจสอบทุกแถวก่อน import
+
+    Args:
+        records (list): ผลจาก read_case_csv
+        allow_duplicates (bool): ไม่ตรวจ case ซ้ำ
+
+    Returns:
+        tuple: (แถวที่ผ่าน พร้อม department_id และ case_date ที่แปลงแล้ว,
+                รายการ {'line', 'hn', 'errors'} ของแถวที่ไม่ผ่าน)
+    """
+    departments = {
+        code.lower(): dept_id
+        for dept_id, code in db.session.query(Department.id, Department.code).all()
+        if code
+    }
+
+    checked = []
+    rejected = []
+    for record in records:
+        errors = []
+        hn = normalize_hn_input(record.get('hn', ''))
+        if not hn or not validate_hn(hn):
+            errors.append('HN ไม่ถูกต้อง')
+        if not record.get('first_name') or not record.get('last_name'):
+            errors.append('ไม่มีชื่อหรือนามสกุล')
+        department_id = departments.get(record.get('department_code', '').lower())
+        if department_id is None:
+            errors.append(f'ไม่พบรหัสหน่วยงาน {record.get("department_code", "")}')
+        case_date = parse_case_date(record.get('case_date', ''))
+        if case_date is None:
+            errors.append('รูปแบบวันที่ไม่ถูกต้อง')
+
+        if errors:
+            rejected.append({'line': record['line'], 'hn': record.get('hn'), 'errors': errors})
+            continue
+
+        row = {column: record.get(column) or None for column in OPTIONAL_COLUMNS}
+        row.update({
+            'line': record['line'],
+            'hn': hn,
+            'first_name': record['first_name'],
+            'last_name': record['last_name'],
+            'department_id': department_id,
+            'case_date': case_date
+        })
+        checked.append(row)
+
+    if allow_duplicates:
+        return checked, rejected
+
+    # case ซ้ำภายในไฟล์ และซ้ำกับข้อมูลเดิม
+    existing = find_duplicate_cases(
+        (row['hn'], row['department_id'], row['case_date']) for row in checked
+    )
+    valid = []
+    seen = {}
+    for row in checked:
+        key = duplicate_key(row['hn'], row['department_id'], row['case_date'])
+        if key in existing:
+            rejected.append({
+                'line': row['line'], 'hn': row['hn'],
+                'errors': [f'มี case นี้อยู่แล้ว (id {existing[key]["id"]})']
+            })
+        elif key in seen:
+            rejected.append({
+                'line': row['line'], 'hn': row['hn'],
+                'errors': [f'ซ้ำกับบรรทัด {seen[key]} ในไฟล์']
+            })
+        else:
+            seen[key] = row['line']
+            valid.append(row)
+
+    rejected.sort(key=lambda item: item['line'])
+    return valid, rejected
+
+
+def import_cases(records, created_by=None, allow_duplicates=False, dry_run=False, batch_size=BULK_BATCH_SIZE):
+    """
+    ตรวจสอบและเพิ่ม cases จาก records
+
+    Returns:
+        dict: total, valid, imported, rejected (รายการแถวที่ไม่ผ่าน/เพิ่มไม่สำเร็จ)
+    """
+    valid, rejected = validate_case_rows(records, allow_duplicates)
+    imported = 0
+    if not dry_run and valid:
+        imported, failures = bulk_insert_cases(valid, created_by, batch_size)
+        for batch, error in failures:
+            rejected.extend(
+                {'line': row['line'], 'hn': row['hn'], 'errors': [f'บันทึกไม่สำเร็จ: {error}']}
+                for row in batch
+            )
+        rejected.sort(key=lambda item: item['line'])
+
+    return {
+        'total': len(records),
+        'valid': len(valid),
+        'imported': imported,
+        'rejected': rejected
+    }
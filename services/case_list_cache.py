@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Result cache ของรายการ cases (/api/admin/cases)
+เก็บ response ที่ serialize แล้วตามชุด filter
+จำกัดหน่วยความจำด้วย LRU ตามจำนวน byte (CASE_LIST_CACHE_BYTES)
+และล้างตามหน่วยงานเมื่อมีการ commit cases ของหน่วยงานนั้น
+(รายการที่ไม่ได้กรองหน่วยงานจะถูกล้างทุกครั้งที่ cases เปลี่ยน)
+
+หมายเหตุ: cache อยู่ใน process เดียว worker อื่นจะเห็นข้อมูลใหม่ภายใน CASE_LIST_CACHE_TTL
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from sqlalchemy import event, inspect
+from models import db, Department, PatientCase
+
+# ค่าเริ่มต้นถ้าไม่ได้กำหนด CASE_LIST_CACHE_BYTES / CASE_LIST_CACHE_TTL
+DEFAULT_CACHE_BYTES = 8 * 1024 * 1024
+DEFAULT_CACHE_TTL = 60
+
+# ขอบเขตของรายการที่ไม่ได้กรองหน่วยงาน
+ALL_DEPARTMENTS = None
+
+ResultEntry = namedtuple('ResultEntry', ['body', 'department_id', 'expires_at'])
+
+
+class CaseListCache:
+    """LRU cache แบบจำกัด byte พร้อมการล้างตามหน่วยงาน (thread-safe)"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._keys_by_department = {}
+        self._lock = threading.Lock()
+        # เพิ่มขึ้นทุกครั้งที่ล้าง เพื่อไม่ให้เก็บผลที่คำนวณก่อนการแก้ไขข้อมูล
+        self.generation = 0
+
+    def get(self, key):
+        """body ของ response ที่ยังไม่หมดอายุ หรือ None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.body
+
+    def set(self, key, body, department_id, ttl, generation):
+        """เก็บ body (bytes) ถ้าไม่มีการล้าง cache ระหว่างคำนวณ และไม่ใหญ่เกิน budget"""
+        if ttl <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = ResultEntry(body, department_id, time.monotonic() + ttl)
+            self._keys_by_department.setdefault(department_id, set()).add(key)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.size -= len(entry.body)
+        keys = self._keys_by_department.get(entry.department_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_department[entry.department_id]
+
+    def invalidate(self, department_ids=None):
+        """
+        ล้างรายการของหน่วยงานที่ระบุ และรายการที่ไม่ได้กรองหน่วยงาน
+
+        Args:
+            department_ids: id ของหน่วยงาน (None = ล้างทั้งหมด)
+        """
+        with self._lock:
+            self.generation += 1
+            if department_ids is None:
+                self._entries.clear()
+                self._keys_by_department.clear()
+                self.size = 0
+                return
+            for department_id in set(department_ids) | {ALL_DEPARTMENTS}:
+                for key in list(self._keys_by_department.get(department_id, ())):
+                    self._remove(key)
+
+
+case_list_cache = CaseListCache()
+
+
+def configure_case_list_cache(app):
+    """ตั้งค่า budget ของ cache จาก config CASE_LIST_CACHE_BYTES"""
+    case_list_cache.max_bytes = int(app.config.get('CASE_LIST_CACHE_BYTES', DEFAULT_CACHE_BYTES))
+
+
+def get_case_list_cache_ttl():
+    """TTL ของ cache จาก config CASE_LIST_CACHE_TTL"""
+    return int(current_app.config.get('CASE_LIST_CACHE_TTL', DEFAULT_CACHE_TTL))
+
+
+def case_list_cache_key(search, department_id, status, cursor, per_page, **options):
+    """
+    key ของ cache จาก filter (ค่าว่าง = None)
+    คำค้นใช้ตามที่ส่งมา เพราะการค้นหาแบบ contains ใช้ข้อความเดิม ("a  b" กับ "a b" ให้ผลต่างกัน)
+
+    Args:
+        options: พารามิเตอร์อื่นที่มีผลต่อผลลัพธ์ (เช่น page, include_total)
+
+    Returns:
+        tuple
+    """
+    return (search or None, department_id or None, status or None, cursor or None, per_page) + tuple(sorted(options.items()))
+
+
+def invalidate_case_list_cache(department_ids=None):
+    """ล้าง cache ของรายการ cases (เรียกหลังการเขียนที่ไม่ผ่าน ORM session เช่น bulk UPDATE)"""
+    case_list_cache.invalidate(department_ids)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _mark_case_list_changes(db_session, flush_context, instances):
+    """จดหน่วยงานของ cases ที่ transaction นี้แก้ไข (รวมหน่วยงานเดิมเมื่อย้าย case)"""
+    changes = db_session.info.setdefault('case_list_departments', set())
+    for obj in list(db_session.new) + list(db_session.dirty) + list(db_session.deleted):
+        if isinstance(obj, Department):
+            # ชื่อหน่วยงานอยู่ในทุกรายการ
+            db_session.info['case_list_all'] = True
+        elif isinstance(obj, PatientCase):
+            changes.add(obj.department_id)
+            changes.update(inspect(obj).attrs.department_id.history.deleted or ())
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(db_session):
+    departments = db_session.info.pop('case_list_departments', None)
+    if db_session.info.pop('case_list_all', False):
+        invalidate_case_list_cache()
+    elif departments:
+        invalidate_case_list_cache(departments)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_after_rollback(db_session):
+    db_session.info.pop('case_list_departments', None)
+    db_session.info.pop('case_list_all', None)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+ดึง cases หลายรายการในครั้งเดียวด้วย id หรือ HN (สำหรับ admin UI และการเชื่อมต่อ HIS)
+ใช้ query เดียวแบบ IN-list แทนการเรียก endpoint ของ case ทีละรายการ
+"""
+
+from models import db, PatientCase
+from .case_search import normalize_hn_input
+from .case_serializers import project_cases, serialize_case_rows, CASE_LIST_FIELDS
+
+# จำนวน id/HN สูงสุดต่อ request
+MAX_LOOKUP_ITEMS = 1000
+
+
+def _unique(values):
+    """ตัดค่าซ้ำโดยคงลำดับเดิม"""
+    seen = set()
+    result = []
+    for value in values:
+        if value not in seen:
+            seen.add(value)
+            result.append(value)
+    return result
+
+
+def normalize_lookup_ids(values):
+    """
+    แปลงรายการ id เป็น int
+
+    Raises:
+        ValueError: ถ้ามีค่าที่ไม่ใช่ตัวเลข
+    """
+    try:
+        return _unique(int(value) for value in values)
+    except (TypeError, ValueError):
+        raise ValueError('รายการ id ต้องเป็นตัวเลข')
+
+
+def normalize_lookup_hns(values):
+    """
+    แปลงรายการ HN เป็นตัวเลขล้วน (ตัด 'HN' และตัวคั่นออก)
+
+    Raises:
+        ValueError: ถ้ามีค่าที่ไม่ใช่รูปแบบ HN
+    """
+    hns = []
+    for value in values:
+        hn = normalize_hn_input(str(value))
+        if hn is None:
+            raise ValueError(f'HN ไม่ถูกต้อง: {value}')
+        hns.append(hn)
+    return _unique(hns)
+
+
+def fetch_cases_by_ids(ids):
+    """
+    ดึง cases ที่ยังไม่ถูกลบตามรายการ id (query เดียว)
+
+    Returns:
+        tuple: (รายการ dict ตามลำดับของ ids, id ที่ไม่พบ)
+    """
+    query = db.session.query(PatientCase).filter(
+        PatientCase.id.in_(ids),
+        PatientCase.is_deleted == False
+    )
+    rows = project_cases(query, CASE_LIST_FIELDS).all()
+    by_id = {case['id']: case for case in serialize_case_rows(rows, CASE_LIST_FIELDS)}
+    cases = [by_id[case_id] for case_id in ids if case_id in by_id]
+    missing = [case_id for case_id in ids if case_id not in by_id]
+    return cases, missing
+
+
+def fetch_cases_by_hns(hns):
+    """
+    ดึง cases ที่ยังไม่ถูกลบตามรายการ HN (query เดียว, HN หนึ่งอาจมีหลาย cases)
+
+    Returns:
+        tuple: (รายการ dict เรียงตามลำดับของ hns แล้วจากใหม่ไปเก่า, HN ที่ไม่พบ)
+    """
+    query = db.session.query(PatientCase).filter(
+        PatientCase.hn.in_(hns),
+        PatientCase.is_deleted == False
+    ).order_by(PatientCase.created_at.desc(), PatientCase.id.desc())
+    rows = project_cases(query, CASE_LIST_FIELDS).all()
+    by_hn = {}
+    for case in serialize_case_rows(rows, CASE_LIST_FIELDS):
+        by_hn.setdefault(case['hn'], []).append(case)
+    cases = [case for hn in hns for case in by_hn.get(hn, ())]
+    missing = [hn for hn in hns if hn not in by_hn]
+    return cases, missing
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Name search index สำหรับค้นหาชื่อผู้ป่วย (รองรับภาษาไทย)
+เก็บชื่อที่ normalize แล้ว (utils.helpers.normalize_thai_name) ในตาราง case_name_index
+อัปเดตใน transaction เดียวกับการเขียน PatientCase ผ่าน session event
+
+ตัวเร่งการค้นหาแบบ substring ตามฐานข้อมูล:
+- SQLite: FTS5 virtual table (tokenizer แบบ trigram) ซิงก์ด้วย trigger
+- PostgreSQL: pg_trgm GIN index บน name_key (LIKE '%...%' ใช้ index ได้)
+ถ้าสร้างตัวเร่งไม่ได้ จะค้นหาด้วย LIKE บน case_name_index แทน (ผลลัพธ์เหมือนกัน)
+ก่อน ensure_case_name_index() ตรวจ index ใน process นี้ จะค้นหาด้วย LIKE บน patient_case โดยตรง
+"""
+
+from sqlalchemy import event, inspect, select, delete, insert, text, func, and_
+from models import db, PatientCase, CaseNameIndex
+from utils.helpers import normalize_thai_name
+
+FTS_TABLE = 'case_name_fts'
+
+# trigram ต้องการคำค้นอย่างน้อย 3 ตัวอักษร
+MIN_TRIGRAM_LENGTH = 3
+
+# จำนวนแถวต่อรอบตอนสร้าง index ใหม่
+REBUILD_BATCH_SIZE = 1000
+
+SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name_key, content='case_name_index', content_rowid='case_id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS case_name_index_ai AFTER INSERT ON case_name_index BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name_key) VALUES (new.case_id, new.name_key); END",
+    f"CREATE TRIGGER IF NOT EXISTS case_name_index_ad AFTER DELETE ON case_name_index BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_key) VALUES ('delete', old.case_id, old.name_key); END",
+    f"CREATE TRIGGER IF NOT EXISTS case_name_index_au AFTER UPDATE ON case_name_index BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_key) VALUES ('delete', old.case_id, old.name_key); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name_key) VALUES (new.case_id, new.name_key); END",
+)
+
+POSTGRESQL_TRGM_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_case_name_index_trgm ON case_name_index USING gin (name_key gin_trgm_ops)",
+)
+
+# ผลการตรวจว่ามี FTS table หรือไม่ ต่อ engine (url)
+_fts_available = {}
+
+# index ถูกตรวจ/สร้างแล้วใน process นี้ (ensure_case_name_index หรือ rebuild_case_name_index)
+_name_index_ready = False
+# พบตาราง case_name_index ในฐานข้อมูลแล้ว (ตรวจจนกว่าจะพบ)
+_name_index_table_exists = False
+
+
+def case_name_key(first_name, last_name):
+    """key สำหรับค้นหาของ case (ชื่อและนามสกุลที่ normalize แล้ว)"""
+    return normalize_thai_name(f'{first_name or ""} {last_name or ""}')
+
+
+def _uses_fts(connection):
+    """ใช้ FTS5 ได้หรือไม่ (SQLite ที่สร้าง virtual table ไว้แล้ว)"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    key = str(connection.engine.url)
+    if key not in _fts_available:
+        _fts_available[key] = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {'name': FTS_TABLE}).first() is not None
+    return _fts_available[key]
+
+
+def name_match_subquery(term, connection=None):
+    """
+    select ของ case_id ที่ชื่อมีคำค้น term (substring หลัง normalize)
+
+    Args:
+        term (str): คำค้นหนึ่งคำ
+        connection: connection ที่ใช้ตรวจชนิดฐานข้อมูล (ค่าเริ่มต้น: db.session)
+
+    Returns:
+        Select หรือ None ถ้าคำค้นว่างหลัง normalize
+    """
+    key = normalize_thai_name(term)
+    if not key:
+        return None
+
+    connection = connection or db.session.connection()
+    if len(key) >= MIN_TRIGRAM_LENGTH and _uses_fts(connection):
+        phrase = '"' + key.replace('"', '""') + '"'
+        return select(text('rowid')).select_from(text(FTS_TABLE)).where(
+            text(f'{FTS_TABLE} MATCH :phrase').bindparams(phrase=phrase)
+        )
+    return select(CaseNameIndex.case_id).where(CaseNameIndex.name_key.contains(key, autoescape=True))
+
+
+def name_search_filter(terms):
+    """
+    เงื่อนไขของ PatientCase: ทุกคำค้นต้องพบในชื่อหรือนามสกุล
+
+    Args:
+        terms (list): คำค้น
+
+    Returns:
+        เงื่อนไข SQLAlchemy หรือ None ถ้าไม่มีคำค้นที่ใช้ได้
+    """
+    conditions = []
+    for term in terms:
+        if not _name_index_ready:
+            # index อาจยังว่างอยู่ - ค้นจากชื่อใน patient_case (ไม่ normalize, ช้ากว่าแต่ไม่พลาดผลลัพธ์)
+            term = term.strip()
+            if term:
+                full_name = PatientCase.first_name + ' ' + PatientCase.last_name
+                conditions.append(full_name.contains(term, autoescape=True))
+            continue
+        subquery = name_match_subquery(term)
+        if subquery is not None:
+            conditions.append(PatientCase.id.in_(subquery))
+    if not conditions:
+        return None
+    return and_(*conditions)
+
+
+def write_case_name_keys(connection, keys):
+    """บันทึก {case_id: name_key} (None = ลบ) ลง case_name_index"""
+    global _name_index_table_exists
+    if not keys:
+        return
+    table = CaseNameIndex.__table__
+    if not _name_index_ready and not _name_index_table_exists:
+        _name_index_table_exists = inspect(connection).has_table(table.name)
+        if not _name_index_table_exists:
+            # ยังไม่ได้เตรียมฐานข้อมูล - ensure_case_name_index จะสร้าง index จาก patient_case ทั้งหมด
+            return
+    connection.execute(delete(table).where(table.c.case_id.in_(list(keys))))
+    rows = [{'case_id': case_id, 'name_key': key} for case_id, key in keys.items() if key is not None]
+    if rows:
+        connection.execute(insert(table), rows)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _update_case_name_index(session, flush_context):
+    """อัปเดต name index ใน transaction เดียวกับการ flush PatientCase (หลัง INSERT จึงมี id แล้ว)"""
+    keys = {}
+    for obj in session.new:
+        if isinstance(obj, PatientCase):
+            keys[obj.id] = case_name_key(obj.first_name, obj.last_name)
+    for obj in session.dirty:
+        if isinstance(obj, PatientCase):
+            state = inspect(obj)
+            if state.attrs.first_name.history.has_changes() or state.attrs.last_name.history.has_changes():
+                keys[obj.id] = case_name_key(obj.first_name, obj.last_name)
+    for obj in session.deleted:
+        if isinstance(obj, PatientCase):
+            keys[obj.id] = None
+    write_case_name_keys(session.connection(), keys)
+
+
+def setup_name_search(engine=None):
+    """
+    สร้างตัวเร่งการค้นหา (FTS5 หรือ pg_trgm) ถ้าฐานข้อมูลรองรับ
+
+    Returns:
+        bool: True ถ้าใช้ตัวเร่งได้ (False = ค้นหาด้วย LIKE)
+    """
+    engine = engine or db.engine
+    dialect = engine.dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_FTS_DDL
+    elif dialect == 'postgresql':
+        statements = POSTGRESQL_TRGM_DDL
+    else:
+        return False
+
+    try:
+        with engine.begin() as connection:
+            fts_created = dialect == 'sqlite' and connection.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {'name': FTS_TABLE}).first() is None
+            for statement in statements:
+                connection.execute(text(statement))
+            if fts_created:
+                # ตาราง FTS สร้างหลังจากมีข้อมูลแล้ว - ดึงข้อมูลจาก case_name_index
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except Exception as e:
+        print(f"Warning: Name search index accelerator unavailable, using LIKE: {e}")
+        return False
+    finally:
+        _fts_available.pop(str(engine.url), None)
+    return True
+
+
+def rebuild_case_name_index():
+    """
+    สร้าง case_name_index ใหม่ทั้งหมดจาก patient_case
+
+    Returns:
+        int: จำนวนแถวใน index
+    """
+    global _name_index_ready
+    table = CaseNameIndex.__table__
+    try:
+        db.session.execute(delete(table))
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(PatientCase.id, PatientCase.first_name, PatientCase.last_name)
+                .where(PatientCase.id > last_id)
+                .order_by(PatientCase.id)
+                .limit(REBUILD_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            db.session.execute(insert(table), [
+                {'case_id': case_id, 'name_key': case_name_key(first_name, last_name)}
+                for case_id, first_name, last_name in rows
+            ])
+            last_id = rows[-1][0]
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    _name_index_ready = True
+    return db.session.query(func.count()).select_from(table).scalar()
+
+
+def ensure_case_name_index():
+    """
+    เตรียม name search: สร้างตัวเร่งการค้นหา และสร้าง index ครั้งแรกถ้ายังว่างแต่มี cases แล้ว
+
+    Returns:
+        bool: True ถ้ามีการสร้าง index ใหม่
+    """
+    global _name_index_ready
+    CaseNameIndex.__table__.create(db.engine, checkfirst=True)
+    setup_name_search()
+    has_index = db.session.query(CaseNameIndex.case_id).first() is not None
+    has_cases = db.session.query(PatientCase.id).first() is not None
+    if has_cases and not has_index:
+        rebuild_case_name_index()
+        return True
+    _name_index_ready = True
+    return False
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Case rollup สำหรับสถิติผู้ป่วย
+ดูแลตาราง case_daily_count (หน่วยงาน × วัน × ตัวนับ) ให้ตรงกับ patient_case
+โดยอัปเดตใน transaction เดียวกับการเขียน PatientCase ผ่าน session event
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event, inspect, select, func, case, insert, update, and_, text
+from models import db, PatientCase, CaseDailyCount
+
+# คอลัมน์ของ PatientCase ที่มีผลต่อ rollup
+TRACKED_ATTRIBUTES = ('department_id', 'case_date', 'is_deleted', 'file_path', 'external_link')
+
+# ตัวนับใน case_daily_count
+COUNTER_COLUMNS = ('case_count', 'deleted_count', 'file_count', 'link_count')
+
+# rollup ถูกตรวจ/สร้างแล้วใน process นี้ (ensure_case_rollup หรือ rebuild_case_rollup)
+_rollup_ready = False
+# พบตาราง case_daily_count ในฐานข้อมูลแล้ว (ตรวจจนกว่าจะพบ)
+_rollup_table_exists = False
+
+
+def _to_date(value):
+    """แปลงค่า case_date ให้เป็น date (รองรับ datetime ที่ส่งมาจาก API)"""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _bucket(department_id, case_date, is_deleted, file_path=None, external_link=None):
+    """
+    แปลงสถานะของ case เป็น (key, counters) สำหรับ rollup
+
+    Returns:
+        tuple: ((department_id, case_date), dict ตัวนับ) หรือ None ถ้าไม่มีข้อมูลพอ
+    """
+    case_date = _to_date(case_date)
+    if department_id is None or case_date is None or is_deleted is None:
+        return None
+
+    counters = dict.fromkeys(COUNTER_COLUMNS, 0)
+    if is_deleted:
+        counters['deleted_count'] = 1
+    else:
+        counters['case_count'] = 1
+        counters['file_count'] = 1 if file_path else 0
+        counters['link_count'] = 1 if external_link else 0
+    return (department_id, case_date), counters
+
+
+def _current_state(case_obj, pending=False):
+    """สถานะปัจจุบัน (หลังแก้ไข) ของ case ใน session"""
+    department_id = case_obj.department_id
+    if department_id is None and case_obj.department is not None:
+        department_id = case_obj.department.id
+    is_deleted = case_obj.is_deleted
+    if pending and is_deleted is None:
+        # case ใหม่จะได้ค่า default is_deleted=False ตอน INSERT
+        is_deleted = False
+    return department_id, case_obj.case_date, is_deleted, case_obj.file_path, case_obj.external_link
+
+
+def _persisted_state(session, case_obj):
+    """
+    สถานะที่บันทึกในฐานข้อมูล (ก่อนแก้ไข) ของ case
+
+    ใช้ attribute history ถ้ามีค่าเดิมอยู่แล้ว ไม่เช่นนั้นอ่านจากฐานข้อมูล
+    """
+    state = inspect(case_obj)
+    values = []
+    for attr in TRACKED_ATTRIBUTES:
+        history = state.attrs[attr].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            break
+    else:
+        return tuple(values)
+
+    row = session.connection().execute(
+        select(*[getattr(PatientCase, attr) for attr in TRACKED_ATTRIBUTES])
+        .where(PatientCase.id == case_obj.id)
+    ).first()
+    if row is None:
+        return None
+    return tuple(row)
+
+
+def _add_delta(deltas, bucket, sign):
+    if bucket is None:
+        return
+    key, counters = bucket
+    for column, value in counters.items():
+        deltas[key][column] += sign * value
+
+
+def collect_case_deltas(session):
+    """
+    คำนวณการเปลี่ยนแปลงของ rollup จาก PatientCase ที่รอ flush ใน session
+
+    Returns:
+        dict: {(department_id, case_date): {counter: delta}}
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+
+    for obj in session.new:
+        if isinstance(obj, PatientCase):
+            _add_delta(deltas, _bucket(*_current_state(obj, pending=True)), 1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, PatientCase) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[attr].history.has_changes() for attr in TRACKED_ATTRIBUTES):
+            continue
+        old_state = _persisted_state(session, obj)
+        if old_state is not None:
+            _add_delta(deltas, _bucket(*old_state), -1)
+        _add_delta(deltas, _bucket(*_current_state(obj)), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, PatientCase):
+            old_state = _persisted_state(session, obj)
+            if old_state is not None:
+                _add_delta(deltas, _bucket(*old_state), -1)
+
+    return {
+        key: dict(counters)
+        for key, counters in deltas.items()
+        if any(counters.values())
+    }
+
+
+def collect_state_deltas(changes):
+    """
+    คำนวณการเปลี่ยนแปลงของ rollup จากสถานะก่อน/หลังของ cases
+    (สำหรับการเขียนแบบ set-based ที่ไม่ผ่าน flush ของ ORM ดู services/case_bulk.py)
+
+    Args:
+        changes: iterable ของ (สถานะเดิม, สถานะใหม่) เรียงตาม TRACKED_ATTRIBUTES (None = ไม่มีแถว)
+
+    Returns:
+        dict: {(department_id, case_date): {counter: delta}}
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for old_state, new_state in changes:
+        if old_state is not None:
+            _add_delta(deltas, _bucket(*old_state), -1)
+        if new_state is not None:
+            _add_delta(deltas, _bucket(*new_state), 1)
+
+    return {
+        key: dict(counters)
+        for key, counters in deltas.items()
+        if any(counters.values())
+    }
+
+
+def apply_case_deltas(connection, deltas):
+    """
+    บันทึกการเปลี่ยนแปลงลง case_daily_count ด้วย upsert
+
+    Args:
+        connection: connection ของ transaction ปัจจุบัน
+        deltas (dict): ผลจาก collect_case_deltas
+    """
+    global _rollup_table_exists
+    if not deltas:
+        return
+
+    table = CaseDailyCount.__table__
+    if not _rollup_ready and not _rollup_table_exists:
+        _rollup_table_exists = inspect(connection).has_table(table.name)
+        if not _rollup_table_exists:
+            # ยังไม่ได้เตรียมฐานข้อมูล - ensure_case_rollup จะสร้างตารางและคำนวณจาก patient_case ทั้งหมด
+            return
+    dialect = connection.dialect.name
+
+    for (department_id, case_date), counters in deltas.items():
+        values = {column: counters.get(column, 0) for column in COUNTER_COLUMNS}
+
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            stmt = dialect_insert(table).values(
+                department_id=department_id, case_date=case_date, **values
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.department_id, table.c.case_date],
+                set_={column: table.c[column] + stmt.excluded[column] for column in COUNTER_COLUMNS}
+            )
+            connection.execute(stmt)
+            continue
+
+        # ฐานข้อมูลอื่น: UPDATE ก่อน ถ้าไม่มีแถวจึง INSERT
+        result = connection.execute(
+            update(table)
+            .where(table.c.department_id == department_id, table.c.case_date == case_date)
+            .values({column: table.c[column] + values[column] for column in COUNTER_COLUMNS})
+        )
+        if result.rowcount == 0:
+            connection.execute(
+                insert(table).values(department_id=department_id, case_date=case_date, **values)
+            )
+
+
+@event.listens_for(db.session, 'before_flush')
+def _update_case_rollup(session, flush_context, instances):
+    """อัปเดต rollup ใน transaction เดียวกับการ flush PatientCase"""
+    deltas = collect_case_deltas(session)
+    if deltas:
+        apply_case_deltas(session.connection(), deltas)
+
+
+def _rollup_select():
+    """SELECT ที่คำนวณแถวของ case_daily_count จาก patient_case (GROUP BY หน่วยงาน, วันที่)"""
+    active = PatientCase.is_deleted == False
+    return select(
+        PatientCase.department_id.label('department_id'),
+        PatientCase.case_date.label('case_date'),
+        func.sum(case((active, 1), else_=0)).label('case_count'),
+        func.sum(case((PatientCase.is_deleted == True, 1), else_=0)).label('deleted_count'),
+        func.sum(case((and_(active, PatientCase.file_path.isnot(None), PatientCase.file_path != ''), 1), else_=0)).label('file_count'),
+        func.sum(case((and_(active, PatientCase.external_link.isnot(None), PatientCase.external_link != ''), 1), else_=0)).label('link_count')
+    ).where(
+        PatientCase.department_id.isnot(None),
+        PatientCase.case_date.isnot(None)
+    ).group_by(
+        PatientCase.department_id, PatientCase.case_date
+    )
+
+
+def case_daily_counts():
+    """
+    แหล่งข้อมูลจำนวน cases ต่อหน่วยงานต่อวันสำหรับ query สถิติ
+    ใช้ตาราง case_daily_count เมื่อ rollup พร้อมแล้ว ไม่เช่นนั้นนับจาก patient_case โดยตรง
+    (เช่น process ที่ยังไม่ได้เตรียมฐานข้อมูล) เพื่อไม่ให้แสดงตัวเลขจาก rollup ที่ยังว่างหรือไม่มีอยู่
+
+    Returns:
+        Table หรือ subquery ที่มีคอลัมน์ department_id, case_date และ COUNTER_COLUMNS (ใช้ผ่าน .c)
+    """
+    if _rollup_ready:
+        return CaseDailyCount.__table__
+    return _rollup_select().subquery('case_daily_count')
+
+
+def rebuild_case_rollup():
+    """
+    สร้าง case_daily_count ใหม่ทั้งหมดจาก patient_case (ลบแล้ว insert จาก SELECT)
+    ควรรันในช่วงปิดปรับปรุงระบบเท่านั้น: บน PostgreSQL จะล็อกตาราง rollup (EXCLUSIVE)
+    จนกว่าจะ commit ทำให้การเพิ่ม/แก้ไข cases ทั้งระบบรอจนสร้างเสร็จ แต่ตัวนับไม่คลาดเคลื่อน
+    ผู้เรียกจากภายนอก prepare_database() ต้องถือ schema_lock() เอง
+
+    Returns:
+        int: จำนวนแถวใน rollup หลังสร้างใหม่
+    """
+    global _rollup_ready
+    table = CaseDailyCount.__table__
+    try:
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # transaction ที่เขียน cases อยู่ต้องเสร็จก่อน และ transaction ใหม่ต้องรอจน rebuild commit
+            # (SQLite ล็อกทั้งฐานข้อมูลเมื่อเริ่มเขียนอยู่แล้ว)
+            db.session.execute(text(f'LOCK TABLE {table.name} IN EXCLUSIVE MODE'))
+        db.session.execute(table.delete())
+        db.session.execute(
+            insert(table).from_select(
+                ['department_id', 'case_date', *COUNTER_COLUMNS], _rollup_select()
+            )
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    _rollup_ready = True
+    return db.session.query(func.count()).select_from(table).scalar()
+
+
+def ensure_case_rollup():
+    """
+    สร้าง rollup ครั้งแรกถ้ายังว่างอยู่แต่มีข้อมูล cases แล้ว (เช่น หลังอัปเกรดระบบ)
+    ถ้าตารางเดิมขาดคอลัมน์ตัวนับใหม่ จะสร้างตารางใหม่ทั้งหมด (ข้อมูลคำนวณจาก patient_case ได้เสมอ)
+
+    Returns:
+        bool: True ถ้ามีการสร้าง rollup ใหม่
+    """
+    global _rollup_ready
+    table = CaseDailyCount.__table__
+    inspector = inspect(db.engine)
+    if not inspector.has_table(table.name):
+        table.create(db.engine)
+        rebuild_case_rollup()
+        return True
+    existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+    if not set(table.columns.keys()) <= existing_columns:
+        table.drop(db.engine)
+        table.create(db.engine)
+        rebuild_case_rollup()
+        return True
+
+    has_rollup = db.session.query(CaseDailyCount.department_id).first() is not None
+    has_cases = db.session.query(PatientCase.id).first() is not None
+    if has_cases and not has_rollup:
+        rebuild_case_rollup()
+        return True
+    _rollup_ready = True
+    return False
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Search planner สำหรับการค้นหา cases
+แยกคำค้นที่เป็น HN ไปใช้ index ของคอลัมน์ hn (ค้นหาตรงตัวหรือขึ้นต้นด้วย)
+และส่งเฉพาะคำค้นที่เป็นชื่อไปค้นหาใน name index (first_name / last_name)
+"""
+
+import re
+from collections import namedtuple
+from sqlalchemy import or_
+from models import PatientCase
+from utils.helpers import validate_hn
+from .case_name_index import name_search_filter
+
+# mode ของแผนการค้นหา
+SEARCH_MODES = ('hn_exact', 'hn_prefix', 'name', 'any')
+
+# จำนวนหลักขั้นต่ำของ HN บางส่วนที่จะค้นหาแบบขึ้นต้นด้วย
+MIN_HN_PREFIX_DIGITS = 3
+
+SearchPlan = namedtuple('SearchPlan', ['mode', 'terms'])
+
+_HN_PREFIX = re.compile(r'^\s*hn\s*[:.]?\s*', re.IGNORECASE)
+_HN_SEPARATORS = re.compile(r'[\s\-/]')
+_HAS_DIGIT = re.compile(r'\d')
+
+
+def normalize_hn_input(term):
+    """
+    ตัดคำนำหน้า 'HN' และตัวคั่น (ช่องว่าง, -, /) ออกจากคำค้น
+
+    Returns:
+        str: ตัวเลขล้วน หรือ None ถ้าไม่ใช่รูปแบบ HN
+    """
+    value = _HN_SEPARATORS.sub('', _HN_PREFIX.sub('', term))
+    return value if value.isdigit() else None
+
+
+def plan_case_search(search):
+    """
+    เลือกวิธีค้นหาจากรูปแบบของคำค้น
+
+    Args:
+        search (str): คำค้นจากผู้ใช้
+
+    Returns:
+        SearchPlan: mode ('hn_exact', 'hn_prefix', 'name', 'any') และ terms
+                    หรือ None ถ้าไม่มีคำค้น
+    """
+    search = (search or '').strip()
+    if not search:
+        return None
+
+    hn = normalize_hn_input(search)
+    if hn is not None:
+        if validate_hn(hn):
+            return SearchPlan('hn_exact', [hn])
+        if len(hn) >= MIN_HN_PREFIX_DIGITS:
+            return SearchPlan('hn_prefix', [hn])
+
+    terms = search.split()
+    if not any(_HAS_DIGIT.search(term) for term in terms):
+        return SearchPlan('name', terms)
+
+    # ตัวเลขสั้นเกินไปหรือมีตัวอักษรปนตัวเลข: ค้นหาทุกคอลัมน์เหมือนเดิม
+    return SearchPlan('any', [search])
+
+
+def _hn_prefix_filter(query, prefix):
+    """เงื่อนไขขึ้นต้นด้วยที่ใช้ index ของ hn ได้"""
+    dialect = query.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # GLOB แยกตัวพิมพ์เล็กใหญ่จึงใช้ index ปกติได้ (LIKE ของ SQLite ใช้ไม่ได้)
+        return PatientCase.hn.op('GLOB')(f'{prefix}*')
+    # PostgreSQL ใช้ index แบบ text_pattern_ops (ดู models/indexes.py)
+    return PatientCase.hn.like(f'{prefix}%')
+
+
+def apply_case_search(query, search):
+    """
+    เพิ่มเงื่อนไขการค้นหาลงใน query ของ PatientCase ตามแผนการค้นหา
+
+    Args:
+        query: SQLAlchemy query ของ PatientCase
+        search (str): คำค้นจากผู้ใช้
+
+    Returns:
+        tuple: (query, SearchPlan หรือ None)
+    """
+    plan = plan_case_search(search)
+    if plan is None:
+        return query, None
+
+    if plan.mode == 'hn_exact':
+        query = query.filter(PatientCase.hn == plan.terms[0])
+    elif plan.mode == 'hn_prefix':
+        query = query.filter(_hn_prefix_filter(query, plan.terms[0]))
+    elif plan.mode == 'name':
+        # ค้นหาผ่าน name index (รองรับภาษาไทย, ดู services/case_name_index.py)
+        condition = name_search_filter(plan.terms)
+        if condition is not None:
+            query = query.filter(condition)
+    else:
+        term = plan.terms[0]
+        query = query.filter(or_(
+            PatientCase.hn.contains(term),
+            PatientCase.first_name.contains(term),
+            PatientCase.last_name.contains(term)
+        ))
+    return query, plan
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Serializer ของรายการ cases แบบเลือกเฉพาะคอลัมน์ (column projection)
+แต่ละ endpoint ประกาศ field ที่ส่งกลับ แล้ว query เลือกเฉพาะคอลัมน์เหล่านั้น
+พร้อม join ชื่อหน่วยงานใน query เดียวกัน และสร้าง dict จาก row tuple โดยตรง
+(ไม่สร้าง ORM instance และไม่ lazy load case.department ทีละแถว)
+"""
+
+from collections import namedtuple
+from models import db, Department, PatientCase
+
+# จำนวนแถวต่อรอบที่ดึงจาก server-side cursor ตอน stream
+STREAM_BATCH_SIZE = 1000
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+
+def _datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+# key: ชื่อใน JSON, column: คอลัมน์ที่ select, format: แปลงค่า (None = ใช้ค่าตรง ๆ)
+CaseField = namedtuple('CaseField', ['key', 'column', 'format'])
+
+# รายการ cases ของ admin API (/api/admin/cases)
+CASE_LIST_FIELDS = (
+    CaseField('id', PatientCase.id, None),
+    CaseField('hn', PatientCase.hn, None),
+    CaseField('first_name', PatientCase.first_name, None),
+    CaseField('last_name', PatientCase.last_name, None),
+    CaseField('case_date', PatientCase.case_date, _isoformat),
+    CaseField('notes', PatientCase.notes, None),
+    CaseField('file_path', PatientCase.file_path, None),
+    CaseField('file_size', PatientCase.file_size, None),
+    CaseField('external_link', PatientCase.external_link, None),
+    CaseField('link_type', PatientCase.link_type, None),
+    CaseField('department_id', PatientCase.department_id, None),
+    CaseField('department_name', Department.name, None),
+    CaseField('created_at', PatientCase.created_at, _isoformat),
+)
+
+# การแจ้งเตือนผู้ป่วยใหม่ (ผู้ใช้ที่ login แล้ว)
+RECENT_PATIENT_FIELDS = (
+    CaseField('id', PatientCase.id, None),
+    CaseField('hn', PatientCase.hn, None),
+    CaseField('first_name', PatientCase.first_name, None),
+    CaseField('last_name', PatientCase.last_name, None),
+    CaseField('department_name', Department.name, None),
+    CaseField('department_code', Department.code, None),
+    CaseField('created_at', PatientCase.created_at, _datetime),
+    CaseField('case_date', PatientCase.case_date, _date),
+)
+
+# การแจ้งเตือนผู้ป่วยใหม่แบบสาธารณะ (ไม่มีข้อมูลส่วนตัว)
+PUBLIC_RECENT_PATIENT_FIELDS = (
+    CaseField('department_name', Department.name, None),
+    CaseField('department_code', Department.code, None),
+    CaseField('created_date', PatientCase.created_at, _date),
+    CaseField('case_date', PatientCase.case_date, _date),
+)
+
+
+def project_cases(query, fields, join_department=True):
+    """
+    เปลี่ยน query ของ PatientCase ให้ select เฉพาะคอลัมน์ของ fields
+
+    คอลัมน์ถูกตั้งชื่อตาม key จึงอ่านค่าจาก row ได้ด้วยชื่อ (เช่น row.created_at
+    สำหรับ keyset pagination)
+
+    Args:
+        query: SQLAlchemy query ของ PatientCase (ใส่ filter แล้ว)
+        fields: tuple ของ CaseField
+        join_department (bool): outer join ตาราง department ถ้ามี field ของหน่วยงาน
+                                (ส่ง False ถ้า query join ไว้แล้ว)
+
+    Returns:
+        query ที่ได้ row tuple แทน PatientCase
+    """
+    columns = [field.column.label(field.key) for field in fields]
+    query = query.with_entities(*columns)
+    if join_department and any(field.column.class_ is Department for field in fields):
+        query = query.outerjoin(Department, Department.id == PatientCase.department_id)
+    return query
+
+
+def serialize_case_rows(rows, fields):
+    """
+    แปลง row tuple (จาก project_cases) เป็น list ของ dict
+
+    Returns:
+        list: dict ตามลำดับ field
+    """
+    keys = [field.key for field in fields]
+    formatters = [(index, field.format) for index, field in enumerate(fields) if field.format]
+    if not formatters:
+        return [dict(zip(keys, row)) for row in rows]
+
+    data = []
+    for row in rows:
+        values = list(row)
+        for index, format_value in formatters:
+            values[index] = format_value(values[index])
+        data.append(dict(zip(keys, values)))
+    return data
+
+
+def serialize_case(case, fields=CASE_LIST_FIELDS):
+    """
+    แปลง PatientCase instance เดียว (เช่น case ที่เพิ่งสร้าง) เป็น dict รูปแบบเดียวกับรายการ
+
+    Returns:
+        dict
+    """
+    values = []
+    for field in fields:
+        if field.column.class_ is Department:
+            department = case.department
+            value = getattr(department, field.column.key) if department else None
+        else:
+            value = getattr(case, field.column.key)
+        values.append(value)
+    return serialize_case_rows([values], fields)[0]
+
+
+def stream_case_rows(query, fields, batch_size=STREAM_BATCH_SIZE):
+    """
+    ดึงผลของ query ทีละชุดจาก server-side cursor (yield_per / stream_results)
+    ใช้กับรายการขนาดใหญ่โดยไม่ต้องโหลดทั้งหมดไว้ในหน่วยความจำ
+
+    Args:
+        query: SQLAlchemy query ของ PatientCase (ใส่ filter และ order_by แล้ว)
+        fields: tuple ของ CaseField
+
+    Yields:
+        list: dict ของ cases ชุดละไม่เกิน batch_size รายการ
+    """
+    statement = project_cases(query, fields).statement
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        for rows in result.partitions():
+            yield serialize_case_rows(rows, fields)
+    finally:
+        result.close()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Case statistics service สำหรับหน้าสถิติสาธารณะ, dashboard และ API
+อ่านจำนวน cases จากตาราง rollup case_daily_count (ดู services/case_rollup.py)
+แทนการ scan ตาราง patient_case ทุกครั้ง (นับจาก patient_case แทนจนกว่า rollup จะพร้อม)
+"""
+
+from datetime import date
+from sqlalchemy import func, select
+from models import db, Department, Guideline, Knowledge, Activity, Contact
+from .case_rollup import case_daily_counts
+from .case_trends import get_monthly_stats
+from .approx_counts import get_count_estimates
+
+
+def get_total_case_count():
+    """
+    จำนวน cases ทั้งหมดที่ยังไม่ถูกลบ (อ่านจาก rollup)
+
+    Returns:
+        int: จำนวน cases
+    """
+    total = db.session.query(func.sum(case_daily_counts().c.case_count)).scalar()
+    return int(total or 0)
+
+
+def get_department_case_counts():
+    """
+    นับจำนวน cases ที่ยังไม่ถูกลบ แยกตามหน่วยงาน ด้วย GROUP BY query เดียวบน rollup
+
+    Returns:
+        list: รายการ dict (id, name, code, count, files, links) เฉพาะหน่วยงานที่มี case
+              เรียงตามจำนวน case จากมากไปน้อย
+    """
+    counts = case_daily_counts()
+    case_count = func.sum(counts.c.case_count)
+    rows = db.session.query(
+        Department.id,
+        Department.name,
+        Department.code,
+        case_count,
+        func.sum(counts.c.file_count),
+        func.sum(counts.c.link_count)
+    ).join(
+        counts, counts.c.department_id == Department.id
+    ).group_by(
+        Department.id, Department.name, Department.code
+    ).having(
+        case_count > 0
+    ).order_by(
+        case_count.desc(), Department.id
+    ).all()
+
+    return [
+        {
+            'id': dept_id,
+            'name': name,
+            'code': code,
+            'count': int(count),
+            'files': int(files or 0),
+            'links': int(links or 0)
+        }
+        for dept_id, name, code, count, files, links in rows
+    ]
+
+
+def get_case_stats():
+    """
+    สถิติ cases สำหรับหน้า /stats และ /api/public/stats
+
+    Returns:
+        dict: total_cases, cases_with_files, cases_with_links และ departments
+              (ดู get_department_case_counts)
+    """
+    departments = get_department_case_counts()
+    return {
+        'total_cases': sum(dept['count'] for dept in departments),
+        'cases_with_files': sum(dept['files'] for dept in departments),
+        'cases_with_links': sum(dept['links'] for dept in departments),
+        'departments': departments
+    }
+
+
+def get_public_stats():
+    """
+    สถิติทั้งหมดที่ใช้ในหน้า stats.html
+
+    Returns:
+        dict: stats object ในรูปแบบที่ template ใช้
+              (approximate คือรายชื่อตัวนับที่เป็นค่าประมาณ เช่น ['total_guidelines'])
+    """
+    case_stats = get_case_stats()
+    # ค่าประมาณจากสถิติของ planner (เฉพาะเมื่อเปิด STATS_COUNT_MODE=approximate และตารางใหญ่พอ)
+    # จำนวน cases มาจาก rollup อยู่แล้ว - ประมาณเฉพาะตัวนับที่ต้อง COUNT ทั้งตาราง
+    estimates = get_count_estimates(['guidelines'])
+    total_guidelines = estimates.get('guidelines')
+    if total_guidelines is None:
+        total_guidelines = db.session.query(func.count(Guideline.id)).scalar()
+    return {
+        'total_cases': case_stats['total_cases'],
+        'dept_stats': [
+            {'name': dept['name'], 'count': dept['count']}
+            for dept in case_stats['departments']
+        ],
+        'total_guidelines': total_guidelines,
+        'approximate': ['total_guidelines'] if 'guidelines' in estimates else [],
+        'cases_with_files': case_stats['cases_with_files'],
+        'cases_with_links': case_stats['cases_with_links'],
+        'monthly_stats': get_monthly_stats()
+    }
+
+
+def get_dashboard_summary(today=None):
+    """
+    ตัวเลขทั้งหมดของ dashboard (HTML และ API) ด้วย statement เดียว
+    ใช้ scalar subquery ต่อหนึ่งตัวนับ จึงเสียเพียง 1 round trip ไปยังฐานข้อมูล
+
+    Args:
+        today (date): วันที่ใช้นับ cases วันนี้ (ค่าเริ่มต้น: วันนี้)
+
+    ตัวนับที่ประมาณได้จากสถิติของ planner (approximate mode) จะไม่ถูกนับซ้ำใน statement
+
+    Returns:
+        dict: departments, guidelines, knowledge, activities, contacts,
+              total_cases, today_cases และ approximate (รายชื่อตัวนับที่เป็นค่าประมาณ)
+    """
+    today = today or date.today()
+    estimates = get_count_estimates()
+
+    def count(model):
+        return select(func.count(model.id)).scalar_subquery()
+
+    counts = case_daily_counts()
+
+    def case_total(*criteria):
+        return select(
+            func.coalesce(func.sum(counts.c.case_count), 0)
+        ).where(*criteria).scalar_subquery()
+
+    counters = {
+        'departments': count(Department),
+        'guidelines': count(Guideline),
+        'knowledge': count(Knowledge),
+        'activities': count(Activity),
+        'contacts': count(Contact),
+        'total_cases': case_total(),
+        'today_cases': case_total(counts.c.case_date == today)
+    }
+    row = db.session.execute(select(*[
+        expression.label(name)
+        for name, expression in counters.items()
+        if name not in estimates
+    ])).one()
+
+    summary = {key: int(value or 0) for key, value in row._mapping.items()}
+    summary.update(estimates)
+    summary['approximate'] = sorted(estimates)
+    return summary
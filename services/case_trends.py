@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Case trend service สำหรับกราฟแนวโน้มจำนวนผู้ป่วย
+แบ่งช่วงเวลา (รายวัน/รายสัปดาห์/รายเดือน) ตาม case_date ในฐานข้อมูลจากตาราง rollup
+ด้วย GROUP BY query เดียว ไม่ว่าช่วงเวลาจะยาวเท่าใด
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import func
+from models import db, Department
+from .case_rollup import case_daily_counts
+
+PERIODS = ('day', 'week', 'month')
+
+# จำนวนช่วงเวลาสูงสุดต่อคำขอ (ป้องกัน response ขนาดใหญ่เกินไป)
+MAX_TREND_BUCKETS = 400
+
+THAI_SHORT_MONTHS = [
+    "ม.ค.", "ก.พ.", "มี.ค.", "เม.ย.", "พ.ค.", "มิ.ย.",
+    "ก.ค.", "ส.ค.", "ก.ย.", "ต.ค.", "พ.ย.", "ธ.ค."
+]
+
+
+def bucket_start(value, period):
+    """
+    วันเริ่มต้นของช่วงเวลาที่ value อยู่
+
+    Args:
+        value (date): วันที่
+        period (str): 'day', 'week' (เริ่มวันจันทร์) หรือ 'month'
+
+    Returns:
+        date: วันแรกของช่วงเวลา
+    """
+    if period == 'month':
+        return value.replace(day=1)
+    if period == 'week':
+        return value - timedelta(days=value.weekday())
+    return value
+
+
+def _next_bucket(value, period):
+    if period == 'month':
+        if value.month == 12:
+            return value.replace(year=value.year + 1, month=1)
+        return value.replace(month=value.month + 1)
+    if period == 'week':
+        return value + timedelta(days=7)
+    return value + timedelta(days=1)
+
+
+def iter_buckets(start, end, period):
+    """
+    รายการวันเริ่มต้นของทุกช่วงเวลาระหว่าง start ถึง end (รวมทั้งสองวัน)
+
+    Returns:
+        list: รายการ date
+    """
+    buckets = []
+    current = bucket_start(start, period)
+    while current <= end:
+        buckets.append(current)
+        current = _next_bucket(current, period)
+    return buckets
+
+
+def default_window(period='month', count=6, today=None):
+    """
+    ช่วงเวลาเริ่มต้น: count ช่วงล่าสุดนับรวมช่วงปัจจุบัน
+
+    Returns:
+        tuple: (start, end)
+    """
+    end = today or date.today()
+    start = bucket_start(end, period)
+    for _ in range(count - 1):
+        if period == 'month':
+            start = bucket_start(start - timedelta(days=1), 'month')
+        elif period == 'week':
+            start = start - timedelta(days=7)
+        else:
+            start = start - timedelta(days=1)
+    return start, end
+
+
+def _bucket_expression(dialect, period, column):
+    """
+    SQL expression ที่คืนวันเริ่มต้นของช่วงเวลา (ของคอลัมน์วันที่ column) เป็น string 'YYYY-MM-DD'
+
+    Returns:
+        expression หรือ None ถ้าฐานข้อมูลไม่รองรับ (จะแบ่งช่วงใน Python แทน)
+    """
+    if dialect == 'sqlite':
+        if period == 'month':
+            return func.strftime('%Y-%m-01', column)
+        if period == 'week':
+            return func.date(column, '-6 days', 'weekday 1')
+        return func.date(column)
+    if dialect == 'postgresql':
+        if period == 'day':
+            return func.to_char(column, 'YYYY-MM-DD')
+        return func.to_char(func.date_trunc(period, column), 'YYYY-MM-DD')
+    return None
+
+
+def get_case_trend(period='month', start=None, end=None, department_ids=None):
+    """
+    จำนวน cases ที่ยังไม่ถูกลบ แยกตามหน่วยงานและช่วงเวลา
+
+    Args:
+        period (str): 'day', 'week' หรือ 'month'
+        start (date): วันเริ่มต้น (ค่าเริ่มต้น: 6 ช่วงล่าสุด) จะถูกปัดลงเป็นวันแรกของช่วงเวลา
+            เพื่อไม่ให้ช่วงแรกนับไม่ครบ (เช่น start กลางเดือนจะนับตั้งแต่วันที่ 1)
+        end (date): วันสิ้นสุด (ค่าเริ่มต้น: วันนี้)
+        department_ids (list): กรองเฉพาะหน่วยงาน (None = ทั้งหมด)
+
+    Returns:
+        dict: period, start (หลังปัดลง), requested_start, end, labels, totals
+            และ departments (counts ตาม labels)
+
+    Raises:
+        ValueError: ถ้า period ไม่ถูกต้องหรือช่วงเวลายาวเกิน MAX_TREND_BUCKETS
+    """
+    if period not in PERIODS:
+        raise ValueError(f'period ต้องเป็นหนึ่งใน {", ".join(PERIODS)}')
+
+    if start is None or end is None:
+        default_start, default_end = default_window(period, today=end)
+        start = start or default_start
+        end = end or default_end
+    if start > end:
+        raise ValueError('วันเริ่มต้นต้องไม่มากกว่าวันสิ้นสุด')
+
+    # ปัด start ลงเป็นวันแรกของช่วงเวลา ให้ช่วงแรกนับครบเหมือนช่วงอื่น
+    requested_start = start
+    start = bucket_start(start, period)
+
+    buckets = iter_buckets(start, end, period)
+    if len(buckets) > MAX_TREND_BUCKETS:
+        raise ValueError(f'ช่วงเวลายาวเกินไป (สูงสุด {MAX_TREND_BUCKETS} ช่วง)')
+
+    counts = case_daily_counts()
+    bucket = _bucket_expression(db.session.get_bind().dialect.name, period, counts.c.case_date)
+    group_column = bucket if bucket is not None else counts.c.case_date
+
+    query = db.session.query(
+        group_column,
+        Department.id,
+        Department.name,
+        Department.code,
+        func.sum(counts.c.case_count)
+    ).select_from(counts).join(
+        Department, Department.id == counts.c.department_id
+    ).filter(
+        counts.c.case_date >= start,
+        counts.c.case_date <= end
+    )
+    if department_ids:
+        query = query.filter(counts.c.department_id.in_(department_ids))
+    rows = query.group_by(
+        group_column, Department.id, Department.name, Department.code
+    ).all()
+
+    index = {value: position for position, value in enumerate(buckets)}
+    totals = [0] * len(buckets)
+    departments = {}
+    counts = defaultdict(lambda: [0] * len(buckets))
+
+    for bucket_value, dept_id, name, code, count in rows:
+        if bucket is None:
+            bucket_value = bucket_start(bucket_value, period)
+        elif isinstance(bucket_value, str):
+            bucket_value = date.fromisoformat(bucket_value[:10])
+        position = index.get(bucket_value)
+        if position is None or not count:
+            continue
+        departments[dept_id] = (name, code)
+        counts[dept_id][position] += int(count)
+        totals[position] += int(count)
+
+    return {
+        'period': period,
+        'start': start.isoformat(),
+        'requested_start': requested_start.isoformat(),
+        'end': end.isoformat(),
+        'labels': [value.isoformat() for value in buckets],
+        'totals': totals,
+        'departments': [
+            {
+                'department_id': dept_id,
+                'department_name': departments[dept_id][0],
+                'department_code': departments[dept_id][1],
+                'counts': counts[dept_id]
+            }
+            for dept_id in sorted(departments, key=lambda dept_id: -sum(counts[dept_id]))
+        ]
+    }
+
+
+def get_monthly_stats(months=6):
+    """
+    จำนวน cases รายเดือนย้อนหลังสำหรับกราฟแนวโน้มใน stats.html และ Stats.vue
+
+    Returns:
+        list: รายการ dict (month, label, count)
+    """
+    start, end = default_window('month', months)
+    trend = get_case_trend('month', start, end)
+    monthly_stats = []
+    for label, count in zip(trend['labels'], trend['totals']):
+        month_start = date.fromisoformat(label)
+        monthly_stats.append({
+            'month': f"{THAI_SHORT_MONTHS[month_start.month - 1]} {month_start.year + 543}",
+            'label': label,
+            'count': count
+        })
+    return monthly_stats
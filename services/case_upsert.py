@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Upsert cases จากระบบภายนอก (เช่น HIS bridge) แบบ idempotent: ส่งซ้ำกี่ครั้งก็ได้ผลเดียวกัน
+key ของแต่ละ case คือ external_ref = "hn:department_id:case_date"
+(unique index ux_patient_case_external_ref, ดู models/indexes.py)
+
+แต่ละชุดใช้คำสั่งไม่เกิน 3 คำสั่งใน transaction เดียว (ไม่ต้องอ่านแล้วเขียนผ่าน API ทีละ case)
+1. อ่านสถานะเดิมของ key ที่มีอยู่แล้ว (SELECT ... FOR UPDATE)
+2. ผูก key ให้ case เดิมที่เพิ่มผ่านหน้าเว็บหรือ import (external_ref ยังว่าง) ด้วย UPDATE ... RETURNING
+3. INSERT ... ON CONFLICT (external_ref) DO UPDATE เฉพาะ case ที่ยังไม่ถูกลบและข้อมูลเปลี่ยน
+จากนั้นปรับ rollup, name index, cache และ audit ผ่าน services/case_bulk.py ก่อน commit
+
+ฟิลด์ที่ไม่บังคับ (notes, external_link, link_type) ที่ไม่ได้ส่งมาจะคงค่าเดิมไว้
+case ที่ถูกลบแล้ว (soft delete) จะไม่ถูกแก้ไขหรือนำกลับมา
+"""
+
+from sqlalchemy import select, update, func, cast, tuple_, and_, or_, literal_column, String, Boolean
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, timezone
+from models import db, PatientCase
+from .case_import import validate_case_rows, OPTIONAL_COLUMNS
+from .case_name_index import write_case_name_keys, case_name_key
+from .case_bulk import CaseState, case_state, record_case_changes, BULK_BATCH_SIZE
+
+# จำนวน records สูงสุดต่อ request
+MAX_UPSERT_ITEMS = 1000
+
+# INSERT ที่รองรับ ON CONFLICT ของแต่ละฐานข้อมูล
+_DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+_STATE_COLUMNS = [PatientCase.__table__.c[name] for name in CaseState._fields]
+
+
+def external_ref(hn, department_id, case_date):
+    """key ของ upsert (ต้องตรงกับ _external_ref_expression)"""
+    return f'{hn}:{department_id}:{case_date.isoformat()}'
+
+
+def _external_ref_expression():
+    """external_ref ที่คำนวณจากคอลัมน์ของแถว (ใช้ผูก key ให้ case เดิม)"""
+    return (
+        PatientCase.hn + ':' + cast(PatientCase.department_id, String)
+        + ':' + cast(PatientCase.case_date, String)
+    )
+
+
+def normalize_upsert_records(items):
+    """
+    แปลง records จาก JSON ให้อยู่ในรูปแบบเดียวกับแถวของ CSV import
+    (ค่าเป็นข้อความ และ 'line' คือลำดับใน array เริ่มจาก 0)
+    """
+    records = []
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        record = {
+            str(key).strip().lower(): '' if value is None else str(value).strip()
+            for key, value in item.items()
+        }
+        record['line'] = index
+        records.append(record)
+    return records
+
+
+def _select_states(session, refs):
+    """{external_ref: (id, CaseState)} ของ key ที่มีอยู่แล้ว (ล็อกแถวไว้จนจบ transaction)"""
+    table = PatientCase.__table__
+    rows = session.execute(
+        select(table.c.id, table.c.external_ref, *_STATE_COLUMNS)
+        .where(table.c.external_ref.in_(refs))
+        .with_for_update()
+    ).all()
+    return {row.external_ref: (row.id, case_state(row)) for row in rows}
+
+
+def _claim_existing_cases(session, keys):
+    """
+    ผูก external_ref ให้ case เดิมที่ยังไม่มี key (case แรกตาม id ของแต่ละ (hn, department_id, case_date))
+
+    Returns:
+        dict: {external_ref: (id, CaseState)} ของ case ที่ถูกผูก
+    """
+    if not keys:
+        return {}
+    table = PatientCase.__table__
+    natural_key = (PatientCase.hn, PatientCase.department_id, PatientCase.case_date)
+    candidates = select(func.min(PatientCase.id)).where(
+        tuple_(*natural_key).in_(keys),
+        PatientCase.is_deleted == False,
+        PatientCase.external_ref.is_(None)
+    ).group_by(*natural_key)
+    rows = session.execute(
+        update(table)
+        .where(table.c.id.in_(candidates))
+        .values(external_ref=_external_ref_expression())
+        .returning(table.c.id, table.c.external_ref, *_STATE_COLUMNS)
+    ).all()
+    return {row.external_ref: (row.id, case_state(row)) for row in rows}
+
+
+def _upsert_statement(connection, values):
+    """INSERT ... ON CONFLICT (external_ref) DO UPDATE หนึ่งคำสั่งสำหรับทุกแถวใน values"""
+    table = PatientCase.__table__
+    dialect_insert = _DIALECT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is None:
+        raise NotImplementedError(f'ฐานข้อมูล {connection.dialect.name} ไม่รองรับ upsert')
+
+    statement = dialect_insert(table).values(values)
+    excluded = statement.excluded
+    new_values = {'first_name': excluded.first_name, 'last_name': excluded.last_name}
+    for column in OPTIONAL_COLUMNS:
+        new_values[column] = func.coalesce(excluded[column], table.c[column])
+    changed = or_(*(table.c[column].is_distinct_from(value) for column, value in new_values.items()))
+
+    returning = [table.c.id, table.c.external_ref]
+    if connection.dialect.name == 'postgresql':
+        # xmax = 0 คือแถวที่เพิ่งถูก INSERT (ไม่ใช่ DO UPDATE) ใช้แยก case ที่ transaction อื่นเพิ่มพร้อมกัน
+        returning.append(literal_column('xmax = 0', Boolean).label('inserted'))
+
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.external_ref],
+        index_where=table.c.external_ref.isnot(None),
+        set_=dict(new_values, updated_at=excluded.updated_at),
+        where=and_(table.c.is_deleted == False, changed)
+    ).returning(*returning)
+
+
+def _upsert_batch(session, rows, created_by):
+    """
+    upsert หนึ่งชุด (ยังไม่ commit)
+
+    Returns:
+        dict: {external_ref: (id, status)} โดย status เป็น created / updated / unchanged / deleted
+    """
+    refs = [row['external_ref'] for row in rows]
+    existing = _select_states(session, refs)
+    existing.update(_claim_existing_cases(session, [
+        (row['hn'], row['department_id'], row['case_date'])
+        for row in rows if row['external_ref'] not in existing
+    ]))
+
+    now = datetime.now(timezone.utc)
+    values = [
+        {
+            'hn': row['hn'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'department_id': row['department_id'],
+            'case_date': row['case_date'],
+            'notes': row.get('notes'),
+            'external_link': row.get('external_link'),
+            'link_type': row.get('link_type'),
+            'external_ref': row['external_ref'],
+            'created_by': created_by,
+            'created_at': now,
+            'updated_at': now,
+            'is_deleted': False
+        }
+        for row in rows
+    ]
+    connection = session.connection()
+    written = {row.external_ref: row for row in session.execute(_upsert_statement(connection, values))}
+
+    results = {}
+    changes = {}
+    name_keys = {}
+    for row in values:
+        ref = row['external_ref']
+        old_id, old_state = existing.get(ref, (None, None))
+        result = written.get(ref)
+        if result is None:
+            results[ref] = (old_id, 'deleted' if old_state is not None and old_state.is_deleted else 'unchanged')
+            continue
+
+        new_state = case_state(row)
+        inserted = getattr(result, 'inserted', old_state is None)
+        if inserted:
+            results[ref] = (result.id, 'created')
+            changes[result.id] = (None, new_state)
+        else:
+            results[ref] = (result.id, 'updated')
+            if old_state is None:
+                # transaction อื่นเพิ่ม case นี้ระหว่างชุด (การส่งซ้ำจาก HIS) และนับใน rollup แล้ว
+                old_state = new_state
+            new_state = old_state._replace(
+                external_link=row['external_link'] or old_state.external_link,
+                link_type=row['link_type'] or old_state.link_type
+            )
+            changes[result.id] = (old_state, new_state)
+        name_keys[result.id] = case_name_key(row['first_name'], row['last_name'])
+
+    # case ที่ไม่เปลี่ยนแต่ไม่รู้ id (เพิ่มโดย transaction อื่นระหว่างชุด)
+    unknown = [ref for ref, (case_id, status) in results.items() if case_id is None]
+    if unknown:
+        table = PatientCase.__table__
+        for case_id, ref in session.execute(
+            select(table.c.id, table.c.external_ref).where(table.c.external_ref.in_(unknown))
+        ):
+            results[ref] = (case_id, results[ref][1])
+
+    write_case_name_keys(connection, name_keys)
+    record_case_changes(session, changes)
+    return results
+
+
+def upsert_cases(items, created_by=None, batch_size=BULK_BATCH_SIZE):
+    """
+    เพิ่มหรือแก้ไข cases ตาม key (hn, หน่วยงาน, วันที่) ทั้งหมดใน transaction เดียว
+
+    Args:
+        items (list): records จาก JSON (hn, first_name, last_name, department_code, case_date,
+                      และไม่บังคับ: notes, external_link, link_type)
+        created_by (int): id ของผู้ใช้ (ใช้กับ case ที่เพิ่มใหม่)
+        batch_size (int): จำนวนแถวต่อคำสั่ง INSERT ... ON CONFLICT
+
+    Returns:
+        dict: total, created, updated, unchanged, deleted,
+              results (ผลของแต่ละ record ที่ผ่าน) และ rejected (records ที่ไม่ผ่าน)
+    """
+    records = normalize_upsert_records(items)
+    valid, rejected = validate_case_rows(records, allow_duplicates=True)
+
+    rows = []
+    seen = {}
+    for row in valid:
+        ref = external_ref(row['hn'], row['department_id'], row['case_date'])
+        if ref in seen:
+            # ON CONFLICT แก้แถวเดียวกันสองครั้งในคำสั่งเดียวไม่ได้
+            rejected.append({'line': row['line'], 'hn': row['hn'], 'errors': [f'ซ้ำกับรายการที่ {seen[ref]} ในคำขอ']})
+            continue
+        seen[ref] = row['line']
+        rows.append(dict(row, external_ref=ref))
+
+    results = {}
+    batch_size = max(1, batch_size)
+    try:
+        for start in range(0, len(rows), batch_size):
+            results.update(_upsert_batch(db.session, rows[start:start + batch_size], created_by))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    items = []
+    for row in rows:
+        case_id, status = results[row['external_ref']]
+        counts[status] += 1
+        items.append({
+            'index': row['line'],
+            'id': case_id,
+            'external_ref': row['external_ref'],
+            'status': status
+        })
+
+    rejected.sort(key=lambda item: item['line'])
+    return dict(
+        counts,
+        total=len(records),
+        results=items,
+        rejected=[
+            {'index': item['line'], 'hn': item['hn'], 'errors': item['errors']}
+            for item in rejected
+        ]
+    )
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+ตรวจและสร้าง index ตาม registry (models/indexes.py) บนฐานข้อมูลที่มีอยู่แล้ว
+db.create_all() ไม่สร้าง index ให้ตารางที่มีอยู่ก่อน จึงเทียบ registry กับ schema จริง
+แล้วสร้างเฉพาะ index ที่ยังขาด
+- PostgreSQL: CREATE INDEX CONCURRENTLY (ไม่ล็อกการเขียนตาราง) และสร้างใหม่ถ้า index ค้างเป็น INVALID
+- SQLite: CREATE INDEX ปกติ
+
+คอลัมน์ที่เพิ่มให้ตารางเดิมภายหลัง (ADDED_COLUMNS) ก็ไม่ถูกสร้างโดย db.create_all() เช่นกัน
+sync_columns() เพิ่มคอลัมน์ที่ขาดด้วย ALTER TABLE ADD COLUMN (nullable ไม่มี default
+จึงไม่ต้องเขียนข้อมูลเดิมใหม่) และต้องรันก่อน query ใด ๆ ที่ใช้ model
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from models import db, INDEX_REGISTRY, PatientCase
+
+# คอลัมน์ (nullable) ที่เพิ่มหลังจากตารางมีข้อมูลใช้งานจริงแล้ว
+ADDED_COLUMNS = (
+    PatientCase.__table__.c.external_ref,
+)
+
+# index ที่ระบบต้องมีจึงทำงานถูกต้อง (ไม่ใช่แค่เร่งความเร็ว) - สร้างตอนเริ่ม app
+# ux_patient_case_external_ref: เป้าหมายของ ON CONFLICT ใน services/case_upsert.py
+REQUIRED_INDEXES = (
+    'ux_patient_case_external_ref',
+)
+
+
+def diff_columns(engine=None):
+    """
+    คอลัมน์ใน ADDED_COLUMNS ที่ยังไม่มีในตารางของฐานข้อมูล
+
+    Returns:
+        list: Column ที่ยังขาด (ตารางที่ยังไม่มีจะได้คอลัมน์พร้อมกับ db.create_all())
+    """
+    engine = engine or db.engine
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        existing = {
+            table_name: {column['name'] for column in inspector.get_columns(table_name)}
+            for table_name in {column.table.name for column in ADDED_COLUMNS}
+            if table_name in tables
+        }
+    return [
+        column for column in ADDED_COLUMNS
+        if column.table.name in existing and column.name not in existing[column.table.name]
+    ]
+
+
+def sync_columns(engine=None, dry_run=False):
+    """
+    เพิ่มคอลัมน์ใน ADDED_COLUMNS ที่ยังไม่มีในฐานข้อมูล
+
+    Returns:
+        list: ชื่อคอลัมน์ที่เพิ่ม (หรือที่จะเพิ่มถ้า dry_run) ในรูปแบบ table.column
+    """
+    engine = engine or db.engine
+    missing = diff_columns(engine)
+    if not dry_run and missing:
+        with engine.begin() as connection:
+            preparer = connection.dialect.identifier_preparer
+            for column in missing:
+                connection.execute(text(
+                    f"ALTER TABLE {preparer.format_table(column.table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=connection.dialect)}"
+                ))
+    return [f"{column.table.name}.{column.name}" for column in missing]
+
+
+def _invalid_postgresql_indexes(connection, names):
+    """index ที่สร้างแบบ CONCURRENTLY ไม่สำเร็จ (pg_index.indisvalid = false)"""
+    if not names:
+        return set()
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE NOT i.indisvalid AND pg_table_is_visible(c.oid)"
+    )).all()
+    return {name for (name,) in rows if name in names}
+
+
+def diff_indexes(engine=None):
+    """
+    เทียบ index ใน registry กับ schema ของฐานข้อมูล
+
+    Returns:
+        list: index (sqlalchemy Index) ที่ยังไม่มีหรือใช้งานไม่ได้ เรียงตามลำดับใน registry
+    """
+    engine = engine or db.engine
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        existing = {}
+        for table_name in {index.table.name for index in INDEX_REGISTRY}:
+            if table_name in tables:
+                existing[table_name] = {index['name'] for index in inspector.get_indexes(table_name)}
+
+        invalid = set()
+        if connection.dialect.name == 'postgresql':
+            invalid = _invalid_postgresql_indexes(connection, {index.name for index in INDEX_REGISTRY})
+
+    # ตารางที่ยังไม่มีจะได้ index พร้อมกับ db.create_all()
+    return [
+        index for index in INDEX_REGISTRY
+        if index.table.name in existing
+        and (index.name not in existing[index.table.name] or index.name in invalid)
+    ]
+
+
+def _create_index(connection, index, rebuild=False):
+    """สร้าง index หนึ่งตัว (connection ต้องเป็น autocommit สำหรับ PostgreSQL)"""
+    if connection.dialect.name != 'postgresql':
+        index.create(connection, checkfirst=True)
+        return
+
+    if rebuild:
+        connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+    options = index.dialect_options['postgresql']
+    concurrently = options['concurrently']
+    # เปิด CONCURRENTLY เฉพาะตอนสร้างที่นี่ (db.create_all() รันใน transaction จึงใช้ไม่ได้)
+    options['concurrently'] = True
+    try:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+    finally:
+        options['concurrently'] = concurrently
+
+
+def sync_indexes(engine=None, dry_run=False, names=None):
+    """
+    สร้าง index จาก registry ที่ยังไม่มีในฐานข้อมูล
+
+    Args:
+        engine: SQLAlchemy engine (ค่าเริ่มต้น: db.engine)
+        dry_run (bool): แสดงเฉพาะรายการที่ขาด ไม่สร้างจริง
+        names (iterable): สร้างเฉพาะ index ที่มีชื่อในรายการนี้ (None = ทั้งหมด)
+
+    Returns:
+        list: ชื่อ index ที่สร้าง (หรือที่จะสร้างถ้า dry_run)
+    """
+    engine = engine or db.engine
+    missing = diff_indexes(engine)
+    if names is not None:
+        missing = [index for index in missing if index.name in names]
+    if dry_run or not missing:
+        return [index.name for index in missing]
+
+    created = []
+    if engine.dialect.name == 'postgresql':
+        connection_factory = lambda: engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+    else:
+        connection_factory = engine.begin
+
+    with engine.connect() as connection:
+        invalid = set()
+        if engine.dialect.name == 'postgresql':
+            invalid = _invalid_postgresql_indexes(connection, {index.name for index in missing})
+
+    for index in missing:
+        try:
+            with connection_factory() as connection:
+                _create_index(connection, index, rebuild=index.name in invalid)
+            created.append(index.name)
+        except Exception as e:
+            print(f"Warning: Could not create index {index.name}: {e}")
+    return created
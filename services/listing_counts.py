@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+จำนวนรวม (total) ของรายการแบบแบ่งหน้าใน admin API (cases, contacts)
+แทนการรัน COUNT(*) ทุกครั้งที่เปลี่ยนหน้า:
+- เก็บผล COUNT ไว้ตามตารางและชุด filter (หมดอายุตาม PAGINATION_COUNT_TTL)
+- ล้างเมื่อมีการ commit ข้อมูลของตารางนั้น (generation ต่อตาราง)
+- ตารางที่ใหญ่กว่า APPROXIMATE_COUNT_THRESHOLD: ถ้าไม่มีค่าใน cache ที่ยังใช้ได้
+  จะใช้ค่าเดิมที่หมดอายุแล้ว หรือค่าประมาณจาก EXPLAIN (PostgreSQL) แทน COUNT
+  และตอบกลับ total_estimated = true (ส่ง exact_total=true เพื่อบังคับนับจริง)
+  ขนาดของตารางจากสถิติถูกเก็บไว้ตาม TTL เดียวกัน (ตารางเล็กไม่ต้องเปิด connection ไปถามซ้ำ)
+  ค่าเดิมที่นับไว้นานกว่า PAGINATION_COUNT_STALE_MAX_AGE จะถูกนับจริงใหม่และเก็บลง cache
+
+หมายเหตุ: cache อยู่ใน process เดียวเหมือน utils/stats_cache.py
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from sqlalchemy import event
+from models import db
+from .approx_counts import get_table_estimates, estimate_query_rows, DEFAULT_APPROXIMATE_THRESHOLD
+
+# ค่าเริ่มต้นของ TTL (วินาที) ถ้าไม่ได้กำหนด PAGINATION_COUNT_TTL
+DEFAULT_COUNT_TTL = 300
+
+# ค่าเริ่มต้นของอายุสูงสุด (วินาที) ของค่าเดิมที่ใช้แทนการนับ ถ้าไม่ได้กำหนด PAGINATION_COUNT_STALE_MAX_AGE
+DEFAULT_STALE_MAX_AGE = 3600
+
+# จำนวนชุด filter สูงสุดที่เก็บไว้
+MAX_COUNT_ENTRIES = 1024
+
+CountEntry = namedtuple('CountEntry', ['count', 'generation', 'expires_at', 'counted_at'])
+
+
+class ListingCountCache:
+    """Cache ของ COUNT ตาม (ตาราง, filter) พร้อม generation ต่อตาราง (thread-safe)"""
+
+    def __init__(self, max_entries=MAX_COUNT_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        # {table: (จำนวนแถวโดยประมาณหรือ None, เวลาที่ตรวจ)}
+        self._table_rows = {}
+        self._lock = threading.Lock()
+
+    def generation(self, table):
+        with self._lock:
+            return self._generations.get(table, 0)
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (entry หรือ None, True ถ้ายังใช้ได้ / False ถ้าหมดอายุหรือตารางถูกแก้ไขแล้ว)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(key)
+            fresh = (entry.generation == self._generations.get(key[0], 0)
+                     and entry.expires_at > time.monotonic())
+            return entry, fresh
+
+    def set(self, key, count, generation, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            # ตารางถูกแก้ไขระหว่างนับ - ไม่เก็บผลที่อาจไม่ตรง
+            if generation != self._generations.get(key[0], 0):
+                return
+            now = time.monotonic()
+            self._entries[key] = CountEntry(count, generation, now + ttl, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def table_rows(self, table, max_age):
+        """
+        Returns:
+            tuple: (จำนวนแถวโดยประมาณหรือ None, True ถ้ามีค่าที่ตรวจไว้ไม่เกิน max_age วินาที)
+        """
+        with self._lock:
+            entry = self._table_rows.get(table)
+        if entry is None or time.monotonic() - entry[1] > max_age:
+            return None, False
+        return entry[0], True
+
+    def set_table_rows(self, table, rows):
+        with self._lock:
+            self._table_rows[table] = (rows, time.monotonic())
+
+    def invalidate(self, tables):
+        """ทำให้ค่าของตารางเหล่านี้หมดอายุ (ยังเก็บไว้ใช้เป็นค่าประมาณ)"""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+
+listing_count_cache = ListingCountCache()
+
+
+def invalidate_listing_counts(*tables):
+    """
+    ล้าง cache ของจำนวนรวม (เรียกหลังการเขียนที่ไม่ผ่าน ORM session เช่น bulk UPDATE)
+
+    Args:
+        tables: ชื่อตาราง
+    """
+    listing_count_cache.invalidate(tables)
+
+
+def normalize_count_filters(filters):
+    """
+    key ของชุด filter: ตัดค่าว่างและเรียงตามชื่อ
+    (ข้อความใช้ตามที่ query ใช้จริง - "a  b" กับ "a b" ให้ผลต่างกัน)
+
+    Returns:
+        tuple: ((name, value), ...)
+    """
+    normalized = []
+    for name, value in filters.items():
+        if value is None or value == '':
+            continue
+        normalized.append((name, value))
+    return tuple(sorted(normalized))
+
+
+def _estimate_total(query, table, previous=None):
+    """
+    ค่าประมาณจำนวนผลลัพธ์ของ query ถ้าตารางใหญ่เกิน threshold
+
+    Args:
+        previous (int): ผล COUNT เดิมของ filter ชุดนี้ (ใช้แทนค่าประมาณของ planner ถ้ามี)
+
+    Returns:
+        int หรือ None ถ้าควรนับจริง (ตารางเล็ก หรือประมาณไม่ได้)
+    """
+    threshold = int(current_app.config.get('APPROXIMATE_COUNT_THRESHOLD', DEFAULT_APPROXIMATE_THRESHOLD))
+    ttl = int(current_app.config.get('PAGINATION_COUNT_TTL', DEFAULT_COUNT_TTL))
+    table_rows, known = listing_count_cache.table_rows(table, ttl)
+    if known and (table_rows is None or table_rows < threshold):
+        return None
+    if known and previous is not None:
+        return previous
+    try:
+        # connection แยกเพื่อไม่ให้ข้อผิดพลาดกระทบ transaction หลัก
+        with db.engine.connect() as connection:
+            if not known:
+                table_rows = get_table_estimates(connection, [table]).get(table)
+                listing_count_cache.set_table_rows(table, table_rows)
+                if table_rows is None or table_rows < threshold:
+                    return None
+                if previous is not None:
+                    return previous
+            return estimate_query_rows(connection, query.order_by(None).statement)
+    except Exception as e:
+        print(f"Warning: Could not estimate listing total: {e}")
+        return None
+
+
+def get_listing_total(query, table, filters, exact=False):
+    """
+    จำนวนรวมของรายการ (ใช้แทน COUNT ของ paginate)
+
+    Args:
+        query: query ของรายการ (ใส่ filter แล้ว)
+        table (str): ชื่อตารางหลักของรายการ (ใช้ล้าง cache เมื่อมีการแก้ไข)
+        filters (dict): filter ที่ใช้สร้าง query (เป็น key ของ cache)
+        exact (bool): บังคับนับจริงเมื่อไม่มีค่าใน cache ที่ยังใช้ได้
+                      (นับจริงเสมอถ้าค่าเดิมเก่ากว่า PAGINATION_COUNT_STALE_MAX_AGE)
+
+    Returns:
+        tuple: (total, estimated) - estimated = True ถ้าเป็นค่าประมาณ
+    """
+    key = (table, normalize_count_filters(filters))
+    entry, fresh = listing_count_cache.get(key)
+    if fresh:
+        return entry.count, False
+
+    stale_max_age = int(current_app.config.get('PAGINATION_COUNT_STALE_MAX_AGE', DEFAULT_STALE_MAX_AGE))
+    if entry is not None and time.monotonic() - entry.counted_at > stale_max_age:
+        # ค่าเดิมเก่าเกินไป - นับจริงใหม่ (ไม่ใช้ค่าเดิมตลอดไป)
+        exact = True
+
+    if not exact:
+        estimate = _estimate_total(query, table, entry.count if entry is not None else None)
+        if estimate is not None:
+            return estimate, True
+
+    generation = listing_count_cache.generation(table)
+    total = query.order_by(None).count()
+    ttl = int(current_app.config.get('PAGINATION_COUNT_TTL', DEFAULT_COUNT_TTL))
+    listing_count_cache.set(key, total, generation, ttl)
+    return total, False
+
+
+def page_count(total, per_page):
+    """จำนวนหน้าจากจำนวนรวม"""
+    if not total or per_page <= 0:
+        return 0
+    return (total + per_page - 1) // per_page
+
+
+@event.listens_for(db.session, 'before_flush')
+def _mark_count_changes(db_session, flush_context, instances):
+    """จดตารางที่ transaction นี้แก้ไข"""
+    tables = db_session.info.setdefault('count_tables', set())
+    for obj in list(db_session.new) + list(db_session.dirty) + list(db_session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            tables.add(table)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(db_session):
+    tables = db_session.info.pop('count_tables', None)
+    if tables:
+        invalidate_listing_counts(*tables)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_after_rollback(db_session):
+    db_session.info.pop('count_tables', None)
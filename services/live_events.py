@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Live events สำหรับ Server-Sent Events (/api/events/stream)
+- EventBus: publish/subscribe ภายใน process
+- เก็บ event ของ PatientCase ระหว่าง flush แล้ว publish หลัง commit
+  (case_created, case_updated, case_deleted, case_restored และ stats delta)
+- PostgresRelay: ส่ง event ข้ามหลาย worker/เครื่องผ่าน PostgreSQL LISTEN/NOTIFY
+  (NOTIFY อยู่ใน transaction เดียวกับการแก้ไข - ส่งจริงเมื่อ commit และถูกทิ้งเมื่อ rollback
+  และส่งเฉพาะเมื่อมี worker ที่มี stream เปิดอยู่)
+
+หมายเหตุ: ฐานข้อมูล SQLite ใช้ bus ภายใน process ได้เท่านั้น (ต้องรัน 1 worker)
+แต่ละ client ที่เปิด stream ใช้ 1 thread ของ worker จึงจำกัดจำนวนด้วย SSE_MAX_CONNECTIONS
+"""
+
+import itertools
+import json
+import queue
+import select as io_select
+import threading
+import time
+import uuid
+from collections import deque, defaultdict
+from sqlalchemy import event, inspect, select, text
+from models import db, Department, PatientCase
+
+# จำนวน event ที่รอส่งสูงสุดต่อ client (client ที่ช้าจะถูกทิ้ง event เก่าสุด)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# จำนวน event ล่าสุดที่เก็บไว้สำหรับ client ที่ reconnect พร้อม Last-Event-ID
+REPLAY_BUFFER_SIZE = 200
+
+# จำนวน stream ที่เปิดพร้อมกันสูงสุดต่อ process (ต้องน้อยกว่าจำนวน thread ของ worker มาก)
+DEFAULT_MAX_CONNECTIONS = 16
+
+# channel ของ PostgreSQL LISTEN/NOTIFY
+NOTIFY_CHANNEL = 'case_events'
+
+# ขนาด payload สูงสุดของ NOTIFY (PostgreSQL จำกัดไว้ต่ำกว่า 8000 byte)
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+# จำนวนหน่วยงานต่อ event 'stats' หนึ่งรายการ (ให้ payload อยู่ในขนาดที่ NOTIFY รับได้)
+STATS_CHANGES_PER_MESSAGE = 40
+
+# ระยะเวลารอก่อนเชื่อมต่อ LISTEN ใหม่เมื่อการเชื่อมต่อหลุด (วินาที)
+RELAY_RECONNECT_SECONDS = 5
+
+# advisory lock ที่ worker ที่มี stream เปิดอยู่ถือไว้ (ผู้เขียนใช้ตัดสินว่าต้อง NOTIFY หรือไม่)
+LISTENER_LOCK_ID = 482_190_005
+
+# ความถี่ที่ thread LISTEN ปรับ lock ตามจำนวน stream ของ process (วินาที)
+PRESENCE_POLL_SECONDS = 1
+
+# เก็บผลการตรวจว่ามีผู้รับหรือไม่ไว้กี่วินาที (ผู้รับรายแรกอาจพลาด delta ช่วงสั้น ๆ - ได้ snapshot ตอนเชื่อมต่อแล้ว)
+DEMAND_CHECK_SECONDS = 2
+
+
+class EventBus:
+    """Publish/subscribe ภายใน process (thread-safe)"""
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE, replay_size=REPLAY_BUFFER_SIZE):
+        self.queue_size = queue_size
+        self.enabled = True
+        self._subscribers = set()
+        self._recent = deque(maxlen=replay_size)
+        # id ของ event ขึ้นต้นด้วย token ของ process - client ที่ reconnect ไป worker อื่นจะไม่ได้ replay ผิดชุด
+        self._token = uuid.uuid4().hex[:8]
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self, last_event_id=None, limit=None):
+        """
+        สมัครรับ event
+
+        Args:
+            last_event_id (str): id ของ event ล่าสุดที่ client ได้รับ (ส่ง event ที่พลาดไปให้ใหม่)
+            limit (int): จำนวน subscriber สูงสุด
+
+        Returns:
+            queue.Queue: queue ของ message หรือ None ถ้าจำนวน subscriber เต็มแล้ว
+        """
+        replay_after = self._sequence(last_event_id)
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add(subscriber)
+            if replay_after is not None:
+                for message in self._recent:
+                    if message['sequence'] > replay_after:
+                        self._offer(subscriber, message)
+        return subscriber
+
+    def _sequence(self, event_id):
+        """ลำดับของ event id ที่ออกโดย bus นี้ หรือ None"""
+        token, _, sequence = (event_id or '').partition('-')
+        if token != self._token or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event_type, data, private=None):
+        """
+        ส่ง event ให้ทุก subscriber
+
+        Args:
+            event_type (str): ชื่อ event
+            data (dict): ข้อมูลสาธารณะ
+            private (dict): ข้อมูลส่วนตัว (ส่งเฉพาะผู้ใช้ที่เข้าสู่ระบบ)
+        """
+        with self._lock:
+            sequence = next(self._ids)
+            message = {
+                'id': f'{self._token}-{sequence}',
+                'sequence': sequence,
+                'event': event_type,
+                'data': data,
+                'private': private
+            }
+            self._recent.append(message)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            self._offer(subscriber, message)
+
+    @staticmethod
+    def _offer(subscriber, message):
+        try:
+            subscriber.put_nowait(message)
+        except queue.Full:
+            # client ช้าเกินไป - ทิ้ง event เก่าสุดแทนการบล็อกผู้เขียนข้อมูล
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                pass
+
+
+class PostgresRelay:
+    """
+    ส่ง event ข้าม process ผ่าน PostgreSQL LISTEN/NOTIFY
+    - ผู้เขียนข้อมูล NOTIFY ภายใน transaction (ทุก worker ได้รับหลัง commit) เฉพาะเมื่อมีผู้รับอยู่
+      ที่ใดที่หนึ่ง: worker ที่มี stream เปิดอยู่ถือ advisory lock แบบ shared (LISTENER_LOCK_ID)
+      ผู้เขียนตรวจจาก pg_locks (เก็บผลไว้ DEMAND_CHECK_SECONDS วินาที)
+    - payload มีเฉพาะ id และข้อมูลสาธารณะ ผู้รับดึง HN/ชื่อผู้ป่วยจากฐานข้อมูลเอง
+    - แต่ละ process มี thread เดียวที่ LISTEN แล้ว publish เข้า bus ของตัวเอง
+      (เริ่มเมื่อมี client เปิด stream ครั้งแรก)
+    """
+
+    def __init__(self, bus, channel=NOTIFY_CHANNEL, lock_id=LISTENER_LOCK_ID):
+        self.bus = bus
+        self.channel = channel
+        self.lock_id = lock_id
+        self.enabled = False
+        self._thread = None
+        self._lock = threading.Lock()
+        # (มีผู้รับหรือไม่, เวลาที่ตรวจ)
+        self._demand = (False, None)
+
+    def has_listeners(self, connection):
+        """มี worker ใดมี stream เปิดอยู่หรือไม่ (ตรวจจาก pg_locks อย่างมากทุก DEMAND_CHECK_SECONDS)"""
+        listening, checked_at = self._demand
+        if checked_at is not None and time.monotonic() - checked_at < DEMAND_CHECK_SECONDS:
+            return listening
+        listening = bool(connection.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' "
+            "AND classid = 0 AND objid = :lock_id AND objsubid = 1)"
+        ), {'lock_id': self.lock_id}).scalar())
+        self._demand = (listening, time.monotonic())
+        return listening
+
+    def notify(self, connection, event_type, data):
+        """NOTIFY message ภายใน transaction ของ connection"""
+        payload = json.dumps({'event': event_type, 'data': data}, ensure_ascii=False)
+        if len(payload.encode('utf-8')) > NOTIFY_PAYLOAD_LIMIT:
+            print(f"Warning: Live event '{event_type}' is too large to relay")
+            return
+        connection.execute(text('SELECT pg_notify(:channel, :payload)'), {
+            'channel': self.channel,
+            'payload': payload
+        })
+
+    def start(self, engine):
+        """เริ่ม thread ที่ LISTEN (ครั้งเดียวต่อ process)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(engine,), name='live-events-relay', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self, engine):
+        while True:
+            try:
+                self._listen(engine)
+            except Exception as e:
+                print(f"Warning: Live events relay disconnected: {e}")
+            time.sleep(RELAY_RECONNECT_SECONDS)
+
+    def _listen(self, engine):
+        # connection แยกจาก pool ค้างไว้สำหรับ LISTEN อย่างเดียว (lock ถูกปล่อยเมื่อ connection ปิด)
+        connection = engine.raw_connection()
+        connection.detach()
+        try:
+            driver_connection = connection.driver_connection
+            driver_connection.autocommit = True
+            with driver_connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel}')
+            holding = False
+            while True:
+                # ถือ lock เฉพาะเมื่อ process นี้มี stream เปิดอยู่
+                wanted = self.bus.subscriber_count > 0
+                if wanted != holding:
+                    function = 'pg_advisory_lock_shared' if wanted else 'pg_advisory_unlock_shared'
+                    with driver_connection.cursor() as cursor:
+                        cursor.execute(f'SELECT {function}(%s)', (self.lock_id,))
+                    holding = wanted
+                readable, _, _ = io_select.select([driver_connection], [], [], PRESENCE_POLL_SECONDS)
+                if not readable:
+                    continue
+                driver_connection.poll()
+                payloads = []
+                while driver_connection.notifies:
+                    payloads.append(driver_connection.notifies.pop(0).payload)
+                self._dispatch(engine, payloads)
+        finally:
+            connection.close()
+
+    def _dispatch(self, engine, payloads):
+        messages = []
+        for payload in payloads:
+            try:
+                messages.append(json.loads(payload))
+            except ValueError:
+                continue
+        if not messages or self.bus.subscriber_count == 0:
+            return
+
+        case_ids = {message['data']['case_id'] for message in messages if 'case_id' in message['data']}
+        private = {}
+        if case_ids:
+            with engine.connect() as connection:
+                private = _case_private_fields(connection, case_ids)
+        for message in messages:
+            self.bus.publish(message['event'], message['data'], private.get(message['data'].get('case_id')))
+
+
+case_event_bus = EventBus()
+event_relay = PostgresRelay(case_event_bus)
+
+
+def configure_live_events(app):
+    """
+    ตั้งค่าจาก config LIVE_EVENTS_ENABLED / LIVE_EVENTS_BACKEND
+    - backend 'postgres': ส่ง event ข้ามหลาย worker ผ่าน LISTEN/NOTIFY
+    - backend 'local': bus ภายใน process (ต้องรัน 1 worker)
+    """
+    case_event_bus.enabled = bool(app.config.get('LIVE_EVENTS_ENABLED', True))
+    event_relay.enabled = case_event_bus.enabled and app.config.get('LIVE_EVENTS_BACKEND', 'local') == 'postgres'
+
+
+def open_event_subscription(engine, last_event_id=None, limit=DEFAULT_MAX_CONNECTIONS):
+    """
+    สมัครรับ event สำหรับ stream หนึ่งรายการ (เริ่ม relay ของ process ถ้าใช้ backend postgres)
+
+    Returns:
+        queue.Queue: queue ของ message หรือ None ถ้าจำนวน stream เต็มแล้ว
+    """
+    if event_relay.enabled:
+        event_relay.start(engine)
+    return case_event_bus.subscribe(last_event_id, limit)
+
+
+def format_sse(message, include_private=False):
+    """แปลง message เป็นรูปแบบ text/event-stream"""
+    payload = dict(message['data'])
+    if include_private and message.get('private'):
+        payload.update(message['private'])
+    data = json.dumps(payload, ensure_ascii=False)
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {data}\n\n"
+
+
+def _history_value(state, attr):
+    """ค่าเดิม (ก่อน flush) ของ attribute หรือ None ถ้าไม่ทราบ"""
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def _case_event(event_type, case_obj):
+    return {
+        'type': event_type,
+        'case_id': case_obj.id,
+        'department_id': case_obj.department_id,
+        'case_date': case_obj.case_date.strftime('%Y-%m-%d') if case_obj.case_date else None,
+        'created_date': case_obj.created_at.strftime('%Y-%m-%d') if case_obj.created_at else None,
+        'private': {
+            'hn': case_obj.hn,
+            'first_name': case_obj.first_name,
+            'last_name': case_obj.last_name
+        }
+    }
+
+
+def collect_case_events(session):
+    """
+    สร้างรายการ event และการเปลี่ยนแปลงจำนวน cases ต่อหน่วยงานจาก session ที่เพิ่ง flush
+
+    Returns:
+        tuple: (events, {department_id: delta})
+    """
+    events = []
+    deltas = defaultdict(int)
+
+    for obj in session.new:
+        if isinstance(obj, PatientCase):
+            events.append(_case_event('case_created', obj))
+            if not obj.is_deleted:
+                deltas[obj.department_id] += 1
+
+    for obj in session.dirty:
+        if not isinstance(obj, PatientCase):
+            continue
+        state = inspect(obj)
+        deleted_history = state.attrs.is_deleted.history
+        department_history = state.attrs.department_id.history
+
+        if deleted_history.added and deleted_history.added[0] and not _history_value(state, 'is_deleted'):
+            events.append(_case_event('case_deleted', obj))
+            deltas[_history_value(state, 'department_id') or obj.department_id] -= 1
+        elif deleted_history.deleted and deleted_history.deleted[0] and not obj.is_deleted:
+            events.append(_case_event('case_restored', obj))
+            deltas[obj.department_id] += 1
+        elif department_history.has_changes() or state.attrs.case_date.history.has_changes():
+            events.append(_case_event('case_updated', obj))
+            old_department_id = _history_value(state, 'department_id')
+            if not obj.is_deleted and old_department_id is not None and old_department_id != obj.department_id:
+                deltas[old_department_id] -= 1
+                deltas[obj.department_id] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, PatientCase):
+            events.append(_case_event('case_deleted', obj))
+            if not obj.is_deleted:
+                deltas[obj.department_id] -= 1
+
+    return events, {dept_id: delta for dept_id, delta in deltas.items() if delta}
+
+
+def _case_private_fields(connection, case_ids):
+    """HN และชื่อผู้ป่วยของ cases ด้วย query เดียว (สำหรับผู้ใช้ที่เข้าสู่ระบบ)"""
+    rows = connection.execute(
+        select(PatientCase.id, PatientCase.hn, PatientCase.first_name, PatientCase.last_name)
+        .where(PatientCase.id.in_(case_ids))
+    ).all()
+    return {
+        case_id: {'hn': hn, 'first_name': first_name, 'last_name': last_name}
+        for case_id, hn, first_name, last_name in rows
+    }
+
+
+def _department_lookup(connection, department_ids):
+    """ดึงชื่อและรหัสหน่วยงานด้วย query เดียว"""
+    if not department_ids:
+        return {}
+    rows = connection.execute(
+        select(Department.id, Department.name, Department.code)
+        .where(Department.id.in_(department_ids))
+    ).all()
+    return {dept_id: (name, code) for dept_id, name, code in rows}
+
+
+def build_case_messages(events, deltas, departments):
+    """
+    สร้าง message ของ cases และ stats delta
+
+    Args:
+        events (list): ผลจาก collect_case_events
+        deltas (dict): {department_id: delta}
+        departments (dict): {department_id: (name, code)}
+
+    Returns:
+        list: [(event_type, data, private), ...]
+    """
+    messages = []
+    for case_event in events:
+        name, code = departments.get(case_event['department_id'], (None, None))
+        data = {key: value for key, value in case_event.items() if key not in ('type', 'private')}
+        data.update({'department_name': name, 'department_code': code})
+        messages.append((case_event['type'], data, case_event['private']))
+
+    changes = []
+    for dept_id, delta in deltas.items():
+        name, code = departments.get(dept_id, (None, None))
+        changes.append({
+            'department_id': dept_id,
+            'department_name': name,
+            'department_code': code,
+            'delta': delta
+        })
+    # delta แยกหลาย event ได้ (client บวกสะสม)
+    for start in range(0, len(changes), STATS_CHANGES_PER_MESSAGE):
+        chunk = changes[start:start + STATS_CHANGES_PER_MESSAGE]
+        messages.append(('stats', {
+            'changes': chunk,
+            'total_delta': sum(change['delta'] for change in chunk)
+        }, None))
+    return messages
+
+
+def publish_case_events(events, deltas, departments):
+    """
+    ส่ง event ของ cases และ stats delta ไปยัง bus
+
+    Args:
+        events (list): ผลจาก collect_case_events
+        deltas (dict): {department_id: delta}
+        departments (dict): {department_id: (name, code)}
+    """
+    for event_type, data, private in build_case_messages(events, deltas, departments):
+        case_event_bus.publish(event_type, data, private)
+
+
+def _listening(session):
+    """มีผู้รอรับ event หรือไม่ (backend postgres: ผู้รับอาจอยู่ใน process อื่น)"""
+    if event_relay.enabled:
+        return event_relay.has_listeners(session.connection())
+    return case_event_bus.enabled and case_event_bus.subscriber_count > 0
+
+
+def _queue_events(session, events, deltas):
+    """เก็บ event และ stats delta ไว้ publish หลัง commit (backend postgres: NOTIFY ทันทีใน transaction)"""
+    if event_relay.enabled:
+        connection = session.connection()
+        departments = _department_lookup(connection, {case_event['department_id'] for case_event in events} | set(deltas))
+        # ไม่ส่ง HN/ชื่อผู้ป่วยผ่าน NOTIFY - ผู้รับดึงจากฐานข้อมูลตาม case_id
+        for event_type, data, _ in build_case_messages(events, deltas, departments):
+            event_relay.notify(connection, event_type, data)
+        return
+
+    pending = session.info.setdefault('live_events', {'events': [], 'deltas': defaultdict(int), 'departments': {}})
+    pending['events'].extend(events)
+    for dept_id, delta in deltas.items():
+        pending['deltas'][dept_id] += delta
+
+    # ดึงชื่อหน่วยงานตอนนี้ (ยังอยู่ใน transaction) เพื่อให้ publish หลัง commit ไม่ต้อง query
+    department_ids = {case_event['department_id'] for case_event in events} | set(deltas)
+    missing = department_ids - set(pending['departments'])
+    pending['departments'].update(_department_lookup(session.connection(), missing))
+
+
+def queue_stats_deltas(session, deltas):
+    """
+    เก็บ stats delta ของการเขียนแบบ set-based (bulk import / bulk update) ไว้ publish หลัง commit
+    ส่งเฉพาะ event 'stats' ไม่ส่ง event ราย case
+
+    Args:
+        deltas (dict): {department_id: การเปลี่ยนแปลงจำนวน cases ที่ยังไม่ถูกลบ}
+    """
+    deltas = {dept_id: delta for dept_id, delta in deltas.items() if delta}
+    if not deltas or not _listening(session):
+        return
+    _queue_events(session, [], deltas)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_after_flush(session, flush_context):
+    if not event_relay.enabled and not _listening(session):
+        return
+    events, deltas = collect_case_events(session)
+    # backend postgres: ตรวจผู้รับเฉพาะเมื่อ flush นี้มีการเปลี่ยนแปลงของ cases
+    if not events or (event_relay.enabled and not _listening(session)):
+        return
+    _queue_events(session, events, deltas)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_after_commit(session):
+    pending = session.info.pop('live_events', None)
+    if not pending:
+        return
+    try:
+        deltas = {dept_id: delta for dept_id, delta in pending['deltas'].items() if delta}
+        publish_case_events(pending['events'], deltas, pending['departments'])
+    except Exception as e:
+        print(f"Warning: Could not publish case events: {e}")
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('live_events', None)
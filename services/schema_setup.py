@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+เตรียม schema ของฐานข้อมูลตอนเริ่ม app ในทุกวิธี deploy (gunicorn app:app, python app.py,
+serverless และ scripts ที่ import app) แทนการพึ่ง init_db() ที่รันเฉพาะ python app.py
+- เพิ่มคอลัมน์ที่ขาดให้ตารางเดิม (sync_columns) และสร้างตารางที่ยังไม่มี (db.create_all)
+- สร้าง index ที่ระบบต้องใช้ (REQUIRED_INDEXES) - index อื่นสร้างด้วย scripts/sync_indexes.py
+- ตรวจ/สร้างตารางคำนวณจาก patient_case (case_daily_count, case_name_index) ที่ยังไม่มีหรือยังว่าง
+
+หลาย process (worker ของ gunicorn) เริ่มพร้อมกันได้ จึงทำภายใต้ schema_lock()
+- PostgreSQL: advisory lock (pg_advisory_lock) บน connection แยก
+- SQLite: file lock ข้างไฟล์ฐานข้อมูล (fcntl)
+"""
+
+import threading
+from contextlib import contextmanager
+from sqlalchemy import text
+from models import db
+from .case_rollup import ensure_case_rollup
+from .case_name_index import ensure_case_name_index
+from .index_sync import sync_columns, sync_indexes, REQUIRED_INDEXES
+
+# key ของ advisory lock สำหรับการเตรียม schema (ค่าคงที่ของระบบนี้)
+SCHEMA_LOCK_ID = 482_190_001
+
+# ล็อกภายใน process แยกตาม lock id (thread ของ gunicorn --threads)
+_local_locks = {}
+
+
+@contextmanager
+def _file_lock(path):
+    try:
+        import fcntl
+    except ImportError:
+        # Windows: ไม่มี fcntl - ใช้เฉพาะล็อกภายใน process
+        yield
+        return
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def schema_lock(engine=None, lock_id=SCHEMA_LOCK_ID):
+    """
+    ล็อกข้าม process สำหรับการแก้ไข schema (process อื่นรอจนกว่าจะเสร็จ)
+
+    Args:
+        engine: SQLAlchemy engine (ค่าเริ่มต้น db.engine)
+        lock_id (int): key ของ lock (แยกงานที่ทำพร้อมกันได้)
+    """
+    engine = engine or db.engine
+    with _local_locks.setdefault(lock_id, threading.Lock()):
+        if engine.dialect.name == 'postgresql':
+            with engine.connect() as connection:
+                connection.execute(text('SELECT pg_advisory_lock(:id)'), {'id': lock_id})
+                connection.commit()
+                try:
+                    yield
+                finally:
+                    connection.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': lock_id})
+                    connection.commit()
+        elif engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+            with _file_lock(f'{engine.url.database}.schema-{lock_id}.lock'):
+                yield
+        else:
+            yield
+
+
+def prepare_database():
+    """
+    สร้างตารางที่ยังไม่มีและตารางคำนวณที่ยังไม่พร้อม (เรียกซ้ำได้ ถ้าพร้อมแล้วจะตรวจอย่างเดียว)
+    ต้องเรียกภายใน app context
+
+    Returns:
+        dict: added_columns, created_indexes (list ชื่อที่เพิ่ม)
+              และ case_rollup, case_name_index (bool - สร้างตารางคำนวณนั้นใหม่หรือไม่)
+    """
+    with schema_lock():
+        # คอลัมน์ต้องครบก่อน query ใด ๆ ที่ใช้ model
+        added_columns = sync_columns()
+        db.create_all()
+        return {
+            'added_columns': added_columns,
+            'created_indexes': sync_indexes(names=REQUIRED_INDEXES),
+            'case_rollup': ensure_case_rollup(),
+            'case_name_index': ensure_case_name_index()
+        }
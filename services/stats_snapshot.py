@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Static statistics snapshots สำหรับ serverless (Vercel/Netlify)
+สร้างไฟล์ JSON ของสถิติสาธารณะ รายชื่อหน่วยงาน และสรุป cases ล่าสุดไว้ล่วงหน้า
+เพื่อให้ /stats และ /api/public/stats ตอบได้โดยไม่ต้องเชื่อมต่อฐานข้อมูล
+
+ไฟล์ที่สร้าง:
+    stats-v<SNAPSHOT_VERSION>-<YYYYmmddTHHMMSSZ>.json  สำเนาแต่ละรุ่น (เก็บไว้ KEEP_SNAPSHOTS รุ่น)
+    stats-latest.json                                  รุ่นล่าสุดที่ route อ่าน
+
+snapshot ที่มากับการ deploy สร้างตอน build (netlify.toml) หรือด้วย scripts/generate_stats_snapshot.py
+เมื่อเก่ากว่า STATS_SNAPSHOT_MAX_AGE จะสร้างใหม่ลง STATS_SNAPSHOT_REFRESH_DIR (ค่าเริ่มต้น /tmp บน serverless)
+อย่างมากครั้งละหนึ่ง request ต่อ instance - ระหว่างนั้นหรือถ้าสร้างไม่ได้ก็ query ฐานข้อมูลตามปกติ
+(ใช้ snapshot ที่เก่ากว่า MAX_AGE ต่อได้เฉพาะเมื่อเปิด STATS_SNAPSHOT_SERVE_STALE)
+"""
+
+import glob
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+from sqlalchemy import func
+from models import db, Department, PatientCase
+from .case_stats import get_case_stats, get_public_stats
+
+# เปลี่ยนเมื่อโครงสร้าง payload เปลี่ยน (snapshot รุ่นเก่าจะถูกละเลย)
+SNAPSHOT_VERSION = 2
+
+LATEST_FILENAME = 'stats-latest.json'
+
+# จำนวนไฟล์รุ่นเก่าที่เก็บไว้
+KEEP_SNAPSHOTS = 24
+
+# ช่วงเวลาของสรุป cases ล่าสุด (วัน) - ตรงกับ /api/notifications/recent-patients-public
+RECENT_CASE_DAYS = 7
+
+_cache_lock = threading.Lock()
+# {path: (key, payload)}
+_cached = {}
+
+_refresh_lock = threading.Lock()
+
+
+def get_recent_case_aggregates(days=RECENT_CASE_DAYS):
+    """
+    จำนวน cases ที่สร้างในช่วง days วันล่าสุด แยกตามหน่วยงาน วันที่สร้าง และวันที่ของ case
+    (ไม่มีข้อมูลส่วนตัวของผู้ป่วย)
+
+    Returns:
+        list: รายการ dict (department_name, department_code, created_date, case_date, count)
+              เรียงตามวันที่สร้างจากใหม่ไปเก่า
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    created_date = func.date(PatientCase.created_at)
+    rows = db.session.query(
+        Department.name,
+        Department.code,
+        created_date,
+        PatientCase.case_date,
+        func.count(PatientCase.id)
+    ).join(
+        Department, Department.id == PatientCase.department_id
+    ).filter(
+        PatientCase.created_at >= since,
+        PatientCase.is_deleted == False
+    ).group_by(
+        Department.name, Department.code, created_date, PatientCase.case_date
+    ).order_by(
+        created_date.desc(), Department.name
+    ).all()
+
+    return [
+        {
+            'department_name': name,
+            'department_code': code,
+            'created_date': str(created)[:10] if created else None,
+            'case_date': case_date.strftime('%Y-%m-%d') if case_date else None,
+            'count': int(count)
+        }
+        for name, code, created, case_date, count in rows
+    ]
+
+
+def build_stats_snapshot():
+    """
+    รวบรวมข้อมูลทั้งหมดของ snapshot จากฐานข้อมูล
+
+    Returns:
+        dict: version, generated_at, public_stats (สำหรับ stats.html),
+              case_stats (สำหรับ /api/public/stats), departments และ recent_cases
+    """
+    departments = db.session.query(Department.id, Department.name, Department.code).order_by(Department.id).all()
+    return {
+        'version': SNAPSHOT_VERSION,
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'public_stats': get_public_stats(),
+        'case_stats': get_case_stats(),
+        'departments': [
+            {'id': dept_id, 'name': name, 'code': code}
+            for dept_id, name, code in departments
+        ],
+        'recent_cases': get_recent_case_aggregates()
+    }
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_stats_snapshot(directory, keep=KEEP_SNAPSHOTS):
+    """
+    สร้าง snapshot ใหม่และบันทึกลง directory
+
+    Args:
+        directory (str): โฟลเดอร์ปลายทาง
+        keep (int): จำนวนไฟล์รุ่นเก่าที่เก็บไว้
+
+    Returns:
+        str: path ของไฟล์รุ่นที่สร้าง
+    """
+    payload = build_stats_snapshot()
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.fromisoformat(payload['generated_at']).strftime('%Y%m%dT%H%M%SZ')
+    versioned_path = os.path.join(directory, f'stats-v{SNAPSHOT_VERSION}-{stamp}.json')
+    _write_atomic(versioned_path, data)
+    _write_atomic(os.path.join(directory, LATEST_FILENAME), data)
+
+    versions = sorted(glob.glob(os.path.join(directory, f'stats-v{SNAPSHOT_VERSION}-*.json')))
+    for old_path in versions[:-keep] if keep > 0 else []:
+        os.remove(old_path)
+
+    return versioned_path
+
+
+def snapshot_age(payload, now=None):
+    """อายุของ snapshot (วินาที)"""
+    generated_at = datetime.fromisoformat(payload['generated_at'])
+    return ((now or datetime.now(timezone.utc)) - generated_at).total_seconds()
+
+
+def snapshot_info(payload):
+    """
+    ข้อมูลอายุของ snapshot สำหรับแนบไปกับ response
+
+    Returns:
+        dict: generated_at, age_seconds และ stale (เก่ากว่า STATS_SNAPSHOT_MAX_AGE)
+    """
+    age = snapshot_age(payload)
+    return {
+        'generated_at': payload['generated_at'],
+        'age_seconds': int(age),
+        'stale': age > current_app.config['STATS_SNAPSHOT_MAX_AGE']
+    }
+
+
+def load_stats_snapshot(directory, max_age=None):
+    """
+    อ่าน snapshot ล่าสุด (อ่านไฟล์ใหม่เฉพาะเมื่อไฟล์เปลี่ยน)
+
+    Args:
+        directory (str): โฟลเดอร์ของ snapshot
+        max_age (int): อายุสูงสุดที่ยอมรับได้ (วินาที, None = ไม่จำกัด)
+
+    Returns:
+        dict: payload หรือ None ถ้าไม่มีไฟล์ รุ่นไม่ตรง หรือเก่าเกิน max_age
+    """
+    path = os.path.join(directory, LATEST_FILENAME)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached_key, payload = _cached.get(path, (None, None))
+        if cached_key != key:
+            payload = None
+    if payload is None:
+        try:
+            with open(path, 'rb') as f:
+                payload = json.loads(f.read().decode('utf-8'))
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read stats snapshot {path}: {e}")
+            return None
+        with _cache_lock:
+            _cached[path] = (key, payload)
+
+    if payload.get('version') != SNAPSHOT_VERSION:
+        return None
+    if max_age is not None and snapshot_age(payload) > max_age:
+        return None
+    return payload
+
+
+def refresh_stats_snapshot(directory):
+    """
+    สร้าง snapshot ใหม่จากฐานข้อมูลลง directory (ครั้งละหนึ่ง thread)
+
+    Returns:
+        dict: payload ใหม่ หรือ None ถ้ามี thread อื่นกำลังสร้างอยู่หรือสร้างไม่ได้
+    """
+    if not _refresh_lock.acquire(blocking=False):
+        return None
+    try:
+        write_stats_snapshot(directory, keep=1)
+        return load_stats_snapshot(directory)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Warning: Could not refresh stats snapshot: {e}")
+        return None
+    finally:
+        _refresh_lock.release()
+
+
+def get_stats_snapshot():
+    """
+    snapshot ที่ใช้ตอบแทนการ query ฐานข้อมูล ถ้าเปิดใช้ STATS_SNAPSHOT_ENABLED
+    - รุ่นล่าสุดจาก STATS_SNAPSHOT_DIR หรือ STATS_SNAPSHOT_REFRESH_DIR ที่ไม่เก่าเกิน STATS_SNAPSHOT_MAX_AGE
+      (ไม่จำกัดอายุถ้าเปิด STATS_SNAPSHOT_SERVE_STALE - ดูอายุด้วย snapshot_info)
+    - ถ้าไม่มี สร้างใหม่ลง STATS_SNAPSHOT_REFRESH_DIR (ถ้าตั้งไว้)
+
+    Returns:
+        dict: payload หรือ None (ให้คำนวณจากฐานข้อมูลแทน)
+    """
+    config = current_app.config
+    if not config.get('STATS_SNAPSHOT_ENABLED'):
+        return None
+    max_age = None if config.get('STATS_SNAPSHOT_SERVE_STALE') else config['STATS_SNAPSHOT_MAX_AGE']
+    refresh_dir = config.get('STATS_SNAPSHOT_REFRESH_DIR')
+
+    directories = [config['STATS_SNAPSHOT_DIR']]
+    if refresh_dir and refresh_dir not in directories:
+        directories.append(refresh_dir)
+    snapshots = [
+        payload for payload in (load_stats_snapshot(directory, max_age) for directory in directories)
+        if payload is not None
+    ]
+    if snapshots:
+        return max(snapshots, key=lambda payload: payload['generated_at'])
+    if refresh_dir:
+        return refresh_stats_snapshot(refresh_dir)
+    return None
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Write-behind สำหรับคอลัมน์แบบ "touch" (เช่น AdminUser.last_login) ที่ไม่จำเป็นต้องบันทึกทันที
+เก็บค่าล่าสุดของแต่ละแถวไว้ในหน่วยความจำ (ค่าใหม่ทับค่าเก่าของแถวเดียวกัน)
+แล้ว background thread เขียนทุก WRITE_BEHIND_INTERVAL วินาทีด้วย UPDATE เดียวต่อคอลัมน์:
+    UPDATE admin_user SET last_login = CASE id WHEN ... END WHERE id IN (...)
+request จึงไม่ต้อง commit และการ login พร้อมกันจำนวนมากไม่ต้องรอกันที่ฐานข้อมูล
+
+WRITE_BEHIND_INTERVAL = 0 คือเขียนทันที (ค่าเริ่มต้นบน serverless ที่ไม่มี background thread)
+ค่าที่ยังไม่ได้เขียนจะถูกเขียนตอนปิดโปรแกรม และอ่านได้ด้วย pending_value()
+"""
+
+import atexit
+import os
+import threading
+from sqlalchemy import update, case, inspect
+from sqlalchemy.orm.attributes import set_committed_value
+from models import db
+
+# ค่าเริ่มต้นถ้าไม่ได้กำหนด WRITE_BEHIND_INTERVAL (วินาที)
+DEFAULT_INTERVAL = 30
+
+# จำนวนแถวสูงสุดต่อคำสั่ง UPDATE
+WRITE_BATCH_SIZE = 500
+
+
+class WriteBehindBuffer:
+    """ค่าที่รอเขียนของคอลัมน์แบบ touch แยกตาม (ตาราง, คอลัมน์) และ primary key (thread-safe)"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._engine = None
+        self._thread = None
+        self._pid = None
+        self._stop_event = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def _ensure_started(self, engine):
+        """เริ่ม thread ครั้งแรกที่มีค่ารอเขียน (และใหม่หลัง fork ของ gunicorn)"""
+        if self.running:
+            return
+        with self._lock:
+            if self.running:
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # ค่าที่ค้างมาจาก process แม่ถูกเขียนโดย process แม่เอง
+                self._pending = {}
+            self._engine = engine
+            self._pid = os.getpid()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def touch(self, column, key, value, engine):
+        """
+        เก็บค่าใหม่ของคอลัมน์ของแถว key (เขียนทันทีถ้า interval เป็น 0)
+
+        Args:
+            column: คอลัมน์ของ model (เช่น AdminUser.last_login)
+            key: ค่า primary key ของแถว
+            value: ค่าใหม่
+            engine: SQLAlchemy engine
+        """
+        target = (column.table, column.name)
+        if self.interval <= 0:
+            self._write({target: {key: value}}, engine)
+            return
+        self._ensure_started(engine)
+        with self._lock:
+            self._pending.setdefault(target, {})[key] = value
+
+    def pending_value(self, column, key, default=None):
+        """ค่าที่ยังรอเขียนของแถว key หรือ default ถ้าไม่มี"""
+        with self._lock:
+            return self._pending.get((column.table, column.name), {}).get(key, default)
+
+    def _write(self, pending, engine):
+        for (table, column_name), values in pending.items():
+            primary_key = table.primary_key.columns.values()[0]
+            keys = list(values)
+            for start in range(0, len(keys), WRITE_BATCH_SIZE):
+                batch = {key: values[key] for key in keys[start:start + WRITE_BATCH_SIZE]}
+                with engine.begin() as connection:
+                    connection.execute(
+                        update(table)
+                        .where(primary_key.in_(list(batch)))
+                        .values({column_name: case(batch, value=primary_key)})
+                    )
+
+    def flush(self):
+        """เขียนค่าที่รออยู่ทั้งหมด (ค่าที่เขียนไม่สำเร็จจะถูกเก็บไว้เขียนรอบถัดไป)"""
+        if self._engine is None or self._pid != os.getpid():
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            self._write(pending, self._engine)
+        except Exception as e:
+            print(f"Warning: Could not write deferred updates: {e}")
+            with self._lock:
+                for target, values in pending.items():
+                    # ค่าที่ถูก touch ใหม่ระหว่างเขียนใหม่กว่า
+                    values.update(self._pending.get(target, {}))
+                    self._pending[target] = values
+
+    def _run(self):
+        stop_event = self._stop_event
+        while not stop_event.wait(self.interval):
+            self.flush()
+
+    def stop(self, timeout=10):
+        """หยุด background thread และเขียนค่าที่เหลือ (เรียกอัตโนมัติตอนปิดโปรแกรม)"""
+        if self.running:
+            self._stop_event.set()
+            self._thread.join(timeout)
+        self.flush()
+
+
+write_behind = WriteBehindBuffer()
+atexit.register(write_behind.stop)
+
+
+def configure_write_behind(app):
+    """ตั้งค่ารอบการเขียนจาก config WRITE_BEHIND_INTERVAL"""
+    write_behind.interval = float(app.config.get('WRITE_BEHIND_INTERVAL', DEFAULT_INTERVAL))
+
+
+def touch(instance, attribute, value):
+    """
+    ตั้งค่าคอลัมน์แบบ touch ของ instance โดยไม่ทำให้ session ต้อง flush/commit
+    ค่าใน instance เปลี่ยนทันที ส่วนฐานข้อมูลถูกเขียนภายหลังโดย write_behind
+
+    Args:
+        instance: ORM instance ที่โหลดจากฐานข้อมูลแล้ว (เช่น AdminUser)
+        attribute (str): ชื่อคอลัมน์ (เช่น 'last_login')
+        value: ค่าใหม่
+    """
+    state = inspect(instance)
+    set_committed_value(instance, attribute, value)
+    try:
+        write_behind.touch(state.mapper.columns[attribute], state.identity[0], value, db.engine)
+    except Exception as e:
+        print(f"Warning: Could not update {attribute}: {e}")
+
+
+def touched_value(instance, attribute):
+    """ค่าล่าสุดของคอลัมน์แบบ touch (รวมค่าที่ยังรอเขียน)"""
+    state = inspect(instance)
+    return write_behind.pending_value(
+        state.mapper.columns[attribute], state.identity[0], getattr(instance, attribute)
+    )
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Fixtures สำหรับ integration tests
+ใช้ app จริงกับฐานข้อมูล SQLite ชั่วคราว (เตรียม schema ตอน import app เหมือน gunicorn)
+ข้อมูลของแต่ละ test แยกกันด้วยหน่วยงานที่สร้างใหม่ทุกครั้ง
+"""
+
+import os
+import sys
+import tempfile
+import itertools
+import pytest
+
+# ต้องตั้งค่าก่อน import app
+_TEST_DIR = tempfile.mkdtemp(prefix='hospital-test-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TEST_DIR, 'test_hospital.db')}"
+os.environ['UPLOAD_FOLDER'] = os.path.join(_TEST_DIR, 'uploads')
+os.environ['CASE_AUDIT_MODE'] = 'transaction'
+os.environ['WRITE_BEHIND_INTERVAL'] = '0'
+os.environ['PREPARE_DATABASE_ON_STARTUP'] = 'true'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+from app import app as flask_app, db
+from models import AdminUser, Department, CaseDailyCount
+from services.case_rollup import _rollup_select, COUNTER_COLUMNS
+
+ADMIN_USERNAME = 'admin'
+ADMIN_PASSWORD = 'admin123'
+
+_department_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Flask app ที่ใช้ฐานข้อมูลทดสอบ"""
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        if AdminUser.query.filter_by(username=ADMIN_USERNAME).first() is None:
+            db.session.add(AdminUser(
+                username=ADMIN_USERNAME,
+                password_hash=generate_password_hash(ADMIN_PASSWORD),
+                email='admin@test.local',
+                role='admin'
+            ))
+            db.session.commit()
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    """สร้าง test client"""
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers(client):
+    """header Authorization ของผู้ดูแลระบบ"""
+    response = client.post('/api/admin/auth/login', json={
+        'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD
+    })
+    assert response.status_code == 200
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def make_department(app):
+    """สร้างหน่วยงานใหม่ (รหัสไม่ซ้ำกับ test อื่น)"""
+    def factory():
+        number = next(_department_numbers)
+        with app.app_context():
+            department = Department(name=f'หน่วยงานทดสอบ {number}', code=f'T{number:03d}')
+            db.session.add(department)
+            db.session.commit()
+            return department.id, department.code
+    return factory
+
+
+@pytest.fixture
+def rollup_matches_cases(app):
+    """ตรวจว่า case_daily_count ตรงกับการนับ GROUP BY จาก patient_case"""
+    def check():
+        with app.app_context():
+            columns = ['department_id', 'case_date', *COUNTER_COLUMNS]
+            table = CaseDailyCount.__table__
+            rollup = {
+                tuple(row) for row in db.session.execute(
+                    select(*[table.c[name] for name in columns])
+                    .where(sum(table.c[name] for name in COUNTER_COLUMNS) > 0)
+                )
+            }
+            source = _rollup_select().subquery()
+            expected = {tuple(row) for row in db.session.execute(select(*[source.c[name] for name in columns]))}
+            return rollup == expected
+    return check
+
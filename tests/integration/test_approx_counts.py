@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ approximate counts ของ dashboard (STATS_COUNT_MODE=approximate)
+"""
+
+import services.approx_counts as approx_counts
+from models import db
+from services.case_stats import get_dashboard_summary
+
+
+def test_dashboard_estimates_only_table_scan_counters(app, make_department, monkeypatch):
+    """ประมาณเฉพาะตัวนับที่ต้อง COUNT ทั้งตาราง และอ่าน catalog ครั้งเดียวภายในอายุของ cache"""
+    make_department()
+    monkeypatch.setitem(app.config, 'STATS_COUNT_MODE', 'approximate')
+    monkeypatch.setitem(app.config, 'APPROXIMATE_COUNT_THRESHOLD', 1)
+    monkeypatch.setattr(approx_counts, '_estimate_cache', {})
+    calls = []
+    original = approx_counts.get_table_estimates
+
+    def counting_estimates(connection, table_names):
+        calls.append(sorted(table_names))
+        return original(connection, table_names)
+
+    monkeypatch.setattr(approx_counts, 'get_table_estimates', counting_estimates)
+    with app.app_context():
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        first = get_dashboard_summary()
+        second = get_dashboard_summary()
+
+    assert 'departments' in first['approximate']
+    assert 'total_cases' not in first['approximate']
+    assert first['approximate'] == second['approximate']
+    assert len(calls) == 1
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ bulk soft delete / restore / ย้ายหน่วยงาน (POST /api/admin/cases/bulk/...)
+"""
+
+import pytest
+from models import PatientCase, CaseAudit
+
+
+def _import_cases(app, client, auth_headers, code, count, first_name='บัลค์', start_hn=5000000):
+    """เพิ่ม cases ผ่าน CSV import แล้วคืนรายการ id"""
+    lines = ['hn,first_name,last_name,department_code,case_date']
+    lines += [
+        f'{start_hn + number},{first_name},ทดสอบ{number},{code},2026-08-{number % 28 + 1:02d}'
+        for number in range(count)
+    ]
+    response = client.post(
+        '/api/admin/cases/import', data='\n'.join(lines).encode('utf-8'),
+        headers=dict(auth_headers, **{'Content-Type': 'text/csv'})
+    )
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == count
+    with app.app_context():
+        return [
+            case.id for case in PatientCase.query.filter(
+                PatientCase.hn.in_([str(start_hn + number) for number in range(count)])
+            ).order_by(PatientCase.id)
+        ]
+
+
+def _audit_actions(case_ids):
+    return sorted(
+        (audit.case_id, audit.action) for audit in CaseAudit.query.filter(
+            CaseAudit.case_id.in_(case_ids), CaseAudit.action != 'CREATE'
+        )
+    )
+
+
+def test_bulk_delete_and_restore(app, client, auth_headers, make_department, rollup_matches_cases):
+    """ลบด้วยรายการ id แล้วนำกลับมาด้วย filter ของหน่วยงาน"""
+    department_id, code = make_department()
+    case_ids = _import_cases(app, client, auth_headers, code, 6)
+
+    response = client.post('/api/admin/cases/bulk/delete', json={'ids': case_ids[:4]}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 4
+    # ลบซ้ำไม่นับ case ที่ถูกลบแล้ว
+    response = client.post('/api/admin/cases/bulk/delete', json={'ids': case_ids[:4]}, headers=auth_headers)
+    assert response.get_json()['count'] == 0
+    assert rollup_matches_cases()
+
+    with app.app_context():
+        assert PatientCase.query.filter_by(department_id=department_id, is_deleted=True).count() == 4
+        assert _audit_actions(case_ids) == sorted((case_id, 'DELETE') for case_id in case_ids[:4])
+
+    response = client.post('/api/admin/cases/bulk/restore', json={
+        'filter': {'department_id': department_id, 'start_date': '2026-08-01', 'end_date': '2026-08-31'}
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 4
+    assert rollup_matches_cases()
+
+    with app.app_context():
+        assert PatientCase.query.filter_by(department_id=department_id, is_deleted=True).count() == 0
+        assert len(_audit_actions(case_ids)) == 8
+
+
+def test_bulk_reassign(app, client, auth_headers, make_department, rollup_matches_cases):
+    """ย้าย cases ไปหน่วยงานอื่น แล้วค้นหาชื่อในหน่วยงานปลายทางได้"""
+    source_id, source_code = make_department()
+    target_id, _ = make_department()
+    case_ids = _import_cases(app, client, auth_headers, source_code, 3, first_name='ย้ายหน่วย', start_hn=5100000)
+
+    response = client.post('/api/admin/cases/bulk/reassign', json={
+        'ids': case_ids, 'department_id': target_id
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 3
+    assert rollup_matches_cases()
+
+    with app.app_context():
+        assert PatientCase.query.filter_by(department_id=source_id).count() == 0
+        assert PatientCase.query.filter_by(department_id=target_id).count() == 3
+        assert _audit_actions(case_ids) == sorted((case_id, 'UPDATE') for case_id in case_ids)
+
+    response = client.get(
+        f'/api/admin/cases?search=ย้ายหน่วย&department_id={target_id}', headers=auth_headers
+    )
+    assert sorted(case['id'] for case in response.get_json()['cases']) == case_ids
+
+
+def test_bulk_reassign_requires_existing_department(client, auth_headers):
+    """หน่วยงานปลายทางที่ไม่มีอยู่ได้ 404 และที่ไม่ระบุได้ 400"""
+    response = client.post('/api/admin/cases/bulk/reassign', json={
+        'ids': [1], 'department_id': 999999
+    }, headers=auth_headers)
+    assert response.status_code == 404
+
+    response = client.post('/api/admin/cases/bulk/reassign', json={'ids': [1]}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'ids': []},
+    {'ids': 'abc'},
+    {'ids': 5},
+    {'ids': ['x']},
+    {'filter': 'department'},
+    {'filter': [1, 2]},
+    {'filter': {'start_date': '01/08/2026'}},
+    [1, 2, 3],
+])
+def test_bulk_rejects_invalid_selection(client, auth_headers, body):
+    """body ที่ไม่ถูกต้องหรือไม่มีเงื่อนไขได้ 400"""
+    for action in ('delete', 'restore', 'reassign'):
+        response = client.post(f'/api/admin/cases/bulk/{action}', json=body, headers=auth_headers)
+        assert response.status_code == 400
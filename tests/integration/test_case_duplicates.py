@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+ทดสอบการตรวจ case ซ้ำ (hn, department_id, case_date) ตอนเพิ่ม case (POST /api/admin/cases)
+"""
+
+import pytest
+
+
+def _create(client, auth_headers, department_id, **fields):
+    body = {
+        'hn': '8000001', 'first_name': 'ซ้ำ', 'last_name': 'ทดสอบ',
+        'department_id': department_id, 'case_date': '2026-09-07'
+    }
+    body.update(fields)
+    return client.post('/api/admin/cases', json=body, headers=auth_headers)
+
+
+def test_duplicate_case_returns_409_with_existing_case(client, auth_headers, make_department):
+    """HN หน่วยงาน และวันที่เดียวกันได้ 409 พร้อม case เดิม ส่วนวันที่อื่นเพิ่มได้"""
+    department_id, _ = make_department()
+    assert _create(client, auth_headers, department_id).status_code == 200
+
+    response = _create(client, auth_headers, department_id, hn=' 8000001 ')
+    assert response.status_code == 409
+    data = response.get_json()
+    assert data['duplicate'] is True
+    assert data['case']['hn'] == '8000001'
+
+    assert _create(client, auth_headers, department_id, case_date='2026-09-08').status_code == 200
+
+
+@pytest.mark.parametrize('flag', ['false', '0', 0, 'no', [], {'x': 1}])
+def test_allow_duplicate_requires_true(client, auth_headers, make_department, flag):
+    """allow_duplicate ที่ไม่ใช่ true ไม่ข้ามการตรวจ case ซ้ำ"""
+    department_id, _ = make_department()
+    _create(client, auth_headers, department_id)
+    assert _create(client, auth_headers, department_id, allow_duplicate=flag).status_code == 409
+
+
+@pytest.mark.parametrize('flag', [True, 'true', 'TRUE'])
+def test_allow_duplicate_true_adds_case(client, auth_headers, make_department, flag):
+    """allow_duplicate=true ยืนยันเพิ่ม case ซ้ำ"""
+    department_id, _ = make_department()
+    _create(client, auth_headers, department_id)
+    assert _create(client, auth_headers, department_id, allow_duplicate=flag).status_code == 200
+
+
+def test_deleted_case_is_not_a_duplicate(client, auth_headers, make_department):
+    """case ที่ถูกลบแล้วไม่นับเป็น case ซ้ำ"""
+    department_id, _ = make_department()
+    case_id = _create(client, auth_headers, department_id).get_json()['case']['id']
+    assert client.delete(f'/api/admin/cases/{case_id}', headers=auth_headers).status_code == 200
+    assert _create(client, auth_headers, department_id).status_code == 200
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ import cases จาก CSV (POST /api/admin/cases/import)
+"""
+
+from models import PatientCase, CaseAudit
+
+CSV_HEADER = 'hn,first_name,last_name,department_code,case_date,notes'
+
+
+def _post_csv(client, auth_headers, text, **options):
+    query = '&'.join(f'{key}={value}' for key, value in options.items())
+    return client.post(
+        f'/api/admin/cases/import?{query}', data=text.encode('utf-8'),
+        headers=dict(auth_headers, **{'Content-Type': 'text/csv'})
+    )
+
+
+def test_import_cases(app, client, auth_headers, make_department, rollup_matches_cases):
+    """แถวที่ถูกต้องถูกเพิ่ม แถวที่ไม่ถูกต้องหรือซ้ำถูกรายงาน"""
+    department_id, code = make_department()
+    text = '\n'.join([
+        CSV_HEADER,
+        f'6000001,นำเข้าหนึ่ง,ทดสอบ,{code},2026-07-01,',
+        f'HN 6000002,นำเข้าสอง,ทดสอบ,{code},02/07/2569,ติดตาม',
+        f'6000001,นำเข้าหนึ่ง,ทดสอบ,{code},2026-07-01,',
+        f'123,ผิด,รูปแบบ,{code},2026-07-01,',
+        '6000003,ไม่มี,หน่วยงาน,NOPE,2026-07-01,',
+        f'6000004,วันที่,ผิด,{code},31/31/2026,',
+    ])
+    response = _post_csv(client, auth_headers, text)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['total'] == 6
+    assert data['imported'] == 2
+    assert [item['line'] for item in data['rejected']] == [4, 5, 6, 7]
+    assert rollup_matches_cases()
+
+    with app.app_context():
+        cases = PatientCase.query.filter_by(department_id=department_id).order_by(PatientCase.hn).all()
+        assert [(case.hn, str(case.case_date)) for case in cases] == [
+            ('6000001', '2026-07-01'), ('6000002', '2026-07-02')
+        ]
+        assert CaseAudit.query.filter(
+            CaseAudit.case_id.in_([case.id for case in cases]), CaseAudit.action == 'CREATE'
+        ).count() == 2
+
+    # ค้นหาชื่อที่ import ได้ทันที
+    response = client.get('/api/admin/cases?search=นำเข้าสอง', headers=auth_headers)
+    assert [case['hn'] for case in response.get_json()['cases']] == ['6000002']
+
+    # import ไฟล์เดิมซ้ำ: ทุกแถวซ้ำกับข้อมูลเดิม
+    response = _post_csv(client, auth_headers, '\n'.join(text.split('\n')[:3]))
+    assert response.get_json()['imported'] == 0
+    assert len(response.get_json()['rejected']) == 2
+
+
+def test_import_dry_run_and_allow_duplicates(app, client, auth_headers, make_department, rollup_matches_cases):
+    """dry_run ตรวจอย่างเดียว และ allow_duplicates เพิ่มแถวที่ซ้ำได้"""
+    department_id, code = make_department()
+    text = '\n'.join([CSV_HEADER] + [f'6100001,ซ้ำ,ได้,{code},2026-07-03,'] * 2)
+
+    response = _post_csv(client, auth_headers, text, dry_run='true')
+    assert response.get_json()['valid'] == 1
+    assert response.get_json()['imported'] == 0
+
+    response = _post_csv(client, auth_headers, text, allow_duplicates='true')
+    assert response.get_json()['imported'] == 2
+    assert rollup_matches_cases()
+    with app.app_context():
+        assert PatientCase.query.filter_by(department_id=department_id).count() == 2
+
+
+def test_import_rejects_invalid_file(client, auth_headers):
+    """ไฟล์ว่างหรือไม่มีคอลัมน์ที่จำเป็นได้ 400"""
+    assert _post_csv(client, auth_headers, '').status_code == 400
+    assert _post_csv(client, auth_headers, 'hn,first_name\n6200001,ไม่ครบ').status_code == 400
+
+
+def test_create_duplicate_case_conflicts(client, auth_headers, make_department):
+    """เพิ่ม case ซ้ำ (HN, หน่วยงาน, วันที่) ผ่าน API ได้ 409 พร้อม case เดิม"""
+    department_id, code = make_department()
+    response = _post_csv(client, auth_headers, f'{CSV_HEADER}\n6300001,มีอยู่,แล้ว,{code},2026-07-04,')
+    assert response.get_json()['imported'] == 1
+
+    body = {
+        'hn': '6300001', 'first_name': 'มีอยู่', 'last_name': 'แล้ว',
+        'department_id': department_id, 'case_date': '2026-07-04'
+    }
+    response = client.post('/api/admin/cases', json=body, headers=auth_headers)
+    assert response.status_code == 409
+    assert response.get_json()['duplicate'] is True
+
+    response = client.post('/api/admin/cases', json=dict(body, allow_duplicate=True), headers=auth_headers)
+    assert response.status_code in (200, 201)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ result cache ของรายการ cases (services/case_list_cache.py)
+"""
+
+from models import db, PatientCase
+from services.case_list_cache import CaseListCache, case_list_cache, case_list_cache_key
+
+
+def _list(client, auth_headers, department_id, **params):
+    query = '&'.join(f'{key}={value}' for key, value in dict(department_id=department_id, **params).items())
+    response = client.get(f'/api/admin/cases?{query}', headers=auth_headers)
+    assert response.status_code == 200
+    return [case['hn'] for case in response.get_json()['cases']]
+
+
+def _create(client, auth_headers, department_id, hn):
+    response = client.post('/api/admin/cases', json={
+        'hn': hn, 'first_name': 'แคช', 'last_name': 'รายการ',
+        'department_id': department_id, 'case_date': '2026-09-09'
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    return response.get_json()['case']['id']
+
+
+def test_commit_invalidates_only_affected_departments(app, client, auth_headers, make_department):
+    """commit cases ของหน่วยงานหนึ่งล้างเฉพาะรายการของหน่วยงานนั้นและรายการรวม"""
+    first_id, _ = make_department()
+    second_id, _ = make_department()
+    _create(client, auth_headers, first_id, '8100001')
+    assert _list(client, auth_headers, first_id) == ['8100001']
+    assert _list(client, auth_headers, second_id) == []
+    first_key = case_list_cache_key('', first_id, None, None, 20, page=None, include_total=False, exact_total=False)
+    second_key = case_list_cache_key('', second_id, None, None, 20, page=None, include_total=False, exact_total=False)
+    assert case_list_cache.get(first_key) is not None
+
+    _create(client, auth_headers, second_id, '8100002')
+    assert case_list_cache.get(first_key) is not None
+    assert case_list_cache.get(second_key) is None
+    assert _list(client, auth_headers, second_id) == ['8100002']
+
+
+def test_moving_a_case_invalidates_both_departments(app, client, auth_headers, make_department):
+    """ย้าย case ไปหน่วยงานอื่นล้างรายการของทั้งหน่วยงานเดิมและหน่วยงานใหม่"""
+    source_id, _ = make_department()
+    target_id, _ = make_department()
+    case_id = _create(client, auth_headers, source_id, '8100003')
+    assert _list(client, auth_headers, source_id) == ['8100003']
+    assert _list(client, auth_headers, target_id) == []
+
+    with app.app_context():
+        db.session.get(PatientCase, case_id).department_id = target_id
+        db.session.commit()
+    assert _list(client, auth_headers, source_id) == []
+    assert _list(client, auth_headers, target_id) == ['8100003']
+
+
+def test_rollback_keeps_cached_results(app, client, auth_headers, make_department):
+    """การแก้ไขที่ rollback ไม่ล้าง cache"""
+    department_id, _ = make_department()
+    case_id = _create(client, auth_headers, department_id, '8100004')
+    _list(client, auth_headers, department_id)
+    generation = case_list_cache.generation
+
+    with app.app_context():
+        db.session.get(PatientCase, case_id).first_name = 'ยกเลิก'
+        db.session.flush()
+        db.session.rollback()
+    assert case_list_cache.generation == generation
+
+
+def test_cache_key_keeps_exact_search_text():
+    """คำค้นที่ต่างกันเฉพาะช่องว่างไม่ใช้ผลลัพธ์ร่วมกัน"""
+    assert case_list_cache_key('a  b', 1, None, None, 20) != case_list_cache_key('a b', 1, None, None, 20)
+    assert case_list_cache_key('', None, '', '', 20) == (None, None, None, None, 20)
+
+
+def test_cache_evicts_least_recently_used_within_byte_budget():
+    """เกิน budget แล้วทิ้งรายการที่ใช้ล่าสุดนานที่สุด"""
+    cache = CaseListCache(max_bytes=10)
+    cache.set('a', b'xxxx', 1, 60, cache.generation)
+    cache.set('b', b'yyyy', 2, 60, cache.generation)
+    assert cache.get('a') == b'xxxx'
+    cache.set('c', b'zzzz', 3, 60, cache.generation)
+    assert cache.get('b') is None
+    assert cache.get('a') == b'xxxx' and cache.get('c') == b'zzzz'
+    assert cache.size == 8
+
+    # ผลที่คำนวณก่อนการล้างไม่ถูกเก็บ
+    generation = cache.generation
+    cache.invalidate([1])
+    cache.set('d', b'w', 1, 60, generation)
+    assert cache.get('d') is None and cache.get('a') is None
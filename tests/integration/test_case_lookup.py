@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+ทดสอบการดึง cases หลายรายการด้วย id หรือ HN (POST /api/admin/cases/lookup)
+"""
+
+import pytest
+
+
+def _create_cases(client, auth_headers, department_id, rows):
+    ids = []
+    for hn, case_date in rows:
+        response = client.post('/api/admin/cases', json={
+            'hn': hn, 'first_name': 'ดึง', 'last_name': 'หลายรายการ',
+            'department_id': department_id, 'case_date': case_date
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        ids.append(response.get_json()['case']['id'])
+    return ids
+
+
+def _lookup(client, auth_headers, body):
+    return client.post('/api/admin/cases/lookup', json=body, headers=auth_headers)
+
+
+def test_lookup_by_ids_keeps_request_order(client, auth_headers, make_department):
+    """ได้ cases ตามลำดับ ids ที่ส่งมา (ตัดค่าซ้ำ) พร้อมรายการ id ที่ไม่พบ"""
+    department_id, _ = make_department()
+    first, second = _create_cases(client, auth_headers, department_id, [
+        ('6910001', '2026-07-07'), ('6910002', '2026-07-07')
+    ])
+
+    data = _lookup(client, auth_headers, {'ids': [second, str(first), second, 999999999]}).get_json()
+    assert [case['id'] for case in data['cases']] == [second, first]
+    assert data['missing'] == [999999999]
+    assert data['count'] == 2
+    assert data['cases'][0]['department_name'].startswith('หน่วยงานทดสอบ')
+
+
+def test_lookup_by_hns_groups_cases(client, auth_headers, make_department):
+    """HN ถูก normalize และ HN หนึ่งได้ทุก case จากใหม่ไปเก่า"""
+    department_id, _ = make_department()
+    older, newer, other = _create_cases(client, auth_headers, department_id, [
+        ('6920001', '2026-07-01'), ('6920001', '2026-07-08'), ('6920002', '2026-07-08')
+    ])
+
+    data = _lookup(client, auth_headers, {'hns': ['6920002', 'HN 692-0001', '6929999']}).get_json()
+    assert [case['id'] for case in data['cases']] == [other, newer, older]
+    assert data['missing'] == ['6929999']
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'ids': [1], 'hns': ['6900001']},
+    {'ids': []},
+    {'ids': 'not-a-list'},
+    {'ids': ['abc']},
+    {'hns': ['ไม่ใช่ HN']},
+    {'ids': list(range(1001))},
+])
+def test_lookup_rejects_invalid_requests(client, auth_headers, body):
+    """คำขอที่ไม่ถูกต้องได้ 400"""
+    response = _lookup(client, auth_headers, body)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
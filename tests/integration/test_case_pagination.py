@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ keyset pagination ของรายการ cases (GET /api/admin/cases?cursor=...)
+"""
+
+from datetime import datetime
+from models import db, PatientCase
+from utils.pagination import encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    """cursor แปลงกลับเป็น (created_at, id) เดิม และ cursor ที่ไม่ถูกต้องได้ ValueError"""
+    created_at = datetime(2026, 7, 1, 8, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+    for invalid in ('', 'not-a-cursor', encode_cursor(created_at, 42)[:-3]):
+        try:
+            decode_cursor(invalid)
+        except ValueError:
+            continue
+        raise AssertionError(f'{invalid!r} ควรเป็น cursor ที่ไม่ถูกต้อง')
+
+
+def test_keyset_pages_with_equal_created_at(app, client, auth_headers, make_department):
+    """cases ที่ created_at เท่ากันแบ่งหน้าตาม id ได้ครบ ไม่ซ้ำและไม่ตกหล่น"""
+    department_id, _ = make_department()
+    for number in range(5):
+        response = client.post('/api/admin/cases', json={
+            'hn': f'67000{number:02d}', 'first_name': 'หน้า', 'last_name': 'ถัดไป',
+            'department_id': department_id, 'case_date': '2026-07-01'
+        }, headers=auth_headers)
+        assert response.status_code == 200
+
+    with app.app_context():
+        PatientCase.query.filter_by(department_id=department_id).update(
+            {'created_at': datetime(2026, 7, 1, 9, 0, 0)}
+        )
+        db.session.commit()
+        expected = [
+            case_id for (case_id,) in db.session.query(PatientCase.id)
+            .filter_by(department_id=department_id).order_by(PatientCase.id.desc())
+        ]
+
+    seen = []
+    cursor = None
+    for _ in range(5):
+        url = f'/api/admin/cases?department_id={department_id}&per_page=2'
+        if cursor:
+            url += f'&cursor={cursor}'
+        data = client.get(url, headers=auth_headers).get_json()
+        seen.extend(case['id'] for case in data['cases'])
+        cursor = data['pagination']['next_cursor']
+        assert data['pagination']['has_more'] is (cursor is not None)
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+def test_invalid_cursor_is_rejected(client, auth_headers):
+    """cursor ที่ไม่ถูกต้องได้ 400"""
+    response = client.get('/api/admin/cases?cursor=not-a-cursor', headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
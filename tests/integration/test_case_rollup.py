@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+ทดสอบการสร้าง rollup ใหม่ (scripts/rebuild_case_rollup.py)
+"""
+
+import os
+import threading
+import importlib.util
+from models import db, CaseDailyCount
+from services.schema_setup import schema_lock
+
+SCRIPT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'scripts', 'rebuild_case_rollup.py'
+)
+
+
+def _load_script():
+    spec = importlib.util.spec_from_file_location('rebuild_case_rollup_script', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_rebuild_script_waits_for_schema_lock(app, client, auth_headers, make_department, rollup_matches_cases):
+    """script รอ schema_lock ก่อนสร้างใหม่ และแก้ตัวนับที่คลาดเคลื่อนให้ตรงกับ patient_case"""
+    department_id, _ = make_department()
+    response = client.post('/api/admin/cases', json={
+        'hn': '6500001', 'first_name': 'สร้าง', 'last_name': 'ใหม่',
+        'department_id': department_id, 'case_date': '2026-05-01'
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    with app.app_context():
+        CaseDailyCount.query.filter_by(department_id=department_id).update({'case_count': 99})
+        db.session.commit()
+    assert not rollup_matches_cases()
+
+    script = _load_script()
+    finished = threading.Event()
+    worker = threading.Thread(target=lambda: (script.main(), finished.set()))
+    with app.app_context():
+        with schema_lock():
+            worker.start()
+            # worker อื่นกำลังเตรียมฐานข้อมูลอยู่: script ต้องรอ
+            assert not finished.wait(0.3)
+    worker.join(10)
+    assert finished.is_set()
+    assert rollup_matches_cases()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ search planner ของ cases (services/case_search.py)
+"""
+
+import pytest
+from services.case_search import plan_case_search
+
+
+@pytest.mark.parametrize('search, mode, terms', [
+    ('6800001', 'hn_exact', ['6800001']),
+    ('HN: 680-0001', 'hn_exact', ['6800001']),
+    ('hn 68 000', 'hn_prefix', ['68000']),
+    ('680', 'hn_prefix', ['680']),
+    ('สมชาย ใจดี', 'name', ['สมชาย', 'ใจดี']),
+    ('68', 'any', ['68']),
+    ('ห้อง 12', 'any', ['ห้อง 12']),
+])
+def test_plan_case_search(search, mode, terms):
+    """เลือก mode ตามรูปแบบคำค้น"""
+    plan = plan_case_search(search)
+    assert (plan.mode, plan.terms) == (mode, terms)
+
+
+def test_plan_case_search_empty():
+    """คำค้นว่างไม่มีแผนการค้นหา"""
+    assert plan_case_search('') is None
+    assert plan_case_search('   ') is None
+
+
+def _search(client, auth_headers, department_id, search):
+    response = client.get(
+        '/api/admin/cases', query_string={'department_id': department_id, 'search': search},
+        headers=auth_headers
+    )
+    data = response.get_json()
+    return data['search_mode'], sorted(case['hn'] for case in data['cases'])
+
+
+def test_hn_exact_and_prefix_routing(client, auth_headers, make_department):
+    """HN เต็มค้นหาตรงตัว HN บางส่วนค้นหาแบบขึ้นต้นด้วย (ไม่ใช่ substring)"""
+    department_id, _ = make_department()
+    for hn in ('6800001', '6800011', '1680000'):
+        response = client.post('/api/admin/cases', json={
+            'hn': hn, 'first_name': 'ค้นหา', 'last_name': 'เอชเอ็น',
+            'department_id': department_id, 'case_date': '2026-07-05'
+        }, headers=auth_headers)
+        assert response.status_code == 200
+
+    assert _search(client, auth_headers, department_id, 'HN 680-0001') == ('hn_exact', ['6800001'])
+    assert _search(client, auth_headers, department_id, '68000') == ('hn_prefix', ['6800001', '6800011'])
+    assert _search(client, auth_headers, department_id, '168') == ('hn_prefix', ['1680000'])
+    assert _search(client, auth_headers, department_id, 'เอชเอ็น') == (
+        'name', ['1680000', '6800001', '6800011']
+    )
+
+
+def test_thai_name_search_normalizes_typing_variants(client, auth_headers, make_department):
+    """ค้นหาชื่อด้วย เเ แทน แ หรือ ํา แทน ำ ก็พบ"""
+    department_id, _ = make_department()
+    response = client.post('/api/admin/cases', json={
+        'hn': '6800101', 'first_name': 'แก้วตา', 'last_name': 'น้ำใจ',
+        'department_id': department_id, 'case_date': '2026-07-05'
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    for search in ('เเก้วตา', 'นํ้าใจ', 'แกวตา นำใจ'):
+        assert _search(client, auth_headers, department_id, search) == ('name', ['6800101'])
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ serializer แบบเลือกเฉพาะคอลัมน์ (services/case_serializers.py)
+"""
+
+from models import db, PatientCase
+from services.case_serializers import (
+    project_cases, serialize_case_rows, serialize_case,
+    CASE_LIST_FIELDS, PUBLIC_RECENT_PATIENT_FIELDS
+)
+
+
+def test_projected_rows_match_orm_serializer(app, client, auth_headers, make_department):
+    """row จาก project_cases ได้ dict เดียวกับการแปลงจาก PatientCase instance"""
+    department_id, _ = make_department()
+    response = client.post('/api/admin/cases', json={
+        'hn': '6900001', 'first_name': 'คอลัมน์', 'last_name': 'ที่เลือก',
+        'department_id': department_id, 'case_date': '2026-07-06', 'notes': 'บันทึก'
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    created = response.get_json()['case']
+
+    with app.app_context():
+        query = db.session.query(PatientCase).filter_by(department_id=department_id)
+        rows = project_cases(query, CASE_LIST_FIELDS).all()
+        assert serialize_case_rows(rows, CASE_LIST_FIELDS) == [serialize_case(query.one())]
+
+    data = serialize_case_rows(rows, CASE_LIST_FIELDS)[0]
+    assert list(data) == [field.key for field in CASE_LIST_FIELDS]
+    assert data == created
+    assert data['department_name'].startswith('หน่วยงานทดสอบ')
+    assert data['case_date'] == '2026-07-06'
+
+
+def test_public_projection_selects_only_public_columns(app):
+    """query ของข้อมูลสาธารณะไม่ select คอลัมน์ส่วนตัวของผู้ป่วยเลย"""
+    with app.app_context():
+        query = project_cases(db.session.query(PatientCase), PUBLIC_RECENT_PATIENT_FIELDS)
+        selected = {column['name'] for column in query.column_descriptions}
+        assert selected == {'department_name', 'department_code', 'created_date', 'case_date'}
+        sql = str(query.statement.compile(dialect=db.engine.dialect))
+        for private in ('hn', 'first_name', 'last_name', 'notes'):
+            assert f'patient_case.{private}' not in sql
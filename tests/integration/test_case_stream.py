@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ stream รายการ cases แบบ NDJSON (GET /api/admin/cases/stream)
+"""
+
+import json
+from services.case_serializers import stream_case_rows, CASE_LIST_FIELDS
+from models import db, PatientCase
+
+
+def _create_cases(client, auth_headers, department_id, rows):
+    ids = []
+    for hn, case_date in rows:
+        response = client.post('/api/admin/cases', json={
+            'hn': hn, 'first_name': 'สตรีม', 'last_name': 'รายงาน',
+            'department_id': department_id, 'case_date': case_date
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        ids.append(response.get_json()['case']['id'])
+    return ids
+
+
+def _stream(client, auth_headers, query):
+    response = client.get(f'/api/admin/cases/stream?{query}', headers=auth_headers)
+    return response, [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_stream_filters_and_orders_by_case_date(client, auth_headers, make_department):
+    """แต่ละบรรทัดเป็น case หนึ่งรายการ กรองตามหน่วยงานและช่วงวันที่ เรียงตาม case_date และ id"""
+    department_id, _ = make_department()
+    other_department_id, _ = make_department()
+    late, early, outside = _create_cases(client, auth_headers, department_id, [
+        ('6930001', '2026-07-20'), ('6930002', '2026-07-10'), ('6930003', '2026-08-01')
+    ])
+    (other,) = _create_cases(client, auth_headers, other_department_id, [('6930004', '2026-07-15')])
+
+    response, cases = _stream(
+        client, auth_headers,
+        f'department_id={department_id},{other_department_id}&start_date=2026-07-01&end_date=2026-07-31'
+    )
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert [case['id'] for case in cases] == [early, other, late]
+    assert outside not in [case['id'] for case in cases]
+    assert list(cases[0]) == [field.key for field in CASE_LIST_FIELDS]
+
+
+def test_stream_rejects_invalid_filters(client, auth_headers):
+    """department_id หรือวันที่ที่ไม่ถูกต้องได้ 400 ก่อนเริ่ม stream"""
+    assert _stream(client, auth_headers, 'department_id=abc')[0].status_code == 400
+    assert _stream(client, auth_headers, 'start_date=31/07/2026')[0].status_code == 400
+
+
+def test_stream_case_rows_batches(app, client, auth_headers, make_department):
+    """stream_case_rows แบ่งผลเป็นชุดตาม batch_size"""
+    department_id, _ = make_department()
+    ids = _create_cases(client, auth_headers, department_id, [
+        (f'69400{number:02d}', '2026-07-09') for number in range(5)
+    ])
+    with app.app_context():
+        query = db.session.query(PatientCase).filter_by(department_id=department_id).order_by(PatientCase.id)
+        batches = list(stream_case_rows(query, CASE_LIST_FIELDS, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [case['id'] for batch in batches for case in batch] == ids
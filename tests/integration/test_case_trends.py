@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+ทดสอบแนวโน้มจำนวนผู้ป่วย (GET /api/public/stats/trend)
+"""
+
+import pytest
+
+
+@pytest.mark.parametrize('period, start, aligned, labels', [
+    ('month', '2026-03-20', '2026-03-01', ['2026-03-01', '2026-04-01']),
+    ('week', '2026-03-18', '2026-03-16', ['2026-03-16', '2026-03-23', '2026-03-30', '2026-04-06']),
+])
+def test_trend_aligns_partial_first_bucket(client, auth_headers, make_department, period, start, aligned, labels):
+    """start กลางช่วงเวลาถูกปัดลงเป็นวันแรกของช่วง ทำให้ช่วงแรกนับครบ"""
+    department_id, code = make_department()
+    for hn, case_date in (('6400001', '2026-03-02'), ('6400002', '2026-03-17'), ('6400003', '2026-04-10')):
+        response = client.post('/api/admin/cases', json={
+            'hn': hn, 'first_name': 'แนวโน้ม', 'last_name': 'ทดสอบ',
+            'department_id': department_id, 'case_date': case_date
+        }, headers=auth_headers)
+        assert response.status_code == 200
+
+    response = client.get(
+        f'/api/public/stats/trend?period={period}&start={start}&end=2026-04-10&department={code}'
+    )
+    data = response.get_json()['data']
+    assert data['start'] == aligned
+    assert data['requested_start'] == start
+    assert data['labels'] == labels
+    if period == 'month':
+        # case วันที่ 2 มี.ค. อยู่ก่อน start ที่ขอแต่อยู่ในเดือนเดียวกัน จึงต้องถูกนับด้วย
+        assert data['totals'] == [2, 1]
+    else:
+        assert data['totals'] == [1, 0, 0, 1]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ upsert cases จากระบบภายนอก (POST /api/admin/cases/upsert)
+"""
+
+from datetime import date
+from models import db, PatientCase, CaseAudit
+
+
+def _record(code, hn='1234567', case_date='2026-09-01', **fields):
+    record = {
+        'hn': hn,
+        'first_name': 'สมชาย',
+        'last_name': 'ใจดี',
+        'department_code': code,
+        'case_date': case_date
+    }
+    record.update(fields)
+    return record
+
+
+def _upsert(client, auth_headers, records):
+    return client.post('/api/admin/cases/upsert', json={'cases': records}, headers=auth_headers)
+
+
+def test_upsert_retry_is_idempotent(app, client, auth_headers, make_department, rollup_matches_cases):
+    """ส่งชุดเดิมซ้ำต้องไม่เกิด case ซ้ำและรายงาน unchanged"""
+    department_id, code = make_department()
+    records = [_record(code, hn='1000001'), _record(code, hn='1000002', notes='ติดตามผล')]
+
+    first = _upsert(client, auth_headers, records)
+    assert first.status_code == 200
+    assert first.get_json()['created'] == 2
+
+    second = _upsert(client, auth_headers, records)
+    assert second.status_code == 200
+    data = second.get_json()
+    assert data['unchanged'] == 2
+    assert data['created'] == 0 and data['updated'] == 0
+    assert [item['status'] for item in data['results']] == ['unchanged', 'unchanged']
+    assert [item['id'] for item in data['results']] == [item['id'] for item in first.get_json()['results']]
+
+    with app.app_context():
+        assert PatientCase.query.filter_by(department_id=department_id).count() == 2
+        # ส่งซ้ำไม่สร้าง audit ใหม่
+        assert CaseAudit.query.filter(
+            CaseAudit.case_id.in_([item['id'] for item in data['results']])
+        ).count() == 2
+    assert rollup_matches_cases()
+
+
+def test_upsert_updates_changed_fields(app, client, auth_headers, make_department):
+    """ข้อมูลที่เปลี่ยนถูกแก้ไข และฟิลด์ที่ไม่ได้ส่งคงค่าเดิม"""
+    _, code = make_department()
+    first = _upsert(client, auth_headers, [_record(code, notes='ครั้งแรก', external_link='https://example.com/a')])
+    case_id = first.get_json()['results'][0]['id']
+
+    response = _upsert(client, auth_headers, [_record(code, first_name='สมหญิง')])
+    assert response.get_json()['results'][0] == {
+        'index': 0, 'id': case_id, 'external_ref': response.get_json()['results'][0]['external_ref'], 'status': 'updated'
+    }
+    with app.app_context():
+        case = db.session.get(PatientCase, case_id)
+        assert case.first_name == 'สมหญิง'
+        assert case.notes == 'ครั้งแรก'
+        assert case.external_link == 'https://example.com/a'
+
+
+def test_upsert_claims_existing_case_without_ref(app, client, auth_headers, make_department, rollup_matches_cases):
+    """case เดิมที่เพิ่มผ่านหน้าเว็บ (ไม่มี external_ref) ถูกผูก key แทนการเพิ่มใหม่"""
+    department_id, code = make_department()
+    created = client.post('/api/admin/cases', json={
+        'hn': '2000001', 'first_name': 'สมชาย', 'last_name': 'ใจดี',
+        'department_id': department_id, 'case_date': '2026-09-02'
+    }, headers=auth_headers)
+    assert created.status_code in (200, 201)
+
+    with app.app_context():
+        existing = PatientCase.query.filter_by(department_id=department_id).one()
+        assert existing.external_ref is None
+        existing_id = existing.id
+
+    response = _upsert(client, auth_headers, [_record(code, hn='2000001', case_date='2026-09-02', notes='จาก HIS')])
+    assert response.status_code == 200
+    result = response.get_json()['results'][0]
+    assert result['id'] == existing_id
+    assert result['status'] == 'updated'
+
+    with app.app_context():
+        assert PatientCase.query.filter_by(department_id=department_id).count() == 1
+        case = db.session.get(PatientCase, existing_id)
+        assert case.external_ref == f'2000001:{department_id}:{date(2026, 9, 2).isoformat()}'
+        assert case.notes == 'จาก HIS'
+    assert rollup_matches_cases()
+
+
+def test_upsert_reports_soft_deleted_case(app, client, auth_headers, make_department, rollup_matches_cases):
+    """case ที่ถูกลบแล้วไม่ถูกแก้ไขหรือนำกลับมา และรายงาน deleted"""
+    department_id, code = make_department()
+    first = _upsert(client, auth_headers, [_record(code, hn='3000001')])
+    case_id = first.get_json()['results'][0]['id']
+    assert client.delete(f'/api/admin/cases/{case_id}', headers=auth_headers).status_code == 200
+
+    response = _upsert(client, auth_headers, [_record(code, hn='3000001', first_name='สมหญิง')])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['deleted'] == 1
+    assert data['results'][0]['id'] == case_id
+    assert data['results'][0]['status'] == 'deleted'
+
+    with app.app_context():
+        case = db.session.get(PatientCase, case_id)
+        assert case.is_deleted
+        assert case.first_name == 'สมชาย'
+        assert PatientCase.query.filter_by(department_id=department_id).count() == 1
+    assert rollup_matches_cases()
+
+
+def test_upsert_rejects_invalid_and_duplicate_records(client, auth_headers, make_department):
+    """record ที่ไม่ถูกต้องหรือซ้ำในคำขอเดียวกันถูกปฏิเสธ ส่วนที่เหลือยังถูกบันทึก"""
+    _, code = make_department()
+    response = _upsert(client, auth_headers, [
+        _record(code, hn='4000001'),
+        _record(code, hn='4000001'),
+        _record('NOPE', hn='4000002')
+    ])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['created'] == 1
+    assert [item['index'] for item in data['rejected']] == [1, 2]
+
+
+def test_upsert_requires_cases(client, auth_headers):
+    """body ที่ไม่มีรายการ cases ได้ 400"""
+    assert client.post('/api/admin/cases/upsert', json={'cases': []}, headers=auth_headers).status_code == 400
+    assert client.post('/api/admin/cases/upsert', json={'cases': 'x'}, headers=auth_headers).status_code == 400
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+ทดสอบจำนวนรวมของรายการแบบแบ่งหน้า (services/listing_counts.py)
+"""
+
+import services.listing_counts as listing_counts
+from models import db, Contact
+from services.listing_counts import listing_count_cache, normalize_count_filters
+
+
+def _add_contacts(app, department_id, count, email_prefix):
+    with app.app_context():
+        for number in range(count):
+            db.session.add(Contact(
+                department_id=department_id, email=f'{email_prefix}{number}@test.local', phone=f'08{number:08d}'
+            ))
+        db.session.commit()
+
+
+def test_contacts_listing_uses_cached_total(app, client, auth_headers, make_department):
+    """รายการ contacts ตอบได้ และจำนวนรวมถูกล้างเมื่อมีการเพิ่มข้อมูล"""
+    department_id, _ = make_department()
+    _add_contacts(app, department_id, 3, 'listing')
+
+    url = f'/api/admin/contacts?department_id={department_id}&per_page=2'
+    response = client.get(url, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['pagination']['total'] == 3
+    assert data['pagination']['pages'] == 2
+    assert [contact['email'] for contact in data['contacts']] == ['listing0@test.local', 'listing1@test.local']
+
+    _add_contacts(app, department_id, 1, 'listing-new')
+    assert client.get(url, headers=auth_headers).get_json()['pagination']['total'] == 4
+
+    response = client.get(f'{url}&search=listing-new', headers=auth_headers)
+    assert response.get_json()['pagination']['total'] == 1
+
+
+def test_count_key_keeps_exact_search_text():
+    """ข้อความค้นหาที่ต่างกันเฉพาะช่องว่างไม่ใช้ค่าใน cache ร่วมกัน"""
+    assert normalize_count_filters({'search': 'a  b'}) != normalize_count_filters({'search': 'a b'})
+    assert normalize_count_filters({'search': '', 'department_id': None, 'page': 2}) == (('page', 2),)
+
+
+def test_table_size_probe_is_cached(app, client, auth_headers, make_department, monkeypatch):
+    """ตารางที่เล็กกว่า threshold ไม่ถูกถามขนาดซ้ำทุกครั้งที่ cache ของจำนวนหมดอายุ"""
+    calls = []
+
+    def fake_estimates(connection, table_names):
+        calls.append(list(table_names))
+        return {name: 10 for name in table_names}
+
+    monkeypatch.setattr(listing_counts, 'get_table_estimates', fake_estimates)
+    monkeypatch.delitem(listing_count_cache._table_rows, 'contact', raising=False)
+    department_id, _ = make_department()
+
+    for number in range(3):
+        _add_contacts(app, department_id, 1, f'probe{number}-')
+        response = client.get(f'/api/admin/contacts?department_id={department_id}', headers=auth_headers)
+        assert response.get_json()['pagination'] == {
+            'page': 1, 'pages': 1, 'per_page': 20, 'total': number + 1, 'total_estimated': False
+        }
+    assert calls == [['contact']]
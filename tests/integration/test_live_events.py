@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ live events (GET /api/events/stream)
+"""
+
+import json
+from models import db
+from services.live_events import case_event_bus, event_relay
+
+
+def _open_stream(client):
+    return client.get('/api/events/stream', buffered=False)
+
+
+def _next_chunk(stream):
+    return next(stream.response).decode('utf-8')
+
+
+def test_stream_limits_connections(app, client, monkeypatch):
+    """stream ที่เกิน SSE_MAX_CONNECTIONS ได้ 503 และปิดแล้วคืนที่ให้ client ถัดไป"""
+    monkeypatch.setitem(app.config, 'SSE_MAX_CONNECTIONS', 1)
+    first = _open_stream(client)
+    assert first.status_code == 200
+    assert first.mimetype == 'text/event-stream'
+    assert _next_chunk(first).startswith('retry:')
+
+    second = _open_stream(client)
+    assert second.status_code == 503
+    assert second.headers['Retry-After']
+
+    first.close()
+    assert case_event_bus.subscriber_count == 0
+    third = _open_stream(client)
+    assert third.status_code == 200
+    third.close()
+
+
+def test_stream_delivers_case_events(app, client, auth_headers, make_department):
+    """case ที่เพิ่มหลังเปิด stream ถูกส่งเป็น case_created และ stats"""
+    department_id, _ = make_department()
+    stream = _open_stream(client)
+    assert _next_chunk(stream).startswith('retry:')
+    assert 'event: snapshot' in _next_chunk(stream)
+
+    response = client.post('/api/admin/cases', json={
+        'hn': '7000001', 'first_name': 'สตรีม', 'last_name': 'ทดสอบ',
+        'department_id': department_id, 'case_date': '2026-09-05'
+    }, headers=auth_headers)
+    assert response.status_code in (200, 201)
+
+    created, stats = _next_chunk(stream), _next_chunk(stream)
+    assert 'event: case_created' in created
+    # stream ที่ไม่ได้เข้าสู่ระบบไม่ได้รับ HN
+    assert '7000001' not in created
+    assert 'event: stats' in stats and '"total_delta": 1' in stats
+    stream.close()
+
+
+def test_stream_can_be_disabled(app, client, monkeypatch):
+    """LIVE_EVENTS_ENABLED=false (serverless) ได้ 404"""
+    monkeypatch.setitem(app.config, 'LIVE_EVENTS_ENABLED', False)
+    assert _open_stream(client).status_code == 404
+
+
+def test_relay_notifies_only_with_listeners(app, client, auth_headers, make_department, monkeypatch):
+    """backend postgres: NOTIFY เฉพาะเมื่อมีผู้รับ และไม่ส่ง HN/ชื่อผู้ป่วยผ่าน payload"""
+    department_id, _ = make_department()
+    notified, demand = [], {'listening': False}
+    monkeypatch.setattr(event_relay, 'enabled', True)
+    monkeypatch.setattr(event_relay, 'has_listeners', lambda connection: demand['listening'])
+    monkeypatch.setattr(event_relay, 'notify', lambda connection, event_type, data: notified.append((event_type, data)))
+
+    def create(hn):
+        response = client.post('/api/admin/cases', json={
+            'hn': hn, 'first_name': 'รีเลย์', 'last_name': 'ทดสอบ',
+            'department_id': department_id, 'case_date': '2026-09-06'
+        }, headers=auth_headers)
+        assert response.status_code in (200, 201)
+        return response
+
+    create('7100001')
+    assert notified == []
+
+    demand['listening'] = True
+    create('7100002')
+    assert [event_type for event_type, _ in notified] == ['case_created', 'stats']
+    assert '7100002' not in json.dumps(notified, ensure_ascii=False)
+
+    # ผู้รับดึง HN/ชื่อจากฐานข้อมูลตาม case_id
+    subscriber = case_event_bus.subscribe()
+    try:
+        with app.app_context():
+            event_relay._dispatch(db.engine, [
+                json.dumps({'event': event_type, 'data': data}) for event_type, data in notified
+            ])
+        created = subscriber.get_nowait()
+        assert created['private']['hn'] == '7100002'
+        assert subscriber.get_nowait()['private'] is None
+    finally:
+        case_event_bus.unsubscribe(subscriber)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ cache ของ route สถิติ (utils/stats_cache.py)
+"""
+
+from models import db, Department
+from utils.stats_cache import stats_cache
+
+
+def _trend_url(code):
+    return f'/api/public/stats/trend?period=day&start=2026-06-01&end=2026-06-03&department={code}'
+
+
+def _add_case(client, auth_headers, department_id, hn):
+    response = client.post('/api/admin/cases', json={
+        'hn': hn, 'first_name': 'แคช', 'last_name': 'สถิติ',
+        'department_id': department_id, 'case_date': '2026-06-02'
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_etag_and_not_modified(client, make_department):
+    """response ที่ cache ไว้มี ETag และตอบ 304 เมื่อ If-None-Match ตรงกัน"""
+    _, code = make_department()
+    response = client.get(_trend_url(code))
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = client.get(_trend_url(code), headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_commit_invalidates_cache(app, client, auth_headers, make_department):
+    """commit ที่แก้ไข cases ล้าง cache ทันที ไม่ต้องรอ TTL"""
+    department_id, code = make_department()
+    _add_case(client, auth_headers, department_id, '6600001')
+    before = client.get(_trend_url(code))
+    assert before.get_json()['data']['totals'] == [0, 1, 0]
+
+    generation = stats_cache.generation
+    _add_case(client, auth_headers, department_id, '6600002')
+    assert stats_cache.generation > generation
+
+    after = client.get(_trend_url(code), headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert after.get_json()['data']['totals'] == [0, 2, 0]
+    assert after.headers['ETag'] != before.headers['ETag']
+
+
+def test_rollback_keeps_cache(app, make_department):
+    """การแก้ไขที่ rollback ไม่ล้าง cache"""
+    department_id, _ = make_department()
+    generation = stats_cache.generation
+    with app.app_context():
+        db.session.get(Department, department_id).name = 'ยกเลิก'
+        db.session.flush()
+        db.session.rollback()
+    assert stats_cache.generation == generation
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ snapshot สถิติสาธารณะ (services/stats_snapshot.py)
+"""
+
+import json
+import os
+from datetime import datetime, timezone, timedelta
+import pytest
+from services.stats_snapshot import LATEST_FILENAME, write_stats_snapshot, get_stats_snapshot
+
+
+@pytest.fixture
+def snapshot_dirs(app, monkeypatch, tmp_path):
+    """เปิด snapshot โดยมีโฟลเดอร์ของ build และโฟลเดอร์สำหรับสร้างใหม่"""
+    bundled, refresh = str(tmp_path / 'bundled'), str(tmp_path / 'refresh')
+    monkeypatch.setitem(app.config, 'STATS_SNAPSHOT_ENABLED', True)
+    monkeypatch.setitem(app.config, 'STATS_SNAPSHOT_DIR', bundled)
+    monkeypatch.setitem(app.config, 'STATS_SNAPSHOT_REFRESH_DIR', refresh)
+    monkeypatch.setitem(app.config, 'STATS_SNAPSHOT_MAX_AGE', 900)
+    monkeypatch.setitem(app.config, 'STATS_SNAPSHOT_SERVE_STALE', False)
+    return bundled, refresh
+
+
+def _age_snapshot(directory, seconds):
+    """ย้อนเวลา generated_at ของ snapshot ล่าสุด"""
+    path = os.path.join(directory, LATEST_FILENAME)
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    payload['generated_at'] = (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    return payload['generated_at']
+
+
+def test_fresh_bundled_snapshot_is_served(app, snapshot_dirs):
+    """snapshot จาก build ที่ยังไม่เก่าเกิน MAX_AGE ถูกใช้โดยไม่สร้างใหม่"""
+    bundled, refresh = snapshot_dirs
+    with app.app_context():
+        write_stats_snapshot(bundled)
+        generated_at = _age_snapshot(bundled, 60)
+        assert get_stats_snapshot()['generated_at'] == generated_at
+    assert not os.path.exists(refresh)
+
+
+def test_expired_snapshot_is_regenerated(app, client, auth_headers, snapshot_dirs, make_department):
+    """snapshot ที่เก่ากว่า MAX_AGE ไม่ถูกใช้ - สร้างใหม่จากฐานข้อมูลที่มี case ล่าสุด"""
+    bundled, refresh = snapshot_dirs
+    with app.app_context():
+        write_stats_snapshot(bundled)
+        expired_at = _age_snapshot(bundled, 3600)
+    _, code = make_department()
+    response = client.post('/api/admin/cases/import', data=(
+        'hn,first_name,last_name,department_code,case_date\n'
+        f'6400001,สแนป,ช็อต,{code},2026-09-10'
+    ).encode('utf-8'), headers=dict(auth_headers, **{'Content-Type': 'text/csv'}))
+    assert response.get_json()['imported'] == 1
+
+    data = client.get('/api/public/stats').get_json()
+    assert data['snapshot']['generated_at'] != expired_at
+    assert not data['snapshot']['stale']
+    assert os.path.exists(os.path.join(refresh, LATEST_FILENAME))
+    assert {'department_code': code, 'case_count': 1} in [
+        {key: dept[key] for key in ('department_code', 'case_count')} for dept in data['data']['department_stats']
+    ]
+
+
+def test_expired_snapshot_falls_back_to_database(app, snapshot_dirs, monkeypatch):
+    """ไม่มีโฟลเดอร์สำหรับสร้างใหม่: snapshot ที่หมดอายุไม่ถูกใช้ เว้นแต่เปิด SERVE_STALE"""
+    bundled, _ = snapshot_dirs
+    monkeypatch.setitem(app.config, 'STATS_SNAPSHOT_REFRESH_DIR', '')
+    with app.app_context():
+        write_stats_snapshot(bundled)
+        _age_snapshot(bundled, 3600)
+        assert get_stats_snapshot() is None
+        monkeypatch.setitem(app.config, 'STATS_SNAPSHOT_SERVE_STALE', True)
+        assert get_stats_snapshot() is not None
+
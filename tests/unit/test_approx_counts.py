@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ approximate counts (services/approx_counts.py)
+"""
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from models import PatientCase
+from services.approx_counts import COUNTER_TABLES, _Explain
+
+
+def test_explain_sends_values_as_bound_parameters():
+    """EXPLAIN ใช้ bound parameter แทนการแทรกค่าลงใน SQL"""
+    term = "x'); DROP TABLE patient_case; --"
+    statement = select(PatientCase.id).where(
+        PatientCase.first_name.contains(term), PatientCase.department_id.in_([1, 2])
+    )
+    compiled = _Explain(statement).compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert sql.startswith('EXPLAIN (FORMAT JSON) SELECT')
+    assert 'DROP TABLE' not in sql
+    assert term in compiled.params.values()
+
+
+def test_case_total_is_not_estimated():
+    """จำนวน cases อ่านจาก rollup - ไม่ต้องอ่าน catalog"""
+    assert 'total_cases' not in COUNTER_TABLES
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ analytics cube ในหน่วยความจำ (services/case_analytics.py)
+"""
+
+import threading
+from datetime import date
+from services.case_analytics import CaseCube
+
+
+def _cube():
+    cube = CaseCube()
+    with cube._lock:
+        cube._append(1, 10, date(2026, 1, 5), True, False, None)
+        cube._append(2, 10, date(2026, 1, 6), False, True, 'drive')
+        cube._append(3, 20, date(2026, 2, 1), False, False, None)
+        cube.loaded_at = 0
+    return cube
+
+
+def test_query_groups_and_filters():
+    """group by และ filter ทุกชนิด รวมถึง has_file=False"""
+    cube = _cube()
+    counts, total, size, _ = cube.query(['department'])
+    assert counts == {(10,): 2, (20,): 1} and total == 3 and size == 3
+
+    counts, total, _, _ = cube.query(['month'], has_file=False)
+    assert counts == {('2026-01',): 1, ('2026-02',): 1} and total == 2
+
+    counts, total, _, _ = cube.query(['link_type'], department_ids=[10], start=date(2026, 1, 6))
+    assert counts == {('drive',): 1} and total == 1
+
+
+def test_query_reads_a_copy_of_the_columns():
+    """การแก้ไขระหว่าง query ไม่กระทบผลที่กำลังคำนวณ และ query ไม่ถือ lock ระหว่างคำนวณ"""
+    cube = _cube()
+    started, release = threading.Event(), threading.Event()
+    original = CaseCube._mask
+
+    def slow_mask(columns, **filters):
+        started.set()
+        release.wait(5)
+        return original(columns, **filters)
+
+    cube._mask = slow_mask
+    result = {}
+    worker = threading.Thread(target=lambda: result.setdefault('query', cube.query(['department'])))
+    worker.start()
+    assert started.wait(5)
+
+    # หลัง commit: upsert/remove ต้องไม่รอ query
+    applied = threading.Thread(target=lambda: (cube.remove(1), cube.upsert(4, 20, date(2026, 3, 1), False, False, None)))
+    applied.start()
+    applied.join(1)
+    assert not applied.is_alive()
+
+    release.set()
+    worker.join(5)
+    assert result['query'][0] == {(10,): 2, (20,): 1}
+    assert cube.query(['department'])[0] == {(10,): 1, (20,): 2}
+
+
+def test_query_after_invalidate_reports_zero_age():
+    """cube ที่ถูก invalidate ระหว่าง ensure_loaded กับ query ไม่ทำให้เกิดข้อผิดพลาด"""
+    cube = _cube()
+    cube.invalidate()
+    assert cube.query(['department']) == ({}, 0, 0, 0)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ background writer ของ case_audit (services/case_audit.py) บนฐานข้อมูล SQLite ชั่วคราว
+"""
+
+import threading
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import create_engine, select
+from models import db, CaseAudit
+from services.case_audit import CaseAuditWriter
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _entries(count, start=1):
+    now = datetime.now(timezone.utc)
+    return [
+        {'case_id': case_id, 'action': 'CREATE', 'user_id': None, 'ip_address': None, 'created_at': now}
+        for case_id in range(start, start + count)
+    ]
+
+
+def _written_case_ids(engine):
+    with engine.connect() as connection:
+        return sorted(connection.execute(select(CaseAudit.case_id)).scalars())
+
+
+def test_full_queue_writes_synchronously_and_stop_drains(engine):
+    """queue เต็ม: รายการที่ล้นถูกเขียนทันที ส่วนที่อยู่ใน queue ถูกเขียนตอน stop()"""
+    writer = CaseAuditWriter(queue_size=2, batch_size=100, flush_interval=0.05)
+    release = threading.Event()
+    # thread ของ writer ไม่ดึงรายการจาก queue จนกว่าจะปล่อย (จำลองฐานข้อมูลช้า)
+    writer._run = release.wait
+
+    writer.record(_entries(5), engine)
+    assert _written_case_ids(engine) == [3, 4, 5]
+
+    release.set()
+    writer._thread.join(1)
+    writer.stop(timeout=1)
+    assert _written_case_ids(engine) == [1, 2, 3, 4, 5]
+
+
+def test_background_writer_batches_and_flushes_on_stop(engine):
+    """รายการใน buffer ถูกเขียนเป็นชุดโดย background thread และครบทั้งหมดหลัง stop()"""
+    writer = CaseAuditWriter(queue_size=100, batch_size=3, flush_interval=0.05)
+    writer.record(_entries(4), engine)
+    writer.record(_entries(3, start=5), engine)
+    assert writer.running
+
+    writer.stop(timeout=5)
+    assert not writer.running
+    assert _written_case_ids(engine) == list(range(1, 8))
+
+
+def test_failed_write_is_retried(engine, monkeypatch):
+    """เขียนไม่สำเร็จครั้งแรก: ลองเขียนชุดเดิมใหม่"""
+    monkeypatch.setattr('services.case_audit.time.sleep', lambda seconds: None)
+    writer = CaseAuditWriter(queue_size=10, batch_size=10)
+    writer._engine = engine
+    calls = []
+    write = writer._write
+
+    def flaky_write(entries, engine=None):
+        calls.append(len(entries))
+        if len(calls) == 1:
+            raise RuntimeError('database is locked')
+        write(entries, engine)
+
+    writer._write = flaky_write
+    writer._write_with_retry(_entries(2))
+    assert calls == [2, 2]
+    assert _written_case_ids(engine) == [1, 2]
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+ทดสอบการตรวจ/สร้าง index ตาม registry (services/index_sync.py) บนฐานข้อมูล SQLite ชั่วคราว
+"""
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from models import db, INDEX_REGISTRY
+from services.index_sync import diff_indexes, sync_indexes
+
+DROPPED = ('ix_patient_case_hn', 'ix_case_audit_case_created')
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'indexes.db'}")
+    db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _index_names(engine, table_name):
+    return {index['name'] for index in inspect(engine).get_indexes(table_name)}
+
+
+def test_registry_names_are_unique():
+    """ชื่อ index ใน registry ไม่ซ้ำกัน"""
+    names = [index.name for index in INDEX_REGISTRY]
+    assert len(names) == len(set(names))
+
+
+def test_new_database_has_every_index(engine):
+    """db.create_all() สร้าง index ทั้งหมดใน registry"""
+    assert diff_indexes(engine) == []
+    assert sync_indexes(engine) == []
+
+
+def test_sync_creates_missing_indexes(engine):
+    """index ที่หายไปถูกรายงานตามลำดับใน registry และสร้างคืนได้"""
+    with engine.begin() as connection:
+        for name in DROPPED:
+            connection.execute(text(f'DROP INDEX {name}'))
+
+    order = [index.name for index in INDEX_REGISTRY]
+    expected = sorted(DROPPED, key=order.index)
+    assert [index.name for index in diff_indexes(engine)] == expected
+
+    # dry_run แสดงรายการอย่างเดียว
+    assert sync_indexes(engine, dry_run=True) == expected
+    assert 'ix_patient_case_hn' not in _index_names(engine, 'patient_case')
+
+    # names จำกัดเฉพาะ index ที่ระบุ
+    assert sync_indexes(engine, names={'ix_patient_case_hn'}) == ['ix_patient_case_hn']
+    assert 'ix_patient_case_hn' in _index_names(engine, 'patient_case')
+
+    assert sync_indexes(engine) == ['ix_case_audit_case_created']
+    assert diff_indexes(engine) == []
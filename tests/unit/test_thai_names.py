@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+ทดสอบการ normalize ชื่อภาษาไทยสำหรับการค้นหา (utils.helpers.normalize_thai_name)
+"""
+
+import pytest
+from utils.helpers import normalize_thai_name
+
+
+@pytest.mark.parametrize('text, expected', [
+    # นิคหิต + สระอา (ทั้งสองลำดับ) -> สระอำ
+    ('นํา', 'นำ'),
+    ('นาํ', 'นำ'),
+    # เ + เ -> แ
+    ('เเก้ว', 'แกว'),
+    # วรรณยุกต์ถูกตัด (พิมพ์วรรณยุกต์ผิดก็ค้นหาได้)
+    ('น้ำฝน', 'นำฝน'),
+    ('นํ้าฝน', 'นำฝน'),
+    # สระบนซ้ำและการันต์ก่อนสระ
+    ('สิิทธิ์', 'สิทธิ์'),
+    ('สิทธ์ิ', 'สิทธิ์'),
+    # อักขระความกว้างศูนย์ ช่องว่าง และตัวพิมพ์ใหญ่
+    ('  สม​ชาย   ใจดี ', 'สมชาย ใจดี'),
+    ('John  SMITH', 'john smith'),
+    ('', ''),
+    (None, ''),
+])
+def test_normalize_thai_name(text, expected):
+    """ชื่อที่พิมพ์ต่างกันแต่อ่านเหมือนกันได้ key เดียวกัน"""
+    assert normalize_thai_name(text) == expected
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+ทดสอบ write-behind ของคอลัมน์แบบ touch (services/write_behind.py) บนฐานข้อมูล SQLite ชั่วคราว
+"""
+
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, event, insert, select
+from models import db, AdminUser
+from services.write_behind import WriteBehindBuffer
+
+LAST_LOGIN = AdminUser.__table__.c.last_login
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'write_behind.db'}")
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(AdminUser.__table__), [
+            {'id': user_id, 'username': f'user{user_id}', 'password_hash': 'x', 'email': f'user{user_id}@test.local'}
+            for user_id in (1, 2)
+        ])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def buffer():
+    # interval ยาวมาก: background thread ไม่เขียนเองระหว่าง test
+    buffer = WriteBehindBuffer(interval=3600)
+    yield buffer
+    buffer.stop(timeout=1)
+
+
+def _last_logins(engine):
+    with engine.connect() as connection:
+        return dict(connection.execute(select(AdminUser.__table__.c.id, LAST_LOGIN)).all())
+
+
+def _count_updates(engine):
+    statements = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE'):
+            statements.append(statement)
+    return statements
+
+
+def test_touches_are_coalesced_into_one_update(engine, buffer):
+    """touch แถวเดียวกันหลายครั้งเก็บเฉพาะค่าล่าสุด และเขียนทุกแถวด้วย UPDATE เดียว"""
+    for minute in range(3):
+        buffer.touch(LAST_LOGIN, 1, datetime(2026, 7, 1, 8, minute), engine)
+    buffer.touch(LAST_LOGIN, 2, datetime(2026, 7, 1, 9, 0), engine)
+    assert buffer.pending_value(LAST_LOGIN, 1) == datetime(2026, 7, 1, 8, 2)
+    assert _last_logins(engine) == {1: None, 2: None}
+
+    updates = _count_updates(engine)
+    buffer.flush()
+    assert len(updates) == 1
+    assert _last_logins(engine) == {1: datetime(2026, 7, 1, 8, 2), 2: datetime(2026, 7, 1, 9, 0)}
+    assert buffer.pending_value(LAST_LOGIN, 1) is None
+
+
+def test_failed_write_is_requeued(engine, buffer):
+    """เขียนไม่สำเร็จ: ค่าถูกเก็บไว้เขียนรอบถัดไป โดยค่าที่ touch ระหว่างนั้นใหม่กว่า"""
+    buffer.touch(LAST_LOGIN, 1, datetime(2026, 7, 2, 8, 0), engine)
+    buffer.touch(LAST_LOGIN, 2, datetime(2026, 7, 2, 8, 0), engine)
+    write = buffer._write
+
+    def failing_write(pending, engine):
+        # login ใหม่ของ user 2 เข้ามาระหว่างที่กำลังเขียน
+        buffer.touch(LAST_LOGIN, 2, datetime(2026, 7, 2, 8, 30), engine)
+        raise RuntimeError('database is locked')
+
+    buffer._write = failing_write
+    buffer.flush()
+    assert _last_logins(engine) == {1: None, 2: None}
+    assert buffer.pending_value(LAST_LOGIN, 1) == datetime(2026, 7, 2, 8, 0)
+    assert buffer.pending_value(LAST_LOGIN, 2) == datetime(2026, 7, 2, 8, 30)
+
+    buffer._write = write
+    buffer.stop(timeout=1)
+    assert _last_logins(engine) == {1: datetime(2026, 7, 2, 8, 0), 2: datetime(2026, 7, 2, 8, 30)}
+
+
+def test_zero_interval_writes_immediately(engine):
+    """interval 0 เขียนทันทีโดยไม่เริ่ม background thread"""
+    buffer = WriteBehindBuffer(interval=0)
+    buffer.touch(LAST_LOGIN, 1, datetime(2026, 7, 3, 8, 0), engine)
+    assert not buffer.running
+    assert _last_logins(engine)[1] == datetime(2026, 7, 3, 8, 0)
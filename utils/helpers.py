@@ -6,6 +6,7 @@ Utility functions และ helper functions สำหรับระบบ
 
 import os
 import re
+import unicodedata
 from datetime import datetime
 from werkzeug.utils import secure_filename
 
@@ -159,4 +160,44 @@ def truncate_text(text, max_length=50):
     if len(text) <= max_length:
         return text
     
-    return text[:max_length-3] + "..."
\ No newline at end of file
+    return text[:max_length-3] + "..."
+
+# อักขระที่ใช้ในการ normalize ชื่อภาษาไทย
+THAI_TONE_MARKS = '\u0e47\u0e48\u0e49\u0e4a\u0e4b'  # ไม้ไต่คู้ ไม้เอก ไม้โท ไม้ตรี ไม้จัตวา
+THAI_COMBINING_VOWELS = '\u0e31\u0e34\u0e35\u0e36\u0e37\u0e38\u0e39\u0e3a\u0e4d'  # สระบน/ล่าง และนิคหิต
+THAI_THANTHAKHAT = '\u0e4c'  # การันต์
+ZERO_WIDTH_CHARACTERS = '\u200b\u200c\u200d\ufeff'
+
+_THAI_COMBINING_RUN = re.compile(f'[{THAI_COMBINING_VOWELS}{THAI_THANTHAKHAT}]{{2,}}')
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_thai_name(text):
+    """
+    Normalize ชื่อสำหรับการค้นหา (ใช้ทั้งตอนบันทึก index และตอนค้นหา)
+    - ตัดอักขระความกว้างศูนย์ และรวมช่องว่างที่ติดกันเป็นช่องเดียว
+    - ตัดวรรณยุกต์และไม้ไต่คู้ (ค้นหาได้แม้พิมพ์วรรณยุกต์ผิด)
+    - แก้ลำดับสระที่พิมพ์ผิดบ่อย: นิคหิต+สระอา (ทั้งสองลำดับ) -> สระอำ, เ+เ -> แ, สระบน/ล่างซ้ำ
+    - เรียงสระบน/ล่างไว้ก่อนการันต์ และแปลงตัวอักษรละตินเป็นตัวพิมพ์เล็ก
+    
+    Args:
+        text (str): ชื่อหรือคำค้น
+    
+    Returns:
+        str: ข้อความที่ normalize แล้ว
+    """
+    if not text:
+        return ""
+    
+    text = unicodedata.normalize('NFC', str(text))
+    text = text.translate({ord(char): None for char in ZERO_WIDTH_CHARACTERS + THAI_TONE_MARKS})
+    text = text.replace('\u0e4d\u0e32', '\u0e33').replace('\u0e32\u0e4d', '\u0e33').replace('\u0e40\u0e40', '\u0e41')
+    
+    def reorder(match):
+        marks = []
+        for char in match.group(0):
+            if char not in marks:
+                marks.append(char)
+        return ''.join(sorted(marks, key=lambda char: char == THAI_THANTHAKHAT))
+    
+    text = _THAI_COMBINING_RUN.sub(reorder, text)
+    return _WHITESPACE.sub(' ', text).strip().casefold()
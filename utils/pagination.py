@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Keyset (cursor) pagination สำหรับรายการที่เรียงจากใหม่ไปเก่า
+ใช้ WHERE (created_at, id) < (cursor) แทน OFFSET ทำให้ทุกหน้าใช้เวลาเท่ากัน
+cursor เป็น string แบบ opaque (base64 ของค่าคีย์ของแถวสุดท้าย)
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+# จำนวนรายการต่อหน้าสูงสุด
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at, row_id):
+    """
+    สร้าง cursor จากคีย์ของแถวสุดท้ายในหน้า
+
+    Returns:
+        str: cursor แบบ base64 (url-safe)
+    """
+    payload = [created_at.isoformat(), row_id]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    แปลง cursor กลับเป็น (created_at, id)
+
+    Raises:
+        ValueError: ถ้า cursor ไม่ถูกต้อง
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('cursor ไม่ถูกต้อง')
+
+
+def keyset_paginate(query, created_column, id_column, cursor=None, limit=20):
+    """
+    ดึงหน้าถัดไปของ query เรียงตาม (created_at, id) จากใหม่ไปเก่า
+    (created_at ต้องไม่เป็น NULL - ทุกตารางมีค่า default อยู่แล้ว)
+
+    Args:
+        query: SQLAlchemy query (ยังไม่ order_by)
+        created_column: คอลัมน์ created_at
+        id_column: คอลัมน์ primary key
+        cursor (str): cursor จากหน้าก่อน (None = หน้าแรก)
+        limit (int): จำนวนรายการต่อหน้า (ไม่เกิน MAX_PAGE_SIZE)
+
+    Returns:
+        tuple: (รายการในหน้านี้, next_cursor หรือ None ถ้าเป็นหน้าสุดท้าย)
+
+    Raises:
+        ValueError: ถ้า cursor ไม่ถูกต้อง
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            created_column < created_at,
+            and_(created_column == created_at, id_column < row_id)
+        ))
+
+    items = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+    return items, next_cursor
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Cache สำหรับ payload สถิติ (หน้า /stats, /api/public/stats และ dashboard)
+เก็บผลลัพธ์ไว้ตามเวลา TTL และล้างทันทีเมื่อมีการ commit ข้อมูลที่เกี่ยวข้อง
+ตอบกลับด้วย strong ETag และ 304 Not Modified เมื่อ If-None-Match ตรงกัน
+
+หมายเหตุ: cache อยู่ใน process เดียว ถ้ารันหลาย worker ข้อมูลของ worker อื่น
+จะอัปเดตภายในเวลา TTL
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from flask import current_app, request, session, make_response
+from sqlalchemy import event
+from models import db, Department, Guideline, Knowledge, Activity, Contact, PatientCase
+
+# ค่าเริ่มต้นของ TTL (วินาที) ถ้าไม่ได้กำหนด STATS_CACHE_TTL
+DEFAULT_STATS_CACHE_TTL = 300
+
+# จำนวน payload สูงสุดที่เก็บไว้ (เช่น trend หลายช่วงเวลา)
+MAX_CACHE_ENTRIES = 256
+
+# models ที่มีผลต่อตัวเลขสถิติ
+STATS_MODELS = (PatientCase, Department, Guideline, Knowledge, Activity, Contact)
+
+CacheEntry = namedtuple('CacheEntry', ['body', 'mimetype', 'etag', 'expires_at'])
+
+
+def make_etag(body):
+    """สร้าง strong ETag จากเนื้อหา response"""
+    return hashlib.sha256(body).hexdigest()
+
+
+class StatsCache:
+    """Cache แบบ TTL สำหรับ payload สถิติ (thread-safe)"""
+
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # เพิ่มขึ้นทุกครั้งที่ล้าง cache เพื่อไม่ให้เก็บผลที่คำนวณก่อนการแก้ไขข้อมูล
+        self.generation = 0
+
+    def get(self, key):
+        """ดึง entry ที่ยังไม่หมดอายุ หรือ None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, mimetype, ttl, generation=None):
+        """เก็บ payload พร้อม ETag และคืน entry ที่สร้าง"""
+        entry = CacheEntry(body, mimetype, make_etag(body), time.monotonic() + ttl)
+        if ttl <= 0:
+            return entry
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_set(self, key, builder, ttl):
+        """ดึงค่าจาก cache หรือเรียก builder() แล้วเก็บผลไว้ (สำหรับข้อมูลที่ไม่ใช่ response)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.monotonic():
+                return entry.body
+            generation = self.generation
+        value = builder()
+        if ttl > 0:
+            with self._lock:
+                if generation == self.generation:
+                    self._entries[key] = CacheEntry(value, None, None, time.monotonic() + ttl)
+        return value
+
+    def invalidate(self):
+        """ล้าง cache ทั้งหมด"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+
+stats_cache = StatsCache()
+
+
+def get_stats_cache_ttl():
+    """TTL ของ cache จาก config STATS_CACHE_TTL"""
+    return int(current_app.config.get('STATS_CACHE_TTL', DEFAULT_STATS_CACHE_TTL))
+
+
+def invalidate_stats_cache():
+    """ล้าง cache สถิติ (เรียกหลังการเขียนข้อมูลที่ไม่ผ่าน ORM session เช่น bulk UPDATE)"""
+    stats_cache.invalidate()
+
+
+def cached_stats(f):
+    """
+    Decorator สำหรับ route สถิติ: cache response ตาม path+query string
+    และตอบ 304 เมื่อ If-None-Match ตรงกับ ETag
+
+    response ที่ไม่ใช่ 200 หรือมี Cache-Control: no-store จะไม่ถูก cache
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # มีข้อความ flash รอแสดงอยู่ - หน้านี้เฉพาะผู้ใช้คนนี้ ห้ามใช้/เก็บ cache
+        if '_flashes' in session:
+            return f(*args, **kwargs)
+
+        key = request.full_path
+        entry = stats_cache.get(key)
+
+        if entry is None:
+            generation = stats_cache.generation
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.cache_control.no_store:
+                return response
+            entry = stats_cache.set(
+                key, response.get_data(), response.mimetype, get_stats_cache_ttl(), generation
+            )
+
+        response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    return decorated_function
+
+
+@event.listens_for(db.session, 'before_flush')
+def _mark_stats_changes(db_session, flush_context, instances):
+    """จดไว้ว่า transaction นี้แก้ไขข้อมูลที่มีผลต่อสถิติ"""
+    for obj in list(db_session.new) + list(db_session.dirty) + list(db_session.deleted):
+        if isinstance(obj, STATS_MODELS):
+            db_session.info['stats_changed'] = True
+            return
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(db_session):
+    if db_session.info.pop('stats_changed', False):
+        invalidate_stats_cache()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_after_rollback(db_session):
+    db_session.info.pop('stats_changed', None)